@@ -1,7 +1,10 @@
 from flask import Flask
 
 from app.blueprints.auth import auth_bp
+from app.blueprints.auth.revocation import get_revocation_list
+from app.blueprints.recipe.outbox import get_outbox_dispatcher
 from app.blueprints.recipe.routes import recipe_bp
+from app.blueprints.recipe.trigram import get_trigram_index
 from app.config import Config
 from app.extensions import db, jwt, login_manager, migrate
 from app.models import Ingredient, Recipe, RecipeIngredient, User
@@ -31,8 +34,13 @@ def create_app(config_class=Config):
     app.register_blueprint(auth_bp, url_prefix="/auth")
     app.register_blueprint(recipe_bp, url_prefix="/api/recipes")
 
-    # Register models
+    # Register models, build the in-process trigram index and token
+    # revocation filter, and start following the change outbox from its
+    # current end
     with app.app_context():
         db.create_all()
+        get_trigram_index()
+        get_outbox_dispatcher()
+        get_revocation_list().refresh(db.session)
 
     return app
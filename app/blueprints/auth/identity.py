@@ -0,0 +1,185 @@
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+from flask_login import UserMixin
+from sqlalchemy import event
+
+from app.extensions import db
+from app.models import User
+
+
+class UserSnapshot(UserMixin):
+    """
+    Detached, read-only copy of the user fields needed to serve requests.
+
+    It stands in for `User` in authenticated views and Flask-Login, without
+    holding a session or the password hash.
+    """
+
+    def __init__(self, id, username, email):
+        self.id = id
+        self.username = username
+        self.email = email
+
+    def to_dict(self):
+        """
+        Convert the snapshot to a dictionary, like `User.to_dict`.
+        """
+        return {"id": self.id, "username": self.username, "email": self.email}
+
+    def __repr__(self):
+        return f"<UserSnapshot {self.username}>"
+
+
+class IdentityCache:
+    """
+    Bounded LRU of user snapshots keyed by user ID, expiring after a TTL.
+
+    Users changed through the ORM are dropped when their transaction
+    commits; the TTL bounds how long other workers' changes go unseen.
+    """
+
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, user_id):
+        """
+        Return the cached snapshot of a user, or None on a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[1] <= time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, snapshot):
+        """
+        Cache a snapshot, evicting the least recently used ones beyond the bound.
+        """
+        with self._lock:
+            self._entries[snapshot.id] = (snapshot, time.monotonic() + self.ttl)
+            self._entries.move_to_end(snapshot.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, user_ids):
+        """
+        Drop the snapshots of the given users.
+        """
+        with self._lock:
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+    def stats(self):
+        """
+        Return the cache's counters.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else None,
+            }
+
+
+def get_identity_cache():
+    """
+    Return the identity cache of the current application, creating it on first use.
+    """
+    cache = current_app.extensions.get("identity_cache")
+    if cache is None:
+        cache = current_app.extensions.setdefault(
+            "identity_cache",
+            IdentityCache(
+                ttl=current_app.config["IDENTITY_CACHE_TTL"],
+                max_entries=current_app.config["IDENTITY_CACHE_MAX_ENTRIES"],
+            ),
+        )
+    return cache
+
+
+def load_user_snapshot(user_id):
+    """
+    Return the snapshot of a user, from the identity cache if possible.
+
+    On a miss only the snapshot's columns are read, by primary key.
+
+    Args:
+        user_id (int | str): The ID of the user.
+
+    Returns:
+        UserSnapshot | None: The snapshot, or None if the user does not exist.
+    """
+    if user_id is None:
+        return None
+    user_id = int(user_id)
+    cache = get_identity_cache()
+    if (snapshot := cache.get(user_id)) is not None:
+        return snapshot
+    row = db.session.execute(
+        db.select(User.id, User.username, User.email).where(User.id == user_id)
+    ).first()
+    if row is None:
+        return None
+    snapshot = UserSnapshot(*row)
+    cache.set(snapshot)
+    return snapshot
+
+
+def snapshot_from_claims(identity, claims):
+    """
+    Build the snapshot of a user from the claims of their access token.
+
+    Stateless tokens carry the username; the email is not put in tokens
+    and is left unset.
+
+    Args:
+        identity (int | str): The token's subject, the ID of the user.
+        claims (dict): The token's claims.
+
+    Returns:
+        UserSnapshot | None: The snapshot, or None if the token has no
+            username claim, like tokens issued before it was added.
+    """
+    if identity is None or "username" not in claims:
+        return None
+    return UserSnapshot(int(identity), claims["username"], None)
+
+
+@event.listens_for(db.session, "after_flush")
+def _track_changed_users(session, flush_context):
+    changed = [
+        obj.id for obj in (*session.dirty, *session.deleted) if isinstance(obj, User)
+    ]
+    if changed:
+        session.info.setdefault("changed_users", set()).update(changed)
+
+
+@event.listens_for(db.session, "after_commit")
+def _invalidate_changed_users(session):
+    if (changed := session.info.pop("changed_users", None)) and (
+        cache := current_app.extensions.get("identity_cache")
+    ) is not None:
+        cache.invalidate(changed)
+
+
+@event.listens_for(db.session, "after_soft_rollback")
+def _discard_changed_users(session, previous_transaction):
+    if not session.in_transaction():
+        session.info.pop("changed_users", None)
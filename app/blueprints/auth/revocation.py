@@ -0,0 +1,244 @@
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from app.extensions import db, jwt
+from app.models import RevokedToken
+
+# Expiry recorded for revoked tokens that do not expire.
+NEVER = datetime(9999, 12, 31)
+
+# Expired revocations deleted per statement by the purge command.
+PURGE_BATCH_SIZE = 1000
+
+
+class BloomFilter:
+    """
+    Set of strings answering membership with no false negatives and a bounded
+    rate of false positives, in a fixed number of bits.
+
+    Args:
+        capacity (int): The number of items the error rate is sized for.
+        error_rate (float): The false positive rate at capacity.
+    """
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        # Double hashing: positions h1 + i * h2 from one 128-bit digest.
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+
+class RevocationList:
+    """
+    In-process pre-check of the revoked token store.
+
+    A Bloom filter of revoked JWT IDs clears almost every token without a
+    query; only possible matches are confirmed against the store. The filter
+    is refreshed at most every ``refresh_interval`` seconds with the
+    revocations made since the last refresh, re-reading the last ``overlap``
+    seconds so revocations committed late or stamped by a skewed clock are
+    not missed. It is rebuilt from the unexpired revocations once it holds
+    more than its capacity.
+    """
+
+    def __init__(self, capacity, error_rate, refresh_interval, overlap):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.refresh_interval = refresh_interval
+        self.overlap = timedelta(seconds=overlap)
+        self._filter = None
+        self._since = None
+        # Revocations of the overlap window already added, by revocation time.
+        self._recent = {}
+        self._next_refresh = 0
+        self._lock = threading.Lock()
+        self.checks = 0
+        self.lookups = 0
+        self.revoked = 0
+
+    def _rebuild(self, session, started):
+        jtis = session.scalars(
+            db.select(RevokedToken.jti).where(RevokedToken.expires_at > started)
+        ).all()
+        bloom = BloomFilter(max(self.capacity, 2 * len(jtis)), self.error_rate)
+        for jti in jtis:
+            bloom.add(jti)
+        self._filter = bloom
+        self._recent = {}
+
+    def refresh(self, session, force=False):
+        """
+        Add the revocations made since the last refresh to the filter.
+
+        Args:
+            session (Session): The session to read revocations with.
+            force (bool): Whether to refresh even if ``refresh_interval``
+                has not elapsed since the last refresh.
+        """
+        now = time.monotonic()
+        if not force and self._filter is not None and now < self._next_refresh:
+            return
+        # Until the filter is first built every check has to wait for it.
+        if not self._lock.acquire(self._filter is None):
+            return
+        try:
+            self._next_refresh = now + self.refresh_interval
+            started = datetime.utcnow()
+            if self._filter is None:
+                self._rebuild(session, started)
+            else:
+                window = self._since - self.overlap
+                rows = session.execute(
+                    db.select(RevokedToken.jti, RevokedToken.revoked_at).where(
+                        RevokedToken.revoked_at >= window
+                    )
+                ).all()
+                for jti, revoked_at in rows:
+                    if jti not in self._recent:
+                        self._filter.add(jti)
+                    self._recent[jti] = revoked_at
+                self._recent = {
+                    jti: revoked_at
+                    for jti, revoked_at in self._recent.items()
+                    if revoked_at >= started - self.overlap
+                }
+                if self._filter.count > self._filter.capacity:
+                    self._rebuild(session, started)
+            self._since = started
+        finally:
+            self._lock.release()
+
+    def add(self, jti):
+        """
+        Add a token revoked by this process to the filter.
+        """
+        if self._filter is not None:
+            self._filter.add(jti)
+
+    def is_revoked(self, jti, session):
+        """
+        Check whether a token has been revoked.
+
+        Args:
+            jti (str): The JWT ID of the token.
+            session (Session): The session to refresh the filter and confirm
+                possible matches with.
+
+        Returns:
+            bool: True if the token is in the revocation store.
+        """
+        self.refresh(session)
+        self.checks += 1
+        if jti not in self._filter:
+            return False
+        self.lookups += 1
+        revoked = session.get(RevokedToken, jti) is not None
+        self.revoked += revoked
+        return revoked
+
+    def stats(self):
+        """
+        Return the list's counters.
+        """
+        return {
+            "checks": self.checks,
+            "lookups": self.lookups,
+            "revoked": self.revoked,
+            "false_positives": self.lookups - self.revoked,
+            "filtered": self._filter.count if self._filter is not None else 0,
+        }
+
+
+def get_revocation_list():
+    """
+    Return the revocation list of the current application, creating it on first use.
+    """
+    revocations = current_app.extensions.get("revocation_list")
+    if revocations is None:
+        revocations = current_app.extensions.setdefault(
+            "revocation_list",
+            RevocationList(
+                capacity=current_app.config["REVOCATION_FILTER_CAPACITY"],
+                error_rate=current_app.config["REVOCATION_FILTER_ERROR_RATE"],
+                refresh_interval=current_app.config["REVOCATION_REFRESH_INTERVAL"],
+                overlap=current_app.config["REVOCATION_REFRESH_OVERLAP"],
+            ),
+        )
+    return revocations
+
+
+def revoke_token(claims):
+    """
+    Record the revocation of a token in the current session.
+
+    The token is added to this process's filter at once; other processes
+    see it after their next refresh. The caller commits.
+
+    Args:
+        claims (dict): The decoded claims of the token.
+    """
+    expires_at = datetime.utcfromtimestamp(claims["exp"]) if "exp" in claims else NEVER
+    db.session.add(RevokedToken(jti=claims["jti"], expires_at=expires_at))
+    get_revocation_list().add(claims["jti"])
+
+
+@jwt.token_in_blocklist_loader
+def _is_token_revoked(jwt_header, jwt_payload):
+    jti = jwt_payload.get("jti")
+    return jti is not None and get_revocation_list().is_revoked(jti, db.session)
+
+
+def purge_revoked_tokens(batch_size=PURGE_BATCH_SIZE):
+    """
+    Delete the revocations of tokens that have expired, in batches.
+
+    Returns:
+        int: The number of revocations deleted.
+    """
+    table = RevokedToken.__table__
+    now = datetime.utcnow()
+    deleted = 0
+    while True:
+        expired = db.session.scalars(
+            db.select(table.c.jti).where(table.c.expires_at <= now).limit(batch_size)
+        ).all()
+        if not expired:
+            return deleted
+        db.session.execute(table.delete().where(table.c.jti.in_(expired)))
+        db.session.commit()
+        deleted += len(expired)
+
+
+@click.command("purge-revoked-tokens")
+@with_appcontext
+def purge_revoked_tokens_command():
+    """
+    Delete the revocations of expired tokens.
+    """
+    click.echo(f"Deleted {purge_revoked_tokens()} expired token revocations.")
@@ -1,5 +1,7 @@
 from app.blueprints.auth import auth_bp
+from app.blueprints.auth.revocation import purge_revoked_tokens_command
 from app.blueprints.auth.views import (
+    IdentityCacheStatsAPI,
     LoginAPI,
     LogoutAPI,
     ProtectedAPI,
@@ -13,6 +15,7 @@ login_view = LoginAPI.as_view("login_api")
 logout_view = LogoutAPI.as_view("logout_api")
 protected_view = ProtectedAPI.as_view("protected_api")
 protected_route_view = ProtectedRouteAPI.as_view("protected_route_api")
+identity_cache_stats_view = IdentityCacheStatsAPI.as_view("identity_cache_stats_api")
 
 # Define URL routes for the authentication blueprint
 auth_bp.add_url_rule("/register", view_func=register_view, methods=["POST"])
@@ -22,3 +25,8 @@ auth_bp.add_url_rule("/protected", view_func=protected_view, methods=["GET"])
 auth_bp.add_url_rule(
     "/protected_route", view_func=protected_route_view, methods=["GET"]
 )
+auth_bp.add_url_rule(
+    "/cache/stats", view_func=identity_cache_stats_view, methods=["GET"]
+)
+
+auth_bp.cli.add_command(purge_revoked_tokens_command)
@@ -3,26 +3,32 @@ from functools import wraps
 
 import jwt
 from flask import current_app, jsonify, request
-from flask_jwt_extended import JWTManager, create_access_token, get_jwt_identity
+from flask_jwt_extended import JWTManager, create_access_token, get_jwt, get_jwt_identity
 from flask_jwt_extended import jwt_required as flask_jwt_required
 from flask_jwt_extended import verify_jwt_in_request
 from flask_login import current_user, login_user, logout_user
 
+from app.blueprints.auth.identity import load_user_snapshot, snapshot_from_claims
 from app.extensions import db, login_manager
 from app.models import User
 
-def generate_jwt(user_id):
+def generate_jwt(user_id, username=None):
     """
     Generate a JWT for the given user ID with a 1-day expiration.
     
     Args:
         user_id (int): The ID of the user for whom to generate the token.
+        username (str, optional): The username to carry in a ``username``
+            claim, from which stateless mode builds the current user.
         
     Returns:
         str: The generated JWT.
     """
     expires = datetime.timedelta(days=1)
-    return create_access_token(identity=user_id, expires_delta=expires)
+    claims = {"username": username} if username is not None else None
+    return create_access_token(
+        identity=user_id, expires_delta=expires, additional_claims=claims
+    )
 
 def jwt_required(fn):
     """
@@ -37,8 +43,7 @@ def jwt_required(fn):
     @wraps(fn)
     @flask_jwt_required()
     def wrapper(*args, **kwargs):
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = get_current_user()
         return fn(current_user, *args, **kwargs)
 
     return wrapper
@@ -46,34 +51,45 @@ def jwt_required(fn):
 @login_manager.user_loader
 def load_user(user_id):
     """
-    Load a user from the database by their user ID.
+    Load a user by their user ID, through the identity cache.
+    
+    In stateless mode session cookies are not honoured, so no user is loaded.
     
     Args:
         user_id (int): The ID of the user to load.
         
     Returns:
-        User: The loaded user instance or None if not found.
+        UserSnapshot: The snapshot of the user or None if not found.
     """
-    return User.query.get(int(user_id))
+    if current_app.config["AUTH_STATELESS"]:
+        return None
+    return load_user_snapshot(user_id)
 
 def get_user_by_id(user_id):
     """
-    Retrieve a user from the database by their user ID.
+    Retrieve a user by their user ID, through the identity cache.
     
     Args:
         user_id (int): The ID of the user to retrieve.
         
     Returns:
-        User: The retrieved user instance or None if not found.
+        UserSnapshot: The snapshot of the user or None if not found.
     """
-    return db.session.get(User, int(user_id))
+    return load_user_snapshot(user_id)
 
 def get_current_user():
     """
     Retrieve the current user based on the JWT token.
     
+    In stateless mode the user is built from the token's claims when it
+    carries them, without a lookup.
+    
     Returns:
-        User: The current user instance or None if not found.
+        UserSnapshot: The snapshot of the current user or None if not found.
     """
     current_user_id = get_jwt_identity()
-    return db.session.get(User, current_user_id)
+    if current_app.config["AUTH_STATELESS"]:
+        snapshot = snapshot_from_claims(current_user_id, get_jwt())
+        if snapshot is not None:
+            return snapshot
+    return load_user_snapshot(current_user_id)
@@ -2,16 +2,36 @@ import re
 
 from flask import current_app, jsonify, request
 from flask.views import MethodView
-from flask_login import current_user, login_required, login_user, logout_user
+from flask_jwt_extended import get_jwt, get_jwt_identity, verify_jwt_in_request
+from flask_login import current_user, login_user, logout_user
 from sqlalchemy.exc import DataError, IntegrityError
-from werkzeug.security import check_password_hash, generate_password_hash
 
 from app.blueprints.auth import auth_bp
+from app.blueprints.auth.identity import get_identity_cache
+from app.blueprints.auth.revocation import revoke_token
 from app.blueprints.auth.utils import generate_jwt, jwt_required
 from app.extensions import db
-from app.models import User
+from app.models import User, normalize_user_key
+from app.passwords import PasswordHashBusy, needs_rehash
 from app.utils import api_response
 
+# Registration errors by the user column whose unique index was violated.
+DUPLICATE_MESSAGES = {
+    "username": "Username already exists",
+    "email": "Email already exists",
+}
+
+
+def hashing_busy():
+    """
+    Build the 503 response sent when the password hashing pool is saturated.
+    """
+    response = jsonify(api_response(503, "Password hashing is busy, retry later"))
+    response.headers["Retry-After"] = str(
+        current_app.config["PASSWORD_HASH_RETRY_AFTER"]
+    )
+    return response, 503
+
 
 class RegisterAPI(MethodView):
     """
@@ -30,6 +50,8 @@ class RegisterAPI(MethodView):
 
         try:
             return self._process_registration()
+        except PasswordHashBusy:
+            return hashing_busy()
         except Exception as e:
             current_app.logger.error(f"Registration error: {str(e)}")
             return jsonify(api_response(500, "Internal server error")), 500
@@ -53,11 +75,6 @@ class RegisterAPI(MethodView):
         if not password:
             return jsonify(api_response(400, "Missing password")), 400
 
-        if User.query.filter_by(username=username).first():
-            return jsonify(api_response(400, "Username already exists")), 400
-        if User.query.filter_by(email=email).first():
-            return jsonify(api_response(400, "Email already exists")), 400
-
         # Validate password strength
         if not self.is_strong_password(password):
             return (
@@ -70,18 +87,46 @@ class RegisterAPI(MethodView):
                 400,
             )
 
+        # Uniqueness is left to the database's indexes, so a signup is a
+        # single INSERT and concurrent ones cannot both succeed.
         user = User(username=username, email=email)
         user.set_password(password)
         db.session.add(user)
+        try:
+            db.session.flush()
+        except IntegrityError as e:
+            db.session.rollback()
+            if (message := self.duplicate_message(e)) is None:
+                raise
+            return jsonify(api_response(400, message)), 400
+        # Serialized before committing, as committing expires the user.
+        user_data = user.to_dict()
         db.session.commit()
 
         return (
-            jsonify(
-                api_response(201, "User registered successfully", data=user.to_dict())
-            ),
+            jsonify(api_response(201, "User registered successfully", data=user_data)),
             201,
         )
 
+    def duplicate_message(self, error):
+        """
+        Return the message for a unique index violated by a registration.
+
+        Args:
+            error (IntegrityError): The error raised by the insert.
+
+        Returns:
+            str | None: The message, or None if no username or email index
+                was violated.
+        """
+        # The database names the violated index or column in its message.
+        detail = str(error.orig)
+        for field, message in DUPLICATE_MESSAGES.items():
+            names = (f"normalized_{field}", f"ix_user_{field}", f"user.{field}")
+            if any(name in detail for name in names):
+                return message
+        return None
+
     def is_strong_password(self, password):
         """
         Validate the strength of the given password.
@@ -114,6 +159,8 @@ class LoginAPI(MethodView):
 
         try:
             return self._process_login()
+        except PasswordHashBusy:
+            return hashing_busy()
         except Exception as e:
             current_app.logger.error(f"Login error: {str(e)}")
             return jsonify(api_response(500, "Internal server error")), 500
@@ -132,12 +179,20 @@ class LoginAPI(MethodView):
         if not email or not password:
             return jsonify(api_response(400, "Missing email or password")), 400
 
-        user = User.query.filter_by(email=email).first()
+        user = User.query.filter_by(normalized_email=normalize_user_key(email)).first()
         if user is None or not user.check_password(password):
             return jsonify(api_response(401, "Invalid email or password")), 401
 
-        login_user(user)
-        access_token = generate_jwt(user.id)
+        # Upgrade hashes made with an older algorithm or cost while the
+        # password is at hand.
+        if needs_rehash(user.password_hash):
+            user.set_password(password)
+            db.session.commit()
+
+        # Stateless clients authenticate with the token alone.
+        if not current_app.config["AUTH_STATELESS"]:
+            login_user(user)
+        access_token = generate_jwt(user.id, user.username)
         return (
             jsonify(
                 api_response(
@@ -153,13 +208,26 @@ class LogoutAPI(MethodView):
     API endpoint for user logout.
     """
 
-    @login_required
     def post(self):
         """
         Handle POST requests for user logout.
+
+        The user is identified by their access token, or in stateful mode
+        by their session. The access token is revoked.
         """
+        # Token errors are answered by the JWT manager's handlers.
+        verify_jwt_in_request(optional=True)
+        stateless = current_app.config["AUTH_STATELESS"]
+        if get_jwt_identity() is None and (
+            stateless or not current_user.is_authenticated
+        ):
+            return jsonify(api_response(401, "Authentication required")), 401
         try:
-            logout_user()
+            if not stateless:
+                logout_user()
+            if "jti" in (claims := get_jwt()):
+                revoke_token(claims)
+                db.session.commit()
             return jsonify(api_response(200, "Logged out successfully")), 200
         except Exception as e:
             return jsonify(api_response(500, str(e))), 500
@@ -208,3 +276,25 @@ class ProtectedAPI(MethodView):
             return jsonify(api_response(200, f"Hello, {current_user.username}!")), 200
         except Exception as e:
             return jsonify(api_response(500, str(e))), 500
+
+
+class IdentityCacheStatsAPI(MethodView):
+    """
+    API endpoint exposing the identity cache counters of the serving worker.
+    """
+
+    @jwt_required
+    def get(self, current_user):
+        """
+        Return the hit, miss and eviction counters and hit ratio of the identity cache.
+        """
+        return (
+            jsonify(
+                api_response(
+                    200,
+                    "Cache statistics retrieved",
+                    data=get_identity_cache().stats(),
+                )
+            ),
+            200,
+        )
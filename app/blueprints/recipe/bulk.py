@@ -0,0 +1,207 @@
+from flask import current_app
+
+from app.blueprints.recipe.changes import (
+    RECIPE_DELETED,
+    RECIPE_INSERTED,
+    mark_recipes_changed,
+)
+from app.blueprints.recipe.ingredients import get_or_create_ingredients
+from app.blueprints.recipe.schema import validate_recipe
+from app.blueprints.recipe.utils import unit_of_work
+from app.extensions import db
+from app.models import Recipe, RecipeIngredient
+
+# Rows written per multi-row INSERT statement.
+INSERT_BATCH_SIZE = 1000
+
+
+def insert_rows(table, rows):
+    """
+    Insert rows into a table with multi-row ``INSERT ... VALUES`` statements.
+
+    Returns:
+        list: The rows and the result of each statement, as pairs.
+    """
+    batches = [
+        rows[start : start + INSERT_BATCH_SIZE]
+        for start in range(0, len(rows), INSERT_BATCH_SIZE)
+    ]
+    return [
+        (batch, db.session.execute(table.insert().values(batch))) for batch in batches
+    ]
+
+
+def insert_returning_ids(model, rows):
+    """
+    Insert rows of a model and return their generated IDs, in order.
+
+    On databases supporting ``INSERT ... RETURNING`` the rows are inserted
+    with batched multi-row statements returning the IDs. Elsewhere they are
+    inserted with multi-row ``VALUES`` statements and the IDs derived from
+    the cursor's ``lastrowid``: InnoDB gives the rows of an insert of a known
+    number of rows consecutive IDs (spaced by ``auto_increment_increment``)
+    in its consecutive and interleaved lock modes, and reports the first;
+    SQLite numbers them in order and reports the last.
+
+    Args:
+        model (type): The model to insert into.
+        rows (list): The column values of each row.
+
+    Returns:
+        list: The IDs of the inserted rows, in the order of ``rows``.
+    """
+    if not rows:
+        return []
+    dialect = db.session.get_bind().dialect
+    if dialect.insert_returning:
+        return list(
+            db.session.scalars(
+                db.insert(model).returning(model.id, sort_by_parameter_order=True),
+                rows,
+            )
+        )
+    step = 1
+    if dialect.name == "mysql":
+        step = db.session.scalar(db.text("SELECT @@auto_increment_increment"))
+    ids = []
+    for batch, result in insert_rows(model.__table__, rows):
+        first = result.lastrowid
+        if dialect.name != "mysql":
+            first -= (len(batch) - 1) * step
+        ids.extend(range(first, first + len(batch) * step, step))
+    return ids
+
+
+def create_recipes(recipes, user_id):
+    """
+    Insert a chunk of validated recipes with set-based statements.
+
+    Recipes and ``recipe_ingredient`` rows are written with multi-row
+    statements and ingredients resolved through the catalog in one lookup.
+    The caller commits.
+
+    Args:
+        recipes (list): The validated recipe dicts.
+        user_id (int): The ID of the owner of the recipes.
+
+    Returns:
+        list: The IDs of the created recipes, in order.
+    """
+    recipe_ids = insert_returning_ids(
+        Recipe,
+        [
+            {
+                "title": data["title"],
+                "description": data["description"],
+                "instructions": data.get("instructions"),
+                "user_id": user_id,
+            }
+            for data in recipes
+        ],
+    )
+    ingredient_ids = get_or_create_ingredients(
+        ingredient["name"] for data in recipes for ingredient in data["ingredients"]
+    )
+    insert_rows(
+        RecipeIngredient.__table__,
+        [
+            {
+                "recipe_id": recipe_id,
+                "ingredient_id": ingredient_ids[ingredient["name"]],
+                "quantity": ingredient["quantity"],
+            }
+            for recipe_id, data in zip(recipe_ids, recipes)
+            for ingredient in data["ingredients"]
+        ],
+    )
+    mark_recipes_changed(recipe_ids, RECIPE_INSERTED)
+    return recipe_ids
+
+
+def bulk_create_recipes(items, user_id):
+    """
+    Validate and create many recipes, committing one chunk at a time.
+
+    Every item is validated before anything is written; invalid items are
+    skipped and the valid ones inserted in chunks of ``BULK_CHUNK_SIZE``,
+    each in its own transaction. A chunk that fails is rolled back without
+    affecting the others.
+
+    Args:
+        items (list): The submitted recipes.
+        user_id (int): The ID of the owner of the recipes.
+
+    Returns:
+        list: One result dict per item, in order, holding its ``index``,
+            HTTP-like ``status`` and either the created ``id`` or a ``message``
+            (with every validation error in ``errors`` for invalid items).
+    """
+    results = []
+    valid = []
+    for index, data in enumerate(items):
+        if errors := validate_recipe(data):
+            results.append(
+                {
+                    "index": index,
+                    "status": 400,
+                    "message": errors[0]["message"],
+                    "errors": errors,
+                }
+            )
+        else:
+            results.append({"index": index, "status": 201})
+            valid.append(index)
+
+    chunk_size = current_app.config["BULK_CHUNK_SIZE"]
+    for start in range(0, len(valid), chunk_size):
+        chunk = valid[start : start + chunk_size]
+        try:
+            with unit_of_work():
+                recipe_ids = create_recipes([items[index] for index in chunk], user_id)
+        except Exception as e:
+            current_app.logger.error(f"Error creating recipes: {str(e)}")
+            for index in chunk:
+                results[index].update(status=500, message="Internal server error")
+            continue
+        for index, recipe_id in zip(chunk, recipe_ids):
+            results[index]["id"] = recipe_id
+    return results
+
+
+def delete_recipes(condition, chunk_size=None):
+    """
+    Delete the recipes matching a condition with set-based statements.
+
+    Recipes are deleted by ID in chunks of ``chunk_size``, each chunk in its
+    own short transaction; their ingredient links are removed by the
+    database's ``ON DELETE CASCADE``. Nothing is loaded but the IDs of the
+    current chunk, so memory use does not grow with the number of recipes.
+
+    Args:
+        condition: A SQL expression selecting the recipes to delete.
+        chunk_size (int, optional): The recipes deleted per transaction.
+            Defaults to ``BULK_CHUNK_SIZE``.
+
+    Yields:
+        list: The IDs deleted by each chunk, once it has committed.
+    """
+    if chunk_size is None:
+        chunk_size = current_app.config["BULK_CHUNK_SIZE"]
+    last_id = 0
+    while True:
+        with unit_of_work() as session:
+            recipe_ids = session.scalars(
+                db.select(Recipe.id)
+                .where(condition, Recipe.id > last_id)
+                .order_by(Recipe.id)
+                .limit(chunk_size)
+            ).all()
+            if recipe_ids:
+                session.execute(
+                    Recipe.__table__.delete().where(Recipe.id.in_(recipe_ids))
+                )
+                mark_recipes_changed(recipe_ids, RECIPE_DELETED, session)
+        if not recipe_ids:
+            return
+        yield recipe_ids
+        last_id = recipe_ids[-1]
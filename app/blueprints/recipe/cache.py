@@ -0,0 +1,291 @@
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+from app.blueprints.recipe.outbox import subscribe
+from app.blueprints.recipe.utils import (
+    DEFAULT_FIELDS,
+    project_recipe,
+    serialize_recipes,
+)
+from app.extensions import db
+from app.models import Recipe
+
+
+class SharedCacheClient:
+    """
+    Interface of the optional shared cache tier, such as a Redis client wrapper.
+
+    Values are JSON-serializable dicts; keys are strings.
+    """
+
+    def get_many(self, keys):
+        """
+        Return a dict of the values found for the given keys.
+        """
+        raise NotImplementedError
+
+    def set_many(self, mapping, ttl):
+        """
+        Store several values, expiring after ``ttl`` seconds.
+        """
+        raise NotImplementedError
+
+    def delete_many(self, keys):
+        """
+        Delete several keys.
+        """
+        raise NotImplementedError
+
+
+class LocalSharedCache(SharedCacheClient):
+    """
+    In-process stand-in for a shared cache, for tests and single-worker setups.
+    """
+
+    def __init__(self):
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        with self._lock:
+            found = {}
+            for key in keys:
+                entry = self._values.get(key)
+                if entry is not None and entry[1] > now:
+                    found[key] = entry[0]
+            return found
+
+    def set_many(self, mapping, ttl):
+        expires_at = time.monotonic() + ttl
+        with self._lock:
+            for key, value in mapping.items():
+                self._values[key] = (value, expires_at)
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._values.pop(key, None)
+
+
+class RecipeCache:
+    """
+    Two-tier cache of serialized recipe documents keyed by recipe ID.
+
+    The first tier is a bounded in-process LRU; the optional second tier is a
+    `SharedCacheClient` shared between workers. Cached entries are dicts
+    holding the recipe's ``version`` and its serialized ``data``.
+    """
+
+    def __init__(self, max_entries, ttl, shared=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.shared = shared
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(recipe_id):
+        return f"recipe:{recipe_id}"
+
+    def get_many(self, recipe_ids):
+        """
+        Look up cached documents.
+
+        Args:
+            recipe_ids (Iterable[int]): The IDs to look up.
+
+        Returns:
+            dict: A mapping of recipe ID to cached entry, for the IDs found.
+        """
+        found, missing = {}, []
+        now = time.monotonic()
+        with self._lock:
+            for recipe_id in recipe_ids:
+                entry = self._entries.get(recipe_id)
+                if entry is not None and entry[1] > now:
+                    self._entries.move_to_end(recipe_id)
+                    found[recipe_id] = entry[0]
+                else:
+                    missing.append(recipe_id)
+            self.hits += len(found)
+
+        if missing and self.shared is not None:
+            shared = self.shared.get_many([self._key(rid) for rid in missing])
+            promoted = {
+                rid: shared[self._key(rid)]
+                for rid in missing
+                if self._key(rid) in shared
+            }
+            if promoted:
+                self._store(promoted)
+                found.update(promoted)
+                missing = [rid for rid in missing if rid not in promoted]
+            with self._lock:
+                self.shared_hits += len(promoted)
+
+        with self._lock:
+            self.misses += len(missing)
+        return found
+
+    def set_many(self, entries):
+        """
+        Store documents in both tiers.
+
+        Args:
+            entries (dict): A mapping of recipe ID to ``{"version", "data"}`` dicts.
+        """
+        if not entries:
+            return
+        self._store(entries)
+        if self.shared is not None:
+            self.shared.set_many(
+                {self._key(rid): entry for rid, entry in entries.items()}, self.ttl
+            )
+
+    def _store(self, entries):
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            for recipe_id, entry in entries.items():
+                self._entries[recipe_id] = (entry, expires_at)
+                self._entries.move_to_end(recipe_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, recipe_ids):
+        """
+        Drop documents from both tiers.
+        """
+        recipe_ids = list(recipe_ids)
+        with self._lock:
+            for recipe_id in recipe_ids:
+                self._entries.pop(recipe_id, None)
+        if self.shared is not None and recipe_ids:
+            self.shared.delete_many([self._key(rid) for rid in recipe_ids])
+
+    def stats(self):
+        """
+        Return the cache's counters.
+        """
+        with self._lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": (
+                    (self.hits + self.shared_hits) / lookups if lookups else None
+                ),
+            }
+
+
+def get_recipe_cache():
+    """
+    Return the recipe cache of the current application, creating it on first use.
+
+    Returns:
+        RecipeCache | None: The cache, or None if ``RECIPE_CACHE_ENABLED`` is off.
+    """
+    if not current_app.config["RECIPE_CACHE_ENABLED"]:
+        return None
+    cache = current_app.extensions.get("recipe_cache")
+    if cache is None:
+        shared = current_app.config["RECIPE_CACHE_SHARED"]
+        if shared == "local":
+            shared = LocalSharedCache()
+        cache = current_app.extensions.setdefault(
+            "recipe_cache",
+            RecipeCache(
+                max_entries=current_app.config["RECIPE_CACHE_MAX_ENTRIES"],
+                ttl=current_app.config["RECIPE_CACHE_TTL"],
+                shared=shared,
+            ),
+        )
+    return cache
+
+
+def cached_recipe(recipe_id):
+    """
+    Return the cached entry of a recipe, or None on a miss.
+
+    The entry's version is checked against the recipe's current one, read by
+    primary key: a reader that loaded the recipe before a write may fill the
+    cache after the writer's invalidation, leaving an outdated entry behind.
+    Such an entry counts as a miss and is dropped.
+    """
+    cache = get_recipe_cache()
+    if cache is None:
+        return None
+    cached = cache.get_many([recipe_id]).get(recipe_id)
+    if cached is None:
+        return None
+    version = db.session.query(Recipe.version).filter_by(id=recipe_id).scalar()
+    if cached["version"] != version:
+        cache.invalidate([recipe_id])
+        return None
+    return cached
+
+
+def get_recipe_documents(recipes, lookup=True, fields=DEFAULT_FIELDS):
+    """
+    Serialize recipes, reusing cached documents of unchanged recipes.
+
+    Cached documents are only used if their version matches the loaded
+    recipe's: an entry may be outdated, refilled by a reader that raced a
+    write and its invalidation. The ingredients of all other recipes are
+    loaded with one query and the results cached.
+    Only full documents are cached: a request for a subset of the default
+    fields is answered from the cache where possible, but its misses are
+    serialized without caching them.
+
+    Args:
+        recipes (Iterable[Recipe]): The recipes to serialize.
+        lookup (bool): Whether to look the recipes up in the cache; pass False
+            when the caller already missed it.
+        fields (frozenset): The fields to include, as returned by `parse_fields`.
+
+    Returns:
+        list: The serialized recipes, in the order given.
+    """
+    recipes = list(recipes)
+    cache = get_recipe_cache()
+    if cache is None or not fields <= DEFAULT_FIELDS:
+        return serialize_recipes(recipes, fields)
+
+    cached = cache.get_many(recipe.id for recipe in recipes) if lookup else {}
+    documents = {
+        recipe.id: project_recipe(cached[recipe.id]["data"], fields)
+        for recipe in recipes
+        if recipe.id in cached and cached[recipe.id]["version"] == recipe.version
+    }
+    missing = [recipe for recipe in recipes if recipe.id not in documents]
+    if missing:
+        loaded = dict(
+            zip((recipe.id for recipe in missing), serialize_recipes(missing, fields))
+        )
+        if fields == DEFAULT_FIELDS:
+            cache.set_many(
+                {
+                    recipe.id: {"version": recipe.version, "data": loaded[recipe.id]}
+                    for recipe in missing
+                }
+            )
+        documents.update(loaded)
+    return [documents[recipe.id] for recipe in recipes]
+
+
+@subscribe
+def _invalidate_changed_recipes(session, changes):
+    if (cache := current_app.extensions.get("recipe_cache")) is not None:
+        cache.invalidate(changes)
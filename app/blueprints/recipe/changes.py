@@ -0,0 +1,243 @@
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import event, inspect
+
+from app.extensions import db
+from app.models import Ingredient, Recipe, RecipeIngredient, User
+
+RECIPE_INSERTED = "insert"
+RECIPE_UPDATED = "update"
+RECIPE_DELETED = "delete"
+
+# Recipes whose version is bumped per statement.
+VERSION_BATCH_SIZE = 500
+
+_before_commit_hooks = []
+_after_commit_hooks = []
+
+
+def before_commit(fn):
+    """
+    Register a hook run inside the transaction just before it commits.
+
+    Hooks receive the session and a mapping of changed recipe IDs to the
+    operation applied to them, and may write to the database; their writes
+    commit or roll back together with the recipe changes.
+    """
+    _before_commit_hooks.append(fn)
+    return fn
+
+
+def after_commit(fn):
+    """
+    Register a hook run once a transaction that changed recipes has committed.
+
+    Hooks receive the session and the mapping of changed recipe IDs to
+    operations. They run outside the transaction, so they must not write to
+    the database; data they need from it should be gathered by a
+    `before_commit` hook and handed over with `pending`.
+    """
+    _after_commit_hooks.append(fn)
+    return fn
+
+
+def pending(session):
+    """
+    Return a per-transaction dict for passing data between commit hooks.
+
+    Its contents are discarded once the transaction commits or rolls back.
+    """
+    return session.info.setdefault("recipe_pending", {})
+
+
+def mark_recipes_changed(recipe_ids, op=RECIPE_UPDATED, session=None, bumped=False):
+    """
+    Record recipes changed by statements the ORM does not track.
+
+    Writes made through the ORM are picked up automatically; bulk Core
+    statements must report the recipes they touched with this function.
+
+    Args:
+        recipe_ids (Iterable[int]): The IDs of the changed recipes.
+        op (str): `RECIPE_INSERTED`, `RECIPE_UPDATED` or `RECIPE_DELETED`.
+        session (Session, optional): The session the statements ran in.
+            Defaults to the application's scoped session.
+        bumped (bool): Whether the statements already incremented the
+            recipes' version, so it is not incremented again on commit.
+    """
+    session = session if session is not None else db.session()
+    recipe_ids = list(recipe_ids)
+    if bumped:
+        session.info.setdefault("recipe_bumped", set()).update(recipe_ids)
+    _record(session, recipe_ids, op)
+
+
+def merge_changes(changes, recipe_ids, op):
+    """
+    Fold an operation on recipes into a mapping of recipe IDs to operations.
+
+    The mapping keeps the net effect of successive operations: a recipe
+    keeps its first operation unless it is deleted, and one both inserted
+    and deleted is dropped.
+
+    Args:
+        changes (dict): The mapping to update.
+        recipe_ids (Iterable[int]): The IDs of the changed recipes.
+        op (str): `RECIPE_INSERTED`, `RECIPE_UPDATED` or `RECIPE_DELETED`.
+    """
+    for recipe_id in recipe_ids:
+        previous = changes.get(recipe_id)
+        if previous == RECIPE_INSERTED and op == RECIPE_DELETED:
+            # Created and deleted since: nothing to report.
+            del changes[recipe_id]
+        elif previous is None or op == RECIPE_DELETED:
+            changes[recipe_id] = op
+
+
+def claim_recipe(recipe, session=None):
+    """
+    Write a loaded recipe's row at once, conditional on its loaded version.
+
+    Recipes are versioned by the ORM, so the UPDATE only matches if no other
+    transaction changed the recipe since it was loaded; otherwise it raises
+    `StaleDataError` without locking anything. Once it succeeds the row stays
+    locked until commit, so concurrent writers of the same recipe's
+    ingredients cannot interleave. Call it before writing the ingredients.
+
+    Args:
+        recipe (Recipe): The recipe, with any column changes already applied.
+        session (Session, optional): The session the recipe belongs to.
+            Defaults to the application's scoped session.
+    """
+    session = session if session is not None else db.session()
+    if not session.is_modified(recipe, include_collections=False):
+        recipe.updated_at = datetime.utcnow()
+    session.flush()
+
+
+def _record(session, recipe_ids, op):
+    merge_changes(session.info.setdefault("recipe_changes", {}), recipe_ids, op)
+
+
+@before_commit
+def _bump_versions(session, changes):
+    # The ORM bumps the versions of the recipes whose columns it updates;
+    # this covers the ones changed through their ingredients or by Core
+    # statements.
+    bumped = session.info.get("recipe_bumped", ())
+    updated = [
+        rid for rid, op in changes.items() if op == RECIPE_UPDATED and rid not in bumped
+    ]
+    for start in range(0, len(updated), VERSION_BATCH_SIZE):
+        session.execute(
+            Recipe.__table__.update()
+            .where(Recipe.id.in_(updated[start : start + VERSION_BATCH_SIZE]))
+            .values(version=Recipe.version + 1)
+        )
+
+
+@event.listens_for(db.session, "before_flush")
+def _track_deleted_users(session, flush_context, instances):
+    # The database deletes the recipes of deleted users without the ORM
+    # loading them, so record their IDs while the rows still exist.
+    user_ids = [obj.id for obj in session.deleted if isinstance(obj, User)]
+    if user_ids:
+        recipe_ids = session.scalars(
+            db.select(Recipe.id).where(Recipe.user_id.in_(user_ids))
+        )
+        _record(session, recipe_ids, RECIPE_DELETED)
+
+
+@event.listens_for(db.session, "before_flush")
+def _track_versioned_updates(session, flush_context, instances):
+    bumped = [
+        obj.id
+        for obj in session.dirty
+        if isinstance(obj, Recipe)
+        and session.is_modified(obj, include_collections=False)
+    ]
+    if bumped:
+        session.info.setdefault("recipe_bumped", set()).update(bumped)
+
+
+@event.listens_for(db.session, "after_flush")
+def _track_flushed_changes(session, flush_context):
+    inserted, updated, deleted = set(), set(), set()
+    for obj in session.new:
+        if isinstance(obj, Recipe):
+            inserted.add(obj.id)
+        elif isinstance(obj, RecipeIngredient):
+            updated.add(obj.recipe_id)
+        elif isinstance(obj, Ingredient):
+            updated.update(recipe.id for recipe in obj.__dict__.get("recipes", ()))
+    for obj in session.dirty:
+        if isinstance(obj, Recipe):
+            updated.add(obj.id)
+        elif isinstance(obj, RecipeIngredient):
+            updated.add(obj.recipe_id)
+        elif (
+            isinstance(obj, Ingredient)
+            and inspect(obj).attrs.name.history.has_changes()
+        ):
+            session.info.setdefault("renamed_ingredients", set()).add(obj.id)
+    for obj in session.deleted:
+        if isinstance(obj, Recipe):
+            deleted.add(obj.id)
+        elif isinstance(obj, RecipeIngredient):
+            updated.add(obj.recipe_id)
+
+    _record(session, inserted, RECIPE_INSERTED)
+    _record(session, updated - inserted - deleted, RECIPE_UPDATED)
+    _record(session, deleted, RECIPE_DELETED)
+
+
+@event.listens_for(db.session, "before_commit")
+def _run_before_commit_hooks(session):
+    # Flush first so pending ORM changes are tracked before the hooks run.
+    if session.new or session.dirty or session.deleted:
+        session.flush()
+    if not session.info.get("recipe_changes") and not session.info.get(
+        "renamed_ingredients"
+    ):
+        return
+
+    if renamed := session.info.pop("renamed_ingredients", None):
+        recipe_ids = session.execute(
+            db.select(RecipeIngredient.recipe_id)
+            .where(RecipeIngredient.ingredient_id.in_(renamed))
+            .distinct()
+        ).scalars()
+        _record(session, recipe_ids, RECIPE_UPDATED)
+
+    changes = session.info.get("recipe_changes", {})
+    for hook in _before_commit_hooks:
+        hook(session, changes)
+
+
+@event.listens_for(db.session, "after_commit")
+def _run_after_commit_hooks(session):
+    changes = session.info.get("recipe_changes")
+    try:
+        if not changes:
+            return
+        for hook in _after_commit_hooks:
+            try:
+                hook(session, changes)
+            except Exception as e:
+                current_app.logger.error(f"Error in recipe change hook: {str(e)}")
+    finally:
+        _discard_changes(session)
+
+
+@event.listens_for(db.session, "after_soft_rollback")
+def _discard_rolled_back_changes(session, previous_transaction):
+    if not session.in_transaction():
+        _discard_changes(session)
+
+
+def _discard_changes(session):
+    session.info.pop("recipe_changes", None)
+    session.info.pop("renamed_ingredients", None)
+    session.info.pop("recipe_pending", None)
+    session.info.pop("recipe_bumped", None)
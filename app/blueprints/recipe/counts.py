@@ -0,0 +1,189 @@
+import threading
+import time
+from collections import Counter
+
+from flask import current_app
+from sqlalchemy import text
+
+from app.blueprints.recipe.changes import RECIPE_DELETED, RECIPE_INSERTED
+from app.blueprints.recipe.outbox import subscribe
+from app.extensions import db
+from app.models import Recipe
+
+COUNT_EXACT = "exact"
+COUNT_CACHED = "cached"
+COUNT_ESTIMATED = "estimated"
+
+# Values accepted by the ``count`` query parameter of the recipe list.
+COUNT_MODES = ("cached", "exact", "estimate")
+
+
+def normalize_filter(search, match="fulltext"):
+    """
+    Normalize a search term into a count cache key.
+
+    Searches are case-insensitive, so terms differing only in case or
+    surrounding whitespace share a key. The unfiltered listing uses "".
+
+    Args:
+        search (str | None): The search term of the request.
+        match (str): The match mode the term was searched with.
+
+    Returns:
+        str: The cache key.
+    """
+    key = " ".join((search or "").lower().split())
+    if key and match != "fulltext":
+        key = f"{match}:{key}"
+    return key
+
+
+class RecipeCountCache:
+    """
+    Bounded, TTL-expiring cache of recipe listing totals keyed by search filter.
+    """
+
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Return the cached total for a filter key, or None on a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            total, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            return total
+
+    def set(self, key, total):
+        """
+        Store the total for a filter key.
+        """
+        with self._lock:
+            if key not in self._entries and len(self._entries) >= self.max_entries:
+                # Drop the entry closest to expiry to make room.
+                oldest = min(self._entries, key=lambda k: self._entries[k][1])
+                del self._entries[oldest]
+            self._entries[key] = (total, time.monotonic() + self.ttl)
+
+    def record_write(self, created=0, deleted=0):
+        """
+        Update the cache after recipes were written.
+
+        The unfiltered total is adjusted in place by the number of created and
+        deleted recipes. Filtered totals cannot be adjusted without knowing
+        which filters the written recipes match, so they are dropped.
+
+        Args:
+            created (int): The number of recipes inserted.
+            deleted (int): The number of recipes deleted.
+        """
+        with self._lock:
+            unfiltered = self._entries.get("")
+            self._entries.clear()
+            if unfiltered is not None:
+                total, expires_at = unfiltered
+                self._entries[""] = (max(total + created - deleted, 0), expires_at)
+
+    def clear(self):
+        """
+        Drop every cached total.
+        """
+        with self._lock:
+            self._entries.clear()
+
+
+def get_count_cache():
+    """
+    Return the count cache of the current application, creating it on first use.
+    """
+    cache = current_app.extensions.get("recipe_count_cache")
+    if cache is None:
+        cache = current_app.extensions.setdefault(
+            "recipe_count_cache",
+            RecipeCountCache(
+                ttl=current_app.config["COUNT_CACHE_TTL"],
+                max_entries=current_app.config["COUNT_CACHE_MAX_ENTRIES"],
+            ),
+        )
+    return cache
+
+
+@subscribe
+def _count_changed_recipes(session, changes):
+    if (cache := current_app.extensions.get("recipe_count_cache")) is not None:
+        ops = Counter(changes.values())
+        cache.record_write(created=ops[RECIPE_INSERTED], deleted=ops[RECIPE_DELETED])
+
+
+def estimate_recipe_count():
+    """
+    Read the planner's row estimate for the recipe table.
+
+    Returns:
+        int | None: The estimated number of recipes, or None if the dialect
+            has no cheap estimate or the table has never been analyzed.
+    """
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "postgresql":
+        estimate = db.session.execute(
+            text(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = 'recipe'::regclass"
+            )
+        ).scalar()
+    elif dialect == "mysql":
+        estimate = db.session.execute(
+            text(
+                "SELECT TABLE_ROWS FROM information_schema.TABLES "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'recipe'"
+            )
+        ).scalar()
+    else:
+        return None
+
+    if estimate is None or estimate < 0:
+        return None
+    return int(estimate)
+
+
+def count_recipes(query, search, mode="cached", match="fulltext"):
+    """
+    Compute the total number of recipes matched by a listing query.
+
+    Args:
+        query (Query): The filtered recipe query.
+        search (str | None): The search term the query was filtered by.
+        mode (str): One of `COUNT_MODES`. ``exact`` always runs ``COUNT(*)``,
+            ``cached`` serves the total from the count cache when possible and
+            ``estimate`` uses the planner estimate for unfiltered listings.
+        match (str): The match mode the term was searched with.
+
+    Returns:
+        tuple: The total and how it was obtained (`COUNT_EXACT`,
+            `COUNT_CACHED` or `COUNT_ESTIMATED`).
+    """
+    key = normalize_filter(search, match)
+    cache = get_count_cache()
+
+    if mode == "estimate" and not key:
+        estimate = estimate_recipe_count()
+        if estimate is not None:
+            return estimate, COUNT_ESTIMATED
+
+    if mode != "exact":
+        total = cache.get(key)
+        if total is not None:
+            return total, COUNT_CACHED
+
+    # Count IDs only so the subquery does not select every recipe column.
+    total = query.with_entities(Recipe.id).order_by(None).count()
+    cache.set(key, total)
+    return total, COUNT_EXACT
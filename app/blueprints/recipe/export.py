@@ -0,0 +1,124 @@
+import json
+from datetime import datetime, timezone
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from app.blueprints.recipe.utils import load_ingredients
+from app.extensions import db
+from app.models import Recipe
+
+# Recipe columns written to every exported line.
+EXPORT_COLUMNS = (
+    Recipe.id,
+    Recipe.title,
+    Recipe.description,
+    Recipe.instructions,
+    Recipe.user_id,
+    Recipe.version,
+    Recipe.updated_at,
+)
+
+
+def parse_updated_since(value):
+    """
+    Parse an ISO 8601 updated-since marker into a naive UTC datetime.
+
+    Raises:
+        ValueError: If the value is not an ISO 8601 date or datetime.
+    """
+    marker = datetime.fromisoformat(value)
+    if marker.tzinfo is not None:
+        marker = marker.astimezone(timezone.utc).replace(tzinfo=None)
+    return marker
+
+
+def export_query(user_id=None, updated_since=None):
+    """
+    Build the statement selecting the recipes to export, in ID order.
+
+    Args:
+        user_id (int, optional): Only export the recipes of this user.
+        updated_since (datetime, optional): Only export recipes changed at or
+            after this time.
+
+    Returns:
+        Select: The statement.
+    """
+    query = db.select(*EXPORT_COLUMNS).order_by(Recipe.id)
+    if user_id is not None:
+        query = query.where(Recipe.user_id == user_id)
+    if updated_since is not None:
+        query = query.where(Recipe.updated_at >= updated_since)
+    return query
+
+
+def iter_export_lines(user_id=None, updated_since=None, batch_size=None):
+    """
+    Generate the recipe catalog as newline-delimited JSON.
+
+    Recipes are read through a server-side cursor on a dedicated connection,
+    ``batch_size`` rows at a time, and the ingredients of each batch are
+    loaded with one query on a second connection. Only one batch is held in
+    memory, whatever the size of the catalog.
+
+    Args:
+        user_id (int, optional): Only export the recipes of this user.
+        updated_since (datetime, optional): Only export recipes changed at or
+            after this time.
+        batch_size (int, optional): Rows per batch. Defaults to
+            ``EXPORT_BATCH_SIZE``.
+
+    Yields:
+        str: One JSON document per recipe, terminated by a newline.
+    """
+    batch_size = batch_size or current_app.config["EXPORT_BATCH_SIZE"]
+    query = export_query(user_id, updated_since)
+    with db.engine.connect() as connection, db.engine.connect() as lookups:
+        result = connection.execution_options(
+            stream_results=True, yield_per=batch_size
+        ).execute(query)
+        for rows in result.partitions():
+            ingredients = load_ingredients((row.id for row in rows), connection=lookups)
+            for row in rows:
+                document = {
+                    "id": row.id,
+                    "title": row.title,
+                    "description": row.description,
+                    "instructions": row.instructions,
+                    "user_id": row.user_id,
+                    "version": row.version,
+                    "updated_at": row.updated_at.isoformat(),
+                    "ingredients": ingredients[row.id],
+                }
+                yield json.dumps(document, separators=(",", ":")) + "\n"
+
+
+@click.command("export")
+@click.option("--user-id", type=int, help="Only export the recipes of this user.")
+@click.option(
+    "--updated-since",
+    help="Only export recipes changed at or after this ISO 8601 time.",
+)
+@click.option(
+    "--output",
+    "-o",
+    type=click.File("w"),
+    default="-",
+    help="File to write to (default: standard output).",
+)
+@with_appcontext
+def export_command(user_id, updated_since, output):
+    """
+    Export the recipe catalog as newline-delimited JSON.
+    """
+    if updated_since is not None:
+        try:
+            updated_since = parse_updated_since(updated_since)
+        except ValueError:
+            raise click.BadParameter(
+                "Expected an ISO 8601 time.", param_hint="--updated-since"
+            )
+    for line in iter_export_lines(user_id, updated_since):
+        output.write(line)
@@ -0,0 +1,255 @@
+import functools
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app, jsonify, request
+from flask.cli import with_appcontext
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models import IdempotencyKey
+from app.utils import api_response
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+# Response headers stored with the outcome of a request and replayed.
+STORED_HEADERS = ("ETag", "Location")
+
+# Longest key accepted, matching the column.
+MAX_KEY_LENGTH = 255
+
+# Expired keys deleted per statement by the purge command.
+PURGE_BATCH_SIZE = 1000
+
+
+class IdempotencyCache:
+    """
+    Bounded in-memory front of the idempotency key table.
+
+    Holds the outcome of completed requests by ``(user_id, key)`` until it
+    expires, so replays are answered without a database round trip.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id, key):
+        """
+        Return the cached ``(request_hash, status_code, response, headers)``, or None.
+        """
+        with self._lock:
+            entry = self._entries.get((user_id, key))
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                del self._entries[(user_id, key)]
+                return None
+            self._entries.move_to_end((user_id, key))
+            return entry[0]
+
+    def set(self, user_id, key, outcome, ttl):
+        """
+        Cache the outcome of a request for ``ttl`` seconds.
+        """
+        with self._lock:
+            self._entries[(user_id, key)] = (outcome, time.monotonic() + ttl)
+            self._entries.move_to_end((user_id, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+def get_idempotency_cache():
+    """
+    Return the idempotency cache of the current application, creating it on first use.
+    """
+    cache = current_app.extensions.get("idempotency_cache")
+    if cache is None:
+        cache = current_app.extensions.setdefault(
+            "idempotency_cache",
+            IdempotencyCache(current_app.config["IDEMPOTENCY_CACHE_MAX_ENTRIES"]),
+        )
+    return cache
+
+
+def request_fingerprint():
+    """
+    Hash the method, path and body of the current request.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{request.method} {request.path}\n".encode())
+    digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+def _replay(outcome):
+    _, status_code, body, headers = outcome
+    response = current_app.response_class(
+        body, status=status_code, headers=headers, mimetype="application/json"
+    )
+    response.headers[REPLAYED_HEADER] = "true"
+    return response
+
+
+def _key_reused():
+    message = f"{IDEMPOTENCY_HEADER} reused for a different request"
+    return jsonify(api_response(422, message)), 422
+
+
+def _claim(user_id, key, request_hash, ttl):
+    """
+    Insert the placeholder row of a request, committing it at once.
+
+    Returns:
+        IdempotencyKey | None: None if the key was claimed, otherwise the
+            existing row.
+    """
+    now = datetime.utcnow()
+    for _ in range(2):
+        db.session.add(
+            IdempotencyKey(
+                user_id=user_id,
+                key=key,
+                request_hash=request_hash,
+                expires_at=now + timedelta(seconds=ttl),
+            )
+        )
+        try:
+            db.session.commit()
+            return None
+        except IntegrityError:
+            db.session.rollback()
+        existing = db.session.get(IdempotencyKey, (user_id, key))
+        if existing is None or existing.expires_at > now:
+            return existing
+        # The previous use expired: take the key over.
+        db.session.delete(existing)
+        db.session.commit()
+    return db.session.get(IdempotencyKey, (user_id, key))
+
+
+def _release(user_id, key):
+    """
+    Delete the placeholder row of a request that failed, so it can be retried.
+    """
+    db.session.rollback()
+    if (row := db.session.get(IdempotencyKey, (user_id, key))) is not None:
+        db.session.delete(row)
+        db.session.commit()
+
+
+def idempotent(view):
+    """
+    Make a write view honour the ``Idempotency-Key`` request header.
+
+    The first request with a key claims it by inserting a placeholder row,
+    so a concurrent duplicate gets a 409 instead of running the write again.
+    Once the view has answered, its response and `STORED_HEADERS` are stored
+    in the row and in an in-memory front; retries with the same key and
+    request replay them, while reusing the key for a different request gets
+    a 422. Server errors and exceptions raised by the view release the key
+    so the request can be retried. Requests without the
+    header are passed through.
+    """
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if key is None:
+            return view(*args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return jsonify(api_response(400, f"Invalid {IDEMPOTENCY_HEADER}")), 400
+
+        user_id = int(get_jwt_identity())
+        request_hash = request_fingerprint()
+        ttl = current_app.config["IDEMPOTENCY_TTL"]
+        cache = get_idempotency_cache()
+
+        outcome = cache.get(user_id, key)
+        if outcome is None:
+            existing = _claim(user_id, key, request_hash, ttl)
+            if existing is not None:
+                if existing.request_hash != request_hash:
+                    return _key_reused()
+                if existing.status_code is None:
+                    message = "A request with this key is still in progress"
+                    return jsonify(api_response(409, message)), 409
+                outcome = (
+                    request_hash,
+                    existing.status_code,
+                    existing.response,
+                    existing.headers,
+                )
+                cache.set(user_id, key, outcome, ttl)
+        if outcome is not None:
+            if outcome[0] != request_hash:
+                return _key_reused()
+            return _replay(outcome)
+
+        try:
+            response = current_app.make_response(view(*args, **kwargs))
+        except Exception:
+            _release(user_id, key)
+            raise
+        if response.status_code >= 500:
+            _release(user_id, key)
+            return response
+        db.session.rollback()
+        row = db.session.get(IdempotencyKey, (user_id, key))
+        if row is None:
+            return response
+        row.status_code = response.status_code
+        row.response = response.get_data(as_text=True)
+        row.headers = {
+            name: response.headers[name]
+            for name in STORED_HEADERS
+            if name in response.headers
+        }
+        outcome = (request_hash, row.status_code, row.response, row.headers)
+        db.session.commit()
+        # Only remembered in memory once it is stored in the table.
+        cache.set(user_id, key, outcome, ttl)
+        return response
+
+    return wrapper
+
+
+def purge_expired_keys(batch_size=PURGE_BATCH_SIZE):
+    """
+    Delete expired idempotency keys in batches.
+
+    Returns:
+        int: The number of keys deleted.
+    """
+    table = IdempotencyKey.__table__
+    now = datetime.utcnow()
+    deleted = 0
+    while True:
+        expired = db.session.execute(
+            db.select(table.c.user_id, table.c.key)
+            .where(table.c.expires_at <= now)
+            .limit(batch_size)
+        ).all()
+        if not expired:
+            return deleted
+        db.session.execute(
+            table.delete().where(db.tuple_(table.c.user_id, table.c.key).in_(expired))
+        )
+        db.session.commit()
+        deleted += len(expired)
+
+
+@click.command("purge-idempotency-keys")
+@with_appcontext
+def purge_idempotency_keys_command():
+    """
+    Delete expired idempotency keys.
+    """
+    click.echo(f"Deleted {purge_expired_keys()} expired idempotency keys.")
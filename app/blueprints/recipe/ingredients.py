@@ -0,0 +1,257 @@
+import threading
+from collections import OrderedDict
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+from app.blueprints.recipe.changes import mark_recipes_changed
+from app.extensions import db
+from app.models import Ingredient, RecipeIngredient, normalize_ingredient_name
+
+# Normalized names looked up or upserted per statement.
+LOOKUP_BATCH_SIZE = 500
+
+
+class IngredientIdCache:
+    """
+    Bounded LRU mapping normalized ingredient names to catalog IDs.
+
+    Catalog entries are never deleted or renamed by the application, so an
+    entry stays valid once its ingredient is committed.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, names):
+        """
+        Return a dict of the IDs cached for the given normalized names.
+        """
+        found = {}
+        with self._lock:
+            for name in names:
+                if (ingredient_id := self._entries.get(name)) is not None:
+                    self._entries.move_to_end(name)
+                    found[name] = ingredient_id
+        return found
+
+    def set_many(self, ids):
+        """
+        Cache a mapping of normalized names to IDs, evicting the least recently used.
+        """
+        with self._lock:
+            for name, ingredient_id in ids.items():
+                self._entries[name] = ingredient_id
+                self._entries.move_to_end(name)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def get_ingredient_id_cache():
+    """
+    Return the ingredient ID cache of the current application, creating it on first use.
+    """
+    cache = current_app.extensions.get("ingredient_id_cache")
+    if cache is None:
+        cache = current_app.extensions.setdefault(
+            "ingredient_id_cache",
+            IngredientIdCache(current_app.config["INGREDIENT_CACHE_MAX_ENTRIES"]),
+        )
+    return cache
+
+
+def _upsert(session, rows):
+    """
+    Insert catalog rows, leaving existing ones alone.
+
+    Returns:
+        dict: The IDs of the rows by normalized name, if the database could
+            return them from the same statement; otherwise an empty dict.
+    """
+    table = Ingredient.__table__
+    dialect = session.get_bind().dialect
+    if dialect.name in ("postgresql", "sqlite"):
+        insert = (postgresql if dialect.name == "postgresql" else sqlite).insert
+        statement = insert(table).values(rows)
+        if not dialect.insert_returning:
+            session.execute(statement.on_conflict_do_nothing())
+            return {}
+        # A no-op update, unlike DO NOTHING, returns the conflicting rows too.
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.normalized_name],
+            set_={"normalized_name": statement.excluded.normalized_name},
+        ).returning(table.c.normalized_name, table.c.id)
+        return dict(session.execute(statement).all())
+    if dialect.name == "mysql":
+        statement = mysql.insert(table).values(rows)
+        session.execute(
+            statement.on_duplicate_key_update(
+                normalized_name=statement.inserted.normalized_name
+            )
+        )
+        return {}
+    session.execute(table.insert(), rows)
+    return {}
+
+
+def _lookup(session, names):
+    return dict(
+        session.execute(
+            db.select(Ingredient.normalized_name, Ingredient.id).where(
+                Ingredient.normalized_name.in_(names)
+            )
+        ).all()
+    )
+
+
+def get_or_create_ingredients(names, session=None):
+    """
+    Resolve ingredient names to catalog IDs, creating the missing ingredients.
+
+    Names are matched by their normalized form. Names not found in the ID
+    cache are resolved with one lookup, and the missing ones created with a
+    single dialect-native upsert (``ON CONFLICT`` / ``ON DUPLICATE KEY``), so
+    concurrent creations of the same ingredient do not fail. IDs are only
+    cached once the transaction commits.
+
+    Args:
+        names (Iterable[str]): The ingredient names, as submitted.
+        session (Session, optional): The session to write with. Defaults to
+            the application's scoped session.
+
+    Returns:
+        dict: A mapping of every given name to an ingredient ID.
+    """
+    session = session if session is not None else db.session()
+    normalized = {name: normalize_ingredient_name(name) for name in names}
+    ids = get_ingredient_id_cache().get_many(set(normalized.values()))
+
+    # The first spelling of a new ingredient becomes its display name.
+    spellings = {}
+    for name, key in normalized.items():
+        if key not in ids:
+            spellings.setdefault(key, name)
+    missing = list(spellings)
+
+    resolved = {}
+    for start in range(0, len(missing), LOOKUP_BATCH_SIZE):
+        batch = missing[start : start + LOOKUP_BATCH_SIZE]
+        found = _lookup(session, batch)
+        if new := [key for key in batch if key not in found]:
+            rows = [{"name": spellings[key], "normalized_name": key} for key in new]
+            created = _upsert(session, rows)
+            if len(created) < len(new):
+                created = _lookup(session, new)
+            found.update(created)
+        resolved.update(found)
+
+    if resolved:
+        ids.update(resolved)
+        session.info.setdefault("ingredient_ids", {}).update(resolved)
+    return {name: ids[key] for name, key in normalized.items()}
+
+
+def sync_recipe_ingredients(recipe_id, ingredients, session=None):
+    """
+    Make a recipe's ingredients match a requested list, writing only the difference.
+
+    The stored links are compared with the requested ones by catalog ID;
+    new links are inserted, changed quantities updated and dropped links
+    deleted, each kind with a single statement.
+
+    Args:
+        recipe_id (int): The ID of the recipe.
+        ingredients (list): The validated ``{"name", "quantity"}`` dicts.
+        session (Session, optional): The session to write with. Defaults to
+            the application's scoped session.
+
+    Returns:
+        dict: The names of the ``added``, ``updated`` and ``removed`` ingredients.
+    """
+    session = session if session is not None else db.session()
+    table = RecipeIngredient.__table__
+    stored = {
+        ingredient_id: (name, quantity)
+        for ingredient_id, name, quantity in session.execute(
+            db.select(
+                RecipeIngredient.ingredient_id,
+                Ingredient.name,
+                RecipeIngredient.quantity,
+            )
+            .join(Ingredient, RecipeIngredient.ingredient_id == Ingredient.id)
+            .where(RecipeIngredient.recipe_id == recipe_id)
+        )
+    }
+    ids = get_or_create_ingredients(
+        (ingredient["name"] for ingredient in ingredients), session
+    )
+    requested = {
+        ids[ingredient["name"]]: (ingredient["name"], ingredient["quantity"])
+        for ingredient in ingredients
+    }
+
+    added = [iid for iid in requested if iid not in stored]
+    updated = [
+        iid
+        for iid in requested
+        if iid in stored and stored[iid][1] != requested[iid][1]
+    ]
+    removed = [iid for iid in stored if iid not in requested]
+
+    if removed:
+        session.execute(
+            table.delete().where(
+                table.c.recipe_id == recipe_id, table.c.ingredient_id.in_(removed)
+            )
+        )
+    if updated:
+        session.execute(
+            table.update()
+            .where(
+                table.c.recipe_id == recipe_id,
+                table.c.ingredient_id == db.bindparam("iid"),
+            )
+            .values(quantity=db.bindparam("new_quantity")),
+            [{"iid": iid, "new_quantity": requested[iid][1]} for iid in updated],
+        )
+    if added:
+        session.execute(
+            table.insert(),
+            [
+                {
+                    "recipe_id": recipe_id,
+                    "ingredient_id": iid,
+                    "quantity": requested[iid][1],
+                }
+                for iid in added
+            ],
+        )
+    if added or updated or removed:
+        mark_recipes_changed([recipe_id], session=session)
+
+    return {
+        "added": [requested[iid][0] for iid in added],
+        "updated": [requested[iid][0] for iid in updated],
+        "removed": [stored[iid][0] for iid in removed],
+    }
+
+
+@event.listens_for(db.session, "after_commit")
+def _cache_committed_ids(session):
+    if (resolved := session.info.pop("ingredient_ids", None)) and (
+        cache := current_app.extensions.get("ingredient_id_cache")
+    ) is not None:
+        cache.set_many(resolved)
+
+
+@event.listens_for(db.session, "after_soft_rollback")
+def _discard_uncommitted_ids(session, previous_transaction):
+    if not session.in_transaction():
+        session.info.pop("ingredient_ids", None)
@@ -0,0 +1,226 @@
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from app.blueprints.recipe.changes import after_commit, before_commit, merge_changes
+from app.extensions import db
+from app.models import RecipeEvent
+
+# Old events deleted per statement by the purge command.
+PURGE_BATCH_SIZE = 1000
+
+_subscribers = []
+
+
+def subscribe(fn):
+    """
+    Register a subscriber to recipe change events.
+
+    Subscribers receive a session and a mapping of changed recipe IDs to
+    operations. Changes made by this process are delivered once per
+    transaction, right after it commits: the session is then outside any
+    transaction and must not be queried, but data gathered by a
+    `before_commit` hook is available through `pending`. Changes made by
+    other processes are delivered in batches by `OutboxDispatcher.poll`,
+    with a session the subscriber may read from.
+    """
+    _subscribers.append(fn)
+    return fn
+
+
+def _deliver(session, changes):
+    for subscriber in _subscribers:
+        try:
+            subscriber(session, changes)
+        except Exception as e:
+            current_app.logger.error(f"Error in recipe change subscriber: {str(e)}")
+
+
+class OutboxDispatcher:
+    """
+    Follows the recipe event outbox and replays other processes' changes.
+
+    Event IDs are read in increasing order from a cursor. An ID skipped by a
+    poll may belong to a transaction that had not committed yet, so skipped
+    IDs are looked up again on later polls until ``gap_timeout`` expires.
+    """
+
+    def __init__(self, last_id, poll_interval, batch_size, gap_timeout):
+        self.last_id = last_id
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.gap_timeout = gap_timeout
+        self._gaps = {}
+        self._next_poll = 0
+        self._lock = threading.Lock()
+        self._pid = None
+        self._origin = None
+
+    @property
+    def origin(self):
+        """
+        The identifier of this process written with its events.
+
+        It is renewed in forked workers, so workers of a preloading server
+        do not mistake each other's events for their own.
+        """
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._origin = uuid.uuid4().hex
+        return self._origin
+
+    def poll(self, session, force=False):
+        """
+        Deliver the events written by other processes since the last poll.
+
+        Args:
+            session (Session): The session to read events with.
+            force (bool): Whether to poll even if ``poll_interval`` has not
+                elapsed since the last poll.
+
+        Returns:
+            int: The number of recipes whose changes were delivered.
+        """
+        now = time.monotonic()
+        if (not force and now < self._next_poll) or not self._lock.acquire(False):
+            return 0
+        try:
+            self._next_poll = now + self.poll_interval
+            changes = self._read(session, now)
+        finally:
+            self._lock.release()
+        if changes:
+            _deliver(session, changes)
+        return len(changes)
+
+    def _read(self, session, now):
+        table = RecipeEvent.__table__
+        changes = {}
+        while True:
+            condition = table.c.id > self.last_id
+            if self._gaps:
+                condition = db.or_(condition, table.c.id.in_(list(self._gaps)))
+            rows = session.execute(
+                db.select(table.c.id, table.c.recipe_id, table.c.op, table.c.origin)
+                .where(condition)
+                .order_by(table.c.id)
+                .limit(self.batch_size)
+            ).all()
+            for event_id, recipe_id, op, origin in rows:
+                if event_id > self.last_id:
+                    skipped = range(
+                        max(self.last_id + 1, event_id - self.batch_size), event_id
+                    )
+                    self._gaps.update(dict.fromkeys(skipped, now + self.gap_timeout))
+                    self.last_id = event_id
+                self._gaps.pop(event_id, None)
+                if origin != self.origin:
+                    merge_changes(changes, [recipe_id], op)
+            if len(rows) < self.batch_size:
+                break
+        for event_id, expires_at in list(self._gaps.items()):
+            if expires_at <= now:
+                del self._gaps[event_id]
+        return changes
+
+
+def get_outbox_dispatcher():
+    """
+    Return the outbox dispatcher of the current application, creating it on first use.
+
+    A new dispatcher starts after the newest event, as state built from the
+    database at that point already reflects the earlier ones.
+    """
+    dispatcher = current_app.extensions.get("recipe_outbox")
+    if dispatcher is None:
+        last_id = db.session.scalar(db.select(db.func.max(RecipeEvent.id))) or 0
+        dispatcher = current_app.extensions.setdefault(
+            "recipe_outbox",
+            OutboxDispatcher(
+                last_id,
+                poll_interval=current_app.config["OUTBOX_POLL_INTERVAL"],
+                batch_size=current_app.config["OUTBOX_BATCH_SIZE"],
+                gap_timeout=current_app.config["OUTBOX_GAP_TIMEOUT"],
+            ),
+        )
+    return dispatcher
+
+
+def poll_outbox():
+    """
+    Catch up with other processes' recipe changes before handling a request.
+    """
+    try:
+        get_outbox_dispatcher().poll(db.session)
+    except Exception as e:
+        current_app.logger.error(f"Error polling the recipe outbox: {str(e)}")
+    finally:
+        # End the read transaction so the view starts from a fresh one.
+        db.session.rollback()
+
+
+@before_commit
+def _write_events(session, changes):
+    if not changes:
+        return
+    origin = get_outbox_dispatcher().origin
+    session.execute(
+        RecipeEvent.__table__.insert(),
+        [
+            {
+                "recipe_id": recipe_id,
+                "op": op,
+                "origin": origin,
+                "created_at": datetime.utcnow(),
+            }
+            for recipe_id, op in changes.items()
+        ],
+    )
+
+
+@after_commit
+def _deliver_committed_changes(session, changes):
+    _deliver(session, changes)
+
+
+def purge_events(retention=None, batch_size=PURGE_BATCH_SIZE):
+    """
+    Delete outbox events older than the retention period, in batches.
+
+    Args:
+        retention (int, optional): The age in seconds of the events to delete.
+            Defaults to ``OUTBOX_RETENTION``.
+        batch_size (int): The events deleted per statement.
+
+    Returns:
+        int: The number of events deleted.
+    """
+    if retention is None:
+        retention = current_app.config["OUTBOX_RETENTION"]
+    table = RecipeEvent.__table__
+    cutoff = datetime.utcnow() - timedelta(seconds=retention)
+    deleted = 0
+    while True:
+        expired = db.session.scalars(
+            db.select(table.c.id).where(table.c.created_at < cutoff).limit(batch_size)
+        ).all()
+        if not expired:
+            return deleted
+        db.session.execute(table.delete().where(table.c.id.in_(expired)))
+        db.session.commit()
+        deleted += len(expired)
+
+
+@click.command("purge-events")
+@with_appcontext
+def purge_events_command():
+    """
+    Delete old recipe change events.
+    """
+    click.echo(f"Deleted {purge_events()} recipe change events.")
@@ -0,0 +1,101 @@
+import base64
+import binascii
+import json
+
+from sqlalchemy import tuple_
+
+from app.models import Recipe
+
+# Orderings usable for keyset pagination, each backed by an index.
+KEYSET_ORDERINGS = {
+    "id": (Recipe.id,),
+}
+
+
+class InvalidCursor(ValueError):
+    """
+    Raised when a pagination cursor cannot be decoded.
+    """
+
+
+def encode_cursor(ordering, values):
+    """
+    Encode the sort key of the last row of a page into an opaque cursor.
+
+    Args:
+        ordering (str): The name of the ordering in `KEYSET_ORDERINGS`.
+        values (Sequence): The sort key values of the last row on the page.
+
+    Returns:
+        str: A URL-safe cursor string.
+    """
+    payload = json.dumps({"o": ordering, "k": list(values)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by `encode_cursor`.
+
+    Args:
+        cursor (str): The cursor sent by the client.
+
+    Returns:
+        tuple: The ordering name and the list of sort key values.
+
+    Raises:
+        InvalidCursor: If the cursor is malformed or names an unknown ordering.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        ordering, values = payload["o"], payload["k"]
+    except (binascii.Error, ValueError, TypeError, KeyError) as e:
+        raise InvalidCursor("Invalid cursor") from e
+
+    columns = KEYSET_ORDERINGS.get(ordering)
+    if columns is None or not isinstance(values, list) or len(values) != len(columns):
+        raise InvalidCursor("Invalid cursor")
+    return ordering, values
+
+
+def keyset_page(query, cursor, per_page, ordering="id"):
+    """
+    Fetch one page of a query using keyset pagination.
+
+    Rows are located with a ``WHERE key > :last`` predicate on an indexed
+    ordering instead of an OFFSET, and no total count is computed, so every
+    page costs the same regardless of how deep the client has paged.
+
+    Args:
+        query (Query): The (possibly filtered) recipe query.
+        cursor (str): The cursor of the previous page, or an empty string for the first page.
+        per_page (int): The maximum number of rows to return.
+        ordering (str): The ordering to use when starting from the first page.
+
+    Returns:
+        tuple: The list of rows on the page and the cursor of the next page,
+            which is None on the last page.
+
+    Raises:
+        InvalidCursor: If the cursor cannot be decoded.
+    """
+    if cursor:
+        ordering, values = decode_cursor(cursor)
+        columns = KEYSET_ORDERINGS[ordering]
+        if len(columns) == 1:
+            query = query.filter(columns[0] > values[0])
+        else:
+            query = query.filter(tuple_(*columns) > tuple_(*values))
+    else:
+        columns = KEYSET_ORDERINGS[ordering]
+
+    rows = query.order_by(*columns).limit(per_page + 1).all()
+    if len(rows) <= per_page:
+        return rows, None
+
+    rows = rows[:per_page]
+    last = rows[-1]
+    return rows, encode_cursor(
+        ordering, [getattr(last, column.key) for column in columns]
+    )
@@ -0,0 +1,228 @@
+import copy
+
+from app.blueprints.recipe.changes import mark_recipes_changed
+from app.blueprints.recipe.schema import validate_recipe
+from app.extensions import db
+from app.models import Recipe
+
+MERGE_PATCH_TYPE = "application/merge-patch+json"
+JSON_PATCH_TYPE = "application/json-patch+json"
+
+# Recipe members a patch may change; the scalar ones map to recipe columns.
+SCALAR_FIELDS = ("title", "description", "instructions")
+PATCH_FIELDS = SCALAR_FIELDS + ("ingredients",)
+
+
+class InvalidPatch(ValueError):
+    """
+    Raised when a patch document is malformed or cannot be applied.
+    """
+
+
+class PatchTestFailed(Exception):
+    """
+    Raised when a JSON Patch ``test`` operation does not match the recipe.
+    """
+
+
+def merge_patch(target, patch):
+    """
+    Apply an RFC 7396 JSON Merge Patch.
+
+    Args:
+        target: The document to patch; it is not modified.
+        patch: The merge patch.
+
+    Returns:
+        The patched document.
+    """
+    if not isinstance(patch, dict):
+        return patch
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = merge_patch(result.get(key), value)
+    return result
+
+
+def _parse_pointer(pointer):
+    if not isinstance(pointer, str) or (pointer and not pointer.startswith("/")):
+        raise InvalidPatch(f"Invalid JSON pointer {pointer!r}")
+    return [
+        token.replace("~1", "/").replace("~0", "~") for token in pointer.split("/")[1:]
+    ]
+
+
+def _index(array, token, append=False):
+    if append and token == "-":
+        return len(array)
+    if not token.isdigit() or (len(token) > 1 and token.startswith("0")):
+        raise InvalidPatch(f"Invalid array index {token!r}")
+    index = int(token)
+    if index > len(array) or (index == len(array) and not append):
+        raise InvalidPatch(f"Array index {token} out of range")
+    return index
+
+
+def _child(container, token):
+    if isinstance(container, dict) and token in container:
+        return container[token]
+    if isinstance(container, list):
+        return container[_index(container, token)]
+    raise InvalidPatch(f"Path member {token!r} not found")
+
+
+def _get(document, tokens):
+    for token in tokens:
+        document = _child(document, token)
+    return document
+
+
+def _add(document, tokens, value):
+    if not tokens:
+        return value
+    container = _get(document, tokens[:-1])
+    if isinstance(container, dict):
+        container[tokens[-1]] = value
+    elif isinstance(container, list):
+        container.insert(_index(container, tokens[-1], append=True), value)
+    else:
+        raise InvalidPatch("Cannot add to a scalar value")
+    return document
+
+
+def _remove(document, tokens):
+    if not tokens:
+        raise InvalidPatch("Cannot remove the whole document")
+    container = _get(document, tokens[:-1])
+    if isinstance(container, dict) and tokens[-1] in container:
+        return container.pop(tokens[-1])
+    if isinstance(container, list):
+        return container.pop(_index(container, tokens[-1]))
+    raise InvalidPatch(f"Path member {tokens[-1]!r} not found")
+
+
+def apply_json_patch(document, operations):
+    """
+    Apply an RFC 6902 JSON Patch.
+
+    Args:
+        document: The document to patch; it is not modified.
+        operations (list): The patch operations.
+
+    Returns:
+        The patched document.
+
+    Raises:
+        InvalidPatch: If an operation is malformed or its path does not exist.
+        PatchTestFailed: If a ``test`` operation fails.
+    """
+    if not isinstance(operations, list):
+        raise InvalidPatch("A JSON Patch must be an array")
+    document = copy.deepcopy(document)
+    for operation in operations:
+        if not isinstance(operation, dict):
+            raise InvalidPatch("Invalid patch operation")
+        op = operation.get("op")
+        path = _parse_pointer(operation.get("path"))
+        if op in ("add", "replace", "test") and "value" not in operation:
+            raise InvalidPatch(f"Missing value for {op} operation")
+
+        if op == "add":
+            document = _add(document, path, copy.deepcopy(operation["value"]))
+        elif op == "remove":
+            _remove(document, path)
+        elif op == "replace":
+            if path:
+                _remove(document, path)
+            document = _add(document, path, copy.deepcopy(operation["value"]))
+        elif op in ("move", "copy"):
+            source = _parse_pointer(operation.get("from"))
+            if op == "move":
+                if path[: len(source)] == source and path != source:
+                    raise InvalidPatch("Cannot move a value into itself")
+                value = _remove(document, source)
+            else:
+                value = copy.deepcopy(_get(document, source))
+            document = _add(document, path, value)
+        elif op == "test":
+            if _get(document, path) != operation["value"]:
+                raise PatchTestFailed(operation["path"])
+        else:
+            raise InvalidPatch(f"Unknown patch operation {op!r}")
+    return document
+
+
+def scalar_changes(patch, json_patch=False):
+    """
+    Extract the column values a patch sets, if it only sets recipe columns.
+
+    Such patches need no knowledge of the stored recipe and can be applied
+    with `update_recipe_columns`.
+
+    Args:
+        patch: A merge patch, or a JSON Patch if ``json_patch`` is set.
+        json_patch (bool): Whether ``patch`` is a JSON Patch.
+
+    Returns:
+        dict | None: The new column values, or None if the patch touches the
+            ingredients or depends on the stored recipe.
+    """
+    if not json_patch:
+        if isinstance(patch, dict) and set(patch) <= set(SCALAR_FIELDS):
+            return dict(patch)
+        return None
+    if not isinstance(patch, list):
+        return None
+    changes = {}
+    for operation in patch:
+        if (
+            not isinstance(operation, dict)
+            or operation.get("op") not in ("add", "replace")
+            or "value" not in operation
+            or operation.get("path") not in [f"/{name}" for name in SCALAR_FIELDS]
+        ):
+            return None
+        changes[operation["path"][1:]] = operation["value"]
+    return changes
+
+
+def validate_changes(changes):
+    """
+    Check the new values of patched recipe members.
+
+    Returns:
+        list: The errors found, as returned by `validate_recipe`.
+    """
+    return validate_recipe(changes, partial=True) if changes else []
+
+
+def update_recipe_columns(recipe_id, changes, versions=None):
+    """
+    Update recipe columns and bump the version with a single statement.
+
+    The recipe is not loaded; the change is reported to the change tracker
+    so the search index and caches follow it on commit.
+
+    Args:
+        recipe_id (int): The ID of the recipe.
+        changes (dict): The new values of columns in `SCALAR_FIELDS`.
+        versions (set, optional): The versions the recipe must be at, as
+            returned by `if_match_versions`; any version if omitted.
+
+    Returns:
+        bool: Whether the recipe was updated, i.e. exists and is at one of
+            ``versions``.
+    """
+    table = Recipe.__table__
+    statement = table.update().where(table.c.id == recipe_id)
+    if versions is not None:
+        statement = statement.where(table.c.version.in_(versions))
+    result = db.session.execute(
+        statement.values(**changes, version=table.c.version + 1)
+    )
+    if result.rowcount:
+        mark_recipes_changed([recipe_id], bumped=True)
+    return result.rowcount == 1
@@ -1,8 +1,21 @@
 from app.blueprints.recipe import recipe_bp
-from app.blueprints.recipe.views import RecipeAPI
+from app.blueprints.recipe.export import export_command
+from app.blueprints.recipe.idempotency import purge_idempotency_keys_command
+from app.blueprints.recipe.outbox import poll_outbox, purge_events_command
+from app.blueprints.recipe.views import (
+    RecipeAPI,
+    RecipeBatchAPI,
+    RecipeBulkAPI,
+    RecipeCacheStatsAPI,
+    RecipeExportAPI,
+)
 
 # Register the RecipeAPI view with its URL routes
 recipe_view = RecipeAPI.as_view("recipe_api")
+cache_stats_view = RecipeCacheStatsAPI.as_view("recipe_cache_stats_api")
+export_view = RecipeExportAPI.as_view("recipe_export_api")
+batch_view = RecipeBatchAPI.as_view("recipe_batch_api")
+bulk_view = RecipeBulkAPI.as_view("recipe_bulk_api")
 
 
 # Define URL routes for the recipe blueprint
@@ -11,5 +24,17 @@ recipe_bp.add_url_rule(
 )
 recipe_bp.add_url_rule("/", view_func=recipe_view, methods=["POST"])
 recipe_bp.add_url_rule(
-    "/<int:id>", view_func=recipe_view, methods=["GET", "PUT", "DELETE"]
+    "/<int:id>", view_func=recipe_view, methods=["GET", "PUT", "PATCH", "DELETE"]
 )
+recipe_bp.add_url_rule("/cache/stats", view_func=cache_stats_view, methods=["GET"])
+recipe_bp.add_url_rule("/export", view_func=export_view, methods=["GET"])
+recipe_bp.add_url_rule("/batch", view_func=batch_view, methods=["GET"])
+recipe_bp.add_url_rule("/bulk", view_func=bulk_view, methods=["POST", "DELETE"])
+
+# Follow other workers' recipe changes before serving recipe requests
+recipe_bp.before_request(poll_outbox)
+
+# Register the command line interface as `flask recipe <command>`
+recipe_bp.cli.add_command(export_command)
+recipe_bp.cli.add_command(purge_idempotency_keys_command)
+recipe_bp.cli.add_command(purge_events_command)
@@ -0,0 +1,229 @@
+from flask import current_app, jsonify
+
+from app.models import Ingredient, Recipe, RecipeIngredient, normalize_ingredient_name
+from app.utils import api_response
+
+# Marks a member absent from the validated object.
+MISSING = object()
+
+
+class Text:
+    """
+    Declares a string member of a JSON object.
+
+    Args:
+        message (str): The error reported for a missing or invalid value.
+        required (bool): Whether the member must be present.
+        blank (bool): Whether empty or whitespace-only strings are accepted.
+        max_length (int | str, optional): The longest accepted string, or
+            the name of the config setting holding it.
+    """
+
+    def __init__(self, message, required=False, blank=False, max_length=None):
+        self.message = message
+        self.required = required
+        self.blank = blank
+        self.max_length = max_length
+
+    def compile(self, name, config, partial):
+        message, blank = self.message, self.blank
+        required = self.required and not partial
+        # Partial updates clear optional members by setting them to null.
+        nullable = partial and not self.required
+        max_length = _limit(self.max_length, config)
+
+        def check(value, prefix, errors):
+            if value is MISSING:
+                if required:
+                    errors.append(_error(prefix + name, message))
+            elif value is None and nullable:
+                pass
+            elif not isinstance(value, str) or not (blank or value.strip()):
+                errors.append(_error(prefix + name, message))
+            elif max_length is not None and len(value) > max_length:
+                path = prefix + name
+                errors.append(
+                    _error(
+                        path, f"Field too long: {path} (max {max_length} characters)"
+                    )
+                )
+
+        return check
+
+
+class Items:
+    """
+    Declares a non-empty array member whose items are objects of a schema.
+
+    Args:
+        schema (dict): The members of each item.
+        message (str): The error reported for a missing, empty or invalid array.
+        required (bool): Whether the member must be present.
+        max_items (int | str, optional): The most items accepted, or the
+            name of the config setting holding it.
+        unique (tuple, optional): A ``(member, key function, message)``
+            triple rejecting items whose member maps to the same key.
+    """
+
+    def __init__(self, schema, message, required=False, max_items=None, unique=None):
+        self.schema = schema
+        self.message = message
+        self.required = required
+        self.max_items = max_items
+        self.unique = unique
+
+    def compile(self, name, config, partial):
+        message = self.message
+        required = self.required and not partial
+        max_items = _limit(self.max_items, config)
+        validate_item = _compile_object(self.schema, config, partial=False)
+        unique_member, unique_key, duplicate_message = self.unique or (None,) * 3
+
+        def check(value, prefix, errors):
+            path = prefix + name
+            if value is MISSING:
+                if required:
+                    errors.append(_error(path, message))
+                return
+            if not isinstance(value, list) or not value:
+                errors.append(_error(path, message))
+                return
+            if max_items is not None and len(value) > max_items:
+                errors.append(_error(path, f"Too many {name} (max {max_items})"))
+                return
+            seen = set()
+            for index, item in enumerate(value):
+                item_prefix = f"{path}[{index}]."
+                if not isinstance(item, dict):
+                    item = {}
+                validate_item(item, item_prefix, errors)
+                if unique_member is not None:
+                    member = item.get(unique_member)
+                    if isinstance(member, str) and member.strip():
+                        if (key := unique_key(member)) in seen:
+                            errors.append(
+                                _error(item_prefix + unique_member, duplicate_message)
+                            )
+                        seen.add(key)
+
+        return check
+
+
+def _error(field, message):
+    return {"field": field, "message": message}
+
+
+def _limit(value, config):
+    return config[value] if isinstance(value, str) else value
+
+
+def _compile_object(schema, config, partial):
+    checks = [field.compile(name, config, partial) for name, field in schema.items()]
+    names = list(schema)
+
+    def validate(data, prefix, errors):
+        for name, check in zip(names, checks):
+            check(data.get(name, MISSING), prefix, errors)
+
+    return validate
+
+
+def compile_schema(schema, config, partial=False):
+    """
+    Compile a declarative object schema into a validator.
+
+    Limits named by config settings are resolved and every member check
+    built once, so validating a payload only runs the checks.
+
+    Args:
+        schema (dict): The members of the object, in the order they are checked.
+        config (Mapping): The settings resolving named limits.
+        partial (bool): Whether to validate a partial update, in which no
+            member is required and optional members may be null.
+
+    Returns:
+        callable: A function taking the decoded JSON payload and returning
+            the list of its errors, each a ``{"field", "message"}`` dict;
+            the list is empty if the payload is valid.
+    """
+    validate_object = _compile_object(schema, config, partial)
+
+    def validate(data):
+        if not data or not isinstance(data, dict):
+            return [_error(None, "Invalid JSON data")]
+        errors = []
+        validate_object(data, "", errors)
+        return errors
+
+    return validate
+
+
+INGREDIENT_SCHEMA = {
+    "name": Text(
+        "Invalid ingredient name",
+        required=True,
+        max_length=Ingredient.__table__.c.name.type.length,
+    ),
+    "quantity": Text(
+        "Invalid ingredient quantity",
+        required=True,
+        max_length=RecipeIngredient.__table__.c.quantity.type.length,
+    ),
+}
+
+RECIPE_SCHEMA = {
+    "title": Text(
+        "Invalid or missing title",
+        required=True,
+        max_length=Recipe.__table__.c.title.type.length,
+    ),
+    "description": Text(
+        "Invalid or missing description",
+        required=True,
+        max_length="RECIPE_MAX_TEXT_LENGTH",
+    ),
+    "instructions": Text(
+        "Invalid instructions", blank=True, max_length="RECIPE_MAX_TEXT_LENGTH"
+    ),
+    "ingredients": Items(
+        INGREDIENT_SCHEMA,
+        "Invalid or missing ingredients",
+        required=True,
+        max_items="RECIPE_MAX_INGREDIENTS",
+        unique=("name", normalize_ingredient_name, "Duplicate ingredient name"),
+    ),
+}
+
+
+def validate_recipe(data, partial=False):
+    """
+    Check a recipe payload against `RECIPE_SCHEMA`, reporting every error.
+
+    The validators are compiled on first use and kept by the application.
+
+    Args:
+        data: The decoded JSON of the recipe, or of the changed members if
+            ``partial`` is set.
+        partial (bool): Whether ``data`` is a partial update.
+
+    Returns:
+        list: The errors found, each a ``{"field", "message"}`` dict.
+    """
+    validators = current_app.extensions.setdefault("recipe_validators", {})
+    if (validate := validators.get(partial)) is None:
+        validate = validators.setdefault(
+            partial, compile_schema(RECIPE_SCHEMA, current_app.config, partial)
+        )
+    return validate(data)
+
+
+def validation_error(errors):
+    """
+    Build the 400 response for an invalid payload.
+
+    The message is the first error's, and ``errors`` lists them all.
+    """
+    return (
+        jsonify(api_response(400, errors[0]["message"], {"errors": errors})),
+        400,
+    )
@@ -0,0 +1,283 @@
+import re
+
+from flask import current_app
+from sqlalchemy import DDL, bindparam, event, text
+
+from app.blueprints.recipe.changes import RECIPE_DELETED, before_commit
+from app.extensions import db
+from app.models import Ingredient, Recipe, RecipeIngredient
+
+# Name of the table holding one full-text document per recipe.
+SEARCH_TABLE = "recipe_search"
+
+# Number of recipes whose documents are rebuilt per statement.
+INDEX_BATCH_SIZE = 500
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Values accepted by the ``match`` query parameter of the recipe list.
+MATCH_MODES = ("fulltext", "substring", "fuzzy")
+
+
+def tokenize(term):
+    """
+    Split a search term into lowercase word tokens.
+
+    Only word characters survive, so the tokens are safe to embed in any of
+    the dialects' full-text query syntaxes.
+
+    Args:
+        term (str): The raw search term.
+
+    Returns:
+        list: The tokens of the term.
+    """
+    return _TOKEN_RE.findall(term.lower())
+
+
+class SearchBackend:
+    """
+    Base class for recipe search backends.
+
+    A backend narrows a recipe query down to the recipes matching a search
+    term and keeps its index in step with recipe writes.
+    """
+
+    name = None
+
+    def filter(self, query, term):
+        """
+        Restrict a recipe query to recipes matching a search term.
+
+        Args:
+            query (Query): The recipe query to filter.
+            term (str): The search term.
+
+        Returns:
+            Query: The filtered query.
+        """
+        raise NotImplementedError
+
+    def apply_changes(self, session, changes):
+        """
+        Update the index for recipes changed in the current transaction.
+
+        Args:
+            session (Session): The session the changes were made in.
+            changes (dict): A mapping of recipe ID to change operation.
+        """
+
+
+class LikeSearchBackend(SearchBackend):
+    """
+    Index-free backend matching substrings with ILIKE.
+
+    Used for dialects without a native full-text implementation. Every search
+    scans the recipe and ingredient tables.
+    """
+
+    name = "like"
+
+    def filter(self, query, term):
+        return query.filter(
+            Recipe.title.ilike(f"%{term}%")
+            | Recipe.ingredients.any(Ingredient.name.ilike(f"%{term}%"))
+        )
+
+
+class FullTextSearchBackend(SearchBackend):
+    """
+    Base class for backends storing one document per recipe in `SEARCH_TABLE`.
+
+    A recipe's document is made of its title, description and ingredient
+    names. Tokens are matched by prefix, so partial words still find recipes.
+    """
+
+    #: SQL returning the IDs of recipes matching the ``:q`` parameter.
+    match_sql = None
+
+    def build_query(self, tokens):
+        """
+        Build the dialect's full-text query string from search tokens.
+        """
+        raise NotImplementedError
+
+    def filter(self, query, term):
+        tokens = tokenize(term)
+        if not tokens:
+            return query.filter(db.false())
+        matches = text(self.match_sql).bindparams(q=self.build_query(tokens))
+        return query.filter(Recipe.id.in_(matches.columns(id=db.Integer)))
+
+    def apply_changes(self, session, changes):
+        deleted = [rid for rid, op in changes.items() if op == RECIPE_DELETED]
+        changed = [rid for rid, op in changes.items() if op != RECIPE_DELETED]
+        for start in range(0, len(deleted), INDEX_BATCH_SIZE):
+            self.remove(session, deleted[start : start + INDEX_BATCH_SIZE])
+        for start in range(0, len(changed), INDEX_BATCH_SIZE):
+            batch = changed[start : start + INDEX_BATCH_SIZE]
+            self.remove(session, batch)
+            if documents := build_documents(session, batch):
+                self.insert(session, documents)
+
+    def remove(self, session, recipe_ids):
+        """
+        Delete the documents of the given recipes.
+        """
+        session.execute(
+            text(
+                f"DELETE FROM {SEARCH_TABLE} WHERE {self.key_column} IN :ids"
+            ).bindparams(bindparam("ids", expanding=True)),
+            {"ids": list(recipe_ids)},
+        )
+
+    def insert(self, session, documents):
+        """
+        Insert documents given as a mapping of recipe ID to text.
+        """
+        session.execute(
+            text(self.insert_sql),
+            [{"id": rid, "doc": doc} for rid, doc in documents.items()],
+        )
+
+
+class PostgresSearchBackend(FullTextSearchBackend):
+    """
+    PostgreSQL backend using a ``tsvector`` column with a GIN index.
+    """
+
+    name = "postgresql"
+    key_column = "recipe_id"
+    match_sql = (
+        f"SELECT recipe_id FROM {SEARCH_TABLE} "
+        "WHERE document @@ to_tsquery('simple', :q)"
+    )
+    insert_sql = (
+        f"INSERT INTO {SEARCH_TABLE} (recipe_id, document) "
+        "VALUES (:id, to_tsvector('simple', :doc))"
+    )
+
+    def build_query(self, tokens):
+        return " & ".join(f"{token}:*" for token in tokens)
+
+
+class MySQLSearchBackend(FullTextSearchBackend):
+    """
+    MySQL backend using an InnoDB ``FULLTEXT`` index in boolean mode.
+    """
+
+    name = "mysql"
+    key_column = "recipe_id"
+    match_sql = (
+        f"SELECT recipe_id FROM {SEARCH_TABLE} "
+        "WHERE MATCH(document) AGAINST (:q IN BOOLEAN MODE)"
+    )
+    insert_sql = f"INSERT INTO {SEARCH_TABLE} (recipe_id, document) VALUES (:id, :doc)"
+
+    def build_query(self, tokens):
+        return " ".join(f"+{token}*" for token in tokens)
+
+
+class SQLiteSearchBackend(FullTextSearchBackend):
+    """
+    SQLite backend using an FTS5 virtual table keyed by recipe ID.
+    """
+
+    name = "sqlite"
+    key_column = "rowid"
+    match_sql = f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :q"
+    insert_sql = f"INSERT INTO {SEARCH_TABLE} (rowid, document) VALUES (:id, :doc)"
+
+    def build_query(self, tokens):
+        return " ".join(f'"{token}"*' for token in tokens)
+
+
+SEARCH_BACKENDS = {
+    backend.name: backend
+    for backend in (
+        LikeSearchBackend,
+        PostgresSearchBackend,
+        MySQLSearchBackend,
+        SQLiteSearchBackend,
+    )
+}
+
+
+def build_documents(session, recipe_ids):
+    """
+    Build the full-text documents of the given recipes.
+
+    Args:
+        session (Session): The session to query with.
+        recipe_ids (list): The IDs of the recipes.
+
+    Returns:
+        dict: A mapping of recipe ID to document text, for recipes that exist.
+    """
+    parts = {
+        recipe_id: [title or "", description or ""]
+        for recipe_id, title, description in session.execute(
+            db.select(Recipe.id, Recipe.title, Recipe.description).where(
+                Recipe.id.in_(recipe_ids)
+            )
+        )
+    }
+    names = session.execute(
+        db.select(RecipeIngredient.recipe_id, Ingredient.name)
+        .join(Ingredient, RecipeIngredient.ingredient_id == Ingredient.id)
+        .where(RecipeIngredient.recipe_id.in_(recipe_ids))
+    )
+    for recipe_id, name in names:
+        if recipe_id in parts:
+            parts[recipe_id].append(name)
+    return {recipe_id: " ".join(words) for recipe_id, words in parts.items()}
+
+
+def get_search_backend():
+    """
+    Return the search backend of the current application.
+
+    The backend is chosen by the ``SEARCH_BACKEND`` setting; ``auto`` picks the
+    native backend of the configured database and falls back to ILIKE.
+    """
+    backend = current_app.extensions.get("recipe_search_backend")
+    if backend is None:
+        name = current_app.config["SEARCH_BACKEND"]
+        if name == "auto":
+            name = db.engine.dialect.name
+        backend = SEARCH_BACKENDS.get(name, LikeSearchBackend)()
+        current_app.extensions["recipe_search_backend"] = backend
+    return backend
+
+
+@before_commit
+def _index_changed_recipes(session, changes):
+    get_search_backend().apply_changes(session, changes)
+
+
+# DDL creating the index table on each dialect. Real deployments create it
+# through the matching migration; these statements keep it in step with
+# db.create_all() and db.drop_all() for local and test databases.
+SEARCH_TABLE_DDL = {
+    "postgresql": [
+        f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} "
+        "(recipe_id INTEGER PRIMARY KEY, document TSVECTOR NOT NULL)",
+        f"CREATE INDEX IF NOT EXISTS ix_{SEARCH_TABLE}_document "
+        f"ON {SEARCH_TABLE} USING GIN (document)",
+    ],
+    "mysql": [
+        f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} "
+        "(recipe_id INTEGER PRIMARY KEY, document TEXT NOT NULL, "
+        f"FULLTEXT KEY ix_{SEARCH_TABLE}_document (document)) ENGINE=InnoDB",
+    ],
+    "sqlite": [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(document)",
+    ],
+}
+
+for dialect, statements in SEARCH_TABLE_DDL.items():
+    for statement in statements:
+        event.listen(
+            db.metadata, "after_create", DDL(statement).execute_if(dialect=dialect)
+        )
+event.listen(db.metadata, "before_drop", DDL(f"DROP TABLE IF EXISTS {SEARCH_TABLE}"))
@@ -0,0 +1,440 @@
+import threading
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+
+from flask import current_app
+
+from app.blueprints.recipe.changes import RECIPE_DELETED, before_commit, pending
+from app.blueprints.recipe.outbox import subscribe
+from app.extensions import db
+from app.models import Ingredient, Recipe, RecipeIngredient
+
+# Separates a recipe's fields in its stored text so matches never span fields.
+FIELD_SEPARATOR = "\x1f"
+
+# Rows fetched per round trip while building the index.
+BUILD_BATCH_SIZE = 5000
+
+# Changed recipes whose text is reloaded per statement.
+INDEX_BATCH_SIZE = 500
+
+
+def normalize(text):
+    """
+    Lowercase a string and collapse runs of whitespace.
+    """
+    return " ".join(text.lower().split())
+
+
+def trigrams(text):
+    """
+    Return the set of trigrams of a normalized text, field by field.
+
+    Args:
+        text (str): The text, with fields joined by `FIELD_SEPARATOR`.
+
+    Returns:
+        set: The distinct three-character substrings of the fields.
+    """
+    grams = set()
+    for field in text.split(FIELD_SEPARATOR):
+        grams.update(field[i : i + 3] for i in range(len(field) - 2))
+    return grams
+
+
+def substring_distance(pattern, text, limit):
+    """
+    Compute the smallest edit distance between a pattern and any substring of a text.
+
+    This is Sellers' variant of the Levenshtein dynamic program, where a
+    match may start anywhere in the text. Evaluation stops early once every
+    cell of a row exceeds ``limit``.
+
+    Args:
+        pattern (str): The pattern to look for.
+        text (str): The text to search in.
+        limit (int): The largest distance of interest.
+
+    Returns:
+        int: The distance, or ``limit + 1`` if it is larger than ``limit``.
+    """
+    previous = [0] * (len(text) + 1)
+    for i, char in enumerate(pattern, 1):
+        current = [i] + [0] * len(text)
+        for j, text_char in enumerate(text, 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char != text_char),
+            )
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return min(min(previous), limit + 1)
+
+
+class TrigramIndex:
+    """
+    In-memory trigram index over recipe titles and ingredient names.
+
+    Every trigram maps to a sorted ``array('i')`` of the IDs of the recipes
+    containing it, and every recipe's normalized text is kept for verifying
+    candidates. Every bigram maps to the indexed trigrams starting or ending
+    with it, so that two-character pieces of fuzzy terms are looked up
+    through the trigram postings too. Lookups only touch the posting lists
+    of the query's grams, so they do not hit the database.
+    """
+
+    def __init__(self):
+        self._postings = {}
+        self._affixes = {}
+        self._texts = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._texts)
+
+    def build(self, documents):
+        """
+        Replace the index contents.
+
+        Args:
+            documents (Iterable[tuple]): ``(recipe_id, text)`` pairs.
+        """
+        postings = defaultdict(list)
+        texts = {}
+        for recipe_id, text in documents:
+            texts[recipe_id] = text
+            for gram in trigrams(text):
+                postings[gram].append(recipe_id)
+        compact = {gram: array("i", sorted(ids)) for gram, ids in postings.items()}
+        affixes = defaultdict(set)
+        for gram in compact:
+            affixes[gram[:2]].add(gram)
+            affixes[gram[1:]].add(gram)
+        with self._lock:
+            self._postings, self._affixes, self._texts = compact, dict(affixes), texts
+
+    def upsert(self, recipe_id, text):
+        """
+        Add a recipe to the index or replace its text.
+        """
+        with self._lock:
+            old = self._texts.get(recipe_id)
+            old_grams = trigrams(old) if old is not None else set()
+            new_grams = trigrams(text)
+            for gram in old_grams - new_grams:
+                self._discard(gram, recipe_id)
+            for gram in new_grams - old_grams:
+                if gram not in self._postings:
+                    self._postings[gram] = array("i")
+                    self._affixes.setdefault(gram[:2], set()).add(gram)
+                    self._affixes.setdefault(gram[1:], set()).add(gram)
+                insort(self._postings[gram], recipe_id)
+            self._texts[recipe_id] = text
+
+    def remove(self, recipe_id):
+        """
+        Remove a recipe from the index, if present.
+        """
+        with self._lock:
+            text = self._texts.pop(recipe_id, None)
+            if text is not None:
+                for gram in trigrams(text):
+                    self._discard(gram, recipe_id)
+
+    def _discard(self, gram, recipe_id):
+        ids = self._postings.get(gram)
+        if ids is None:
+            return
+        position = bisect_left(ids, recipe_id)
+        if position < len(ids) and ids[position] == recipe_id:
+            del ids[position]
+            if not ids:
+                del self._postings[gram]
+                for affix in (gram[:2], gram[1:]):
+                    grams = self._affixes[affix]
+                    grams.discard(gram)
+                    if not grams:
+                        del self._affixes[affix]
+
+    def search_substring(self, term, limit=None):
+        """
+        Find recipes whose title or an ingredient name contains a term.
+
+        Args:
+            term (str): The substring to look for.
+            limit (int, optional): The maximum number of IDs to return.
+
+        Returns:
+            list: The matching recipe IDs in ascending order.
+        """
+        term = normalize(term)
+        if not term:
+            return []
+        with self._lock:
+            grams = trigrams(term)
+            if not grams:
+                candidates = sorted(self._texts)
+            else:
+                lists = sorted(
+                    (self._postings.get(gram, array("i")) for gram in grams), key=len
+                )
+                candidates = [
+                    recipe_id
+                    for recipe_id in lists[0]
+                    if all(_contains(ids, recipe_id) for ids in lists[1:])
+                ]
+            return _take((rid for rid in candidates if term in self._texts[rid]), limit)
+
+    def search_fuzzy(self, term, max_distance, limit=None):
+        """
+        Find recipes with a title or ingredient name approximately containing a term.
+
+        ``max_distance + 1`` disjoint bigrams or trigrams of the term are
+        picked as pieces; an edit changes at most one of them, so every
+        match contains one piece exactly. Candidates are the recipes found
+        through the posting lists of the pieces, chosen to keep the lists
+        short; they are verified with an edit distance computation outside
+        the lock, so index updates are not held up. ``max_distance`` is
+        capped to what the term's length allows: terms too short to split
+        would match nearly every recipe.
+
+        Args:
+            term (str): The approximate substring to look for.
+            max_distance (int): The largest number of edits allowed.
+            limit (int, optional): The maximum number of IDs to return.
+
+        Returns:
+            list: The matching recipe IDs in ascending order.
+        """
+        term = normalize(term)
+        max_distance = min(max_distance, len(term) // 2 - 1)
+        if max_distance <= 0:
+            return self.search_substring(term, limit)
+        pieces, candidates = self._fuzzy_candidates(term, max_distance)
+        return _take(
+            (
+                rid
+                for rid, text in candidates
+                if _fuzzy_contains(term, text, pieces, max_distance)
+            ),
+            limit,
+        )
+
+    def _fuzzy_candidates(self, term, max_distance):
+        """
+        Pick the pieces of a term and copy out the texts containing one.
+
+        Returns:
+            tuple: The ``(offset, piece)`` pairs and the ``(recipe_id, text)``
+                pairs of the candidates, in ID order.
+        """
+        with self._lock:
+            pieces = _cheapest_pieces(term, max_distance + 1, self._piece_cost)
+            ids = set()
+            for _, piece in pieces:
+                ids.update(self._piece_postings(piece))
+            return pieces, [(rid, self._texts[rid]) for rid in sorted(ids)]
+
+    def _piece_grams(self, piece):
+        """
+        Return the trigrams whose postings hold every recipe containing a piece.
+
+        A trigram is its own posting list; a bigram is found in the postings
+        of the trigrams it starts or ends.
+        """
+        if len(piece) == 3:
+            return (piece,) if piece in self._postings else ()
+        return self._affixes.get(piece, ())
+
+    def _piece_cost(self, piece):
+        return sum(len(self._postings[gram]) for gram in self._piece_grams(piece))
+
+    def _piece_postings(self, piece):
+        for gram in self._piece_grams(piece):
+            yield from self._postings[gram]
+
+
+def _cheapest_pieces(term, count, cost):
+    """
+    Choose disjoint bigrams and trigrams of a term minimizing their lookup cost.
+
+    Args:
+        term (str): The term to split; at least ``2 * count`` characters long.
+        count (int): The number of pieces.
+        cost (Callable): Returns the cost of looking a piece up.
+
+    Returns:
+        list: The ``(offset, piece)`` pairs, in term order.
+    """
+    n = len(term)
+    # best[p][i]: the cheapest (cost, pieces) placing p pieces within term[i:].
+    best = [[(0, ())] * (n + 1)] + [[None] * (n + 1) for _ in range(count)]
+    for p in range(1, count + 1):
+        for i in range(n - 2 * p, -1, -1):
+            options = [best[p][i + 1]] if best[p][i + 1] is not None else []
+            for end in (i + 2, i + 3):
+                if end <= n and (rest := best[p - 1][end]) is not None:
+                    piece = term[i:end]
+                    options.append((cost(piece) + rest[0], ((i, piece),) + rest[1]))
+            best[p][i] = min(options)
+    return list(best[count][0][1])
+
+
+def _fuzzy_contains(term, text, pieces, max_distance):
+    """
+    Tell whether a text approximately contains a term around one of its pieces.
+
+    An occurrence keeping a piece intact starts within ``max_distance`` of
+    where the piece's offset places it, so only that window of the field is
+    compared with the term.
+    """
+    for field in text.split(FIELD_SEPARATOR):
+        for offset, piece in pieces:
+            position = field.find(piece)
+            while position != -1:
+                start = max(position - offset - max_distance, 0)
+                window = field[start : position - offset + len(term) + max_distance]
+                if substring_distance(term, window, max_distance) <= max_distance:
+                    return True
+                position = field.find(piece, position + 1)
+    return False
+
+
+def _contains(ids, recipe_id):
+    position = bisect_left(ids, recipe_id)
+    return position < len(ids) and ids[position] == recipe_id
+
+
+def _take(ids, limit):
+    result = []
+    for recipe_id in ids:
+        if limit is not None and len(result) >= limit:
+            break
+        result.append(recipe_id)
+    return result
+
+
+def fuzzy_distance(term):
+    """
+    Return the number of edits tolerated when fuzzy matching a term.
+
+    Short terms get fewer edits so that they do not match everything.
+    """
+    length = len(normalize(term))
+    distance = 0 if length < 4 else 1 if length < 8 else 2
+    return min(distance, current_app.config["TRIGRAM_MAX_DISTANCE"])
+
+
+def filter_by_trigrams(query, term, match):
+    """
+    Restrict a recipe query to recipes found in the trigram index.
+
+    At most ``TRIGRAM_MAX_RESULTS`` recipes, those with the lowest IDs, are
+    kept; the query is then reported as truncated.
+
+    Args:
+        query (Query): The recipe query to filter.
+        term (str): The search term.
+        match (str): ``substring`` or ``fuzzy``.
+
+    Returns:
+        tuple | None: The filtered query and whether matches were left out
+            of it, or None if the index is disabled.
+    """
+    index = get_trigram_index()
+    if index is None:
+        return None
+    limit = current_app.config["TRIGRAM_MAX_RESULTS"]
+    # One more ID than kept tells whether the matches were cut.
+    if match == "fuzzy":
+        recipe_ids = index.search_fuzzy(term, fuzzy_distance(term), limit + 1)
+    else:
+        recipe_ids = index.search_substring(term, limit + 1)
+    return query.filter(Recipe.id.in_(recipe_ids[:limit])), len(recipe_ids) > limit
+
+
+def load_documents(session, recipe_ids=None):
+    """
+    Load the indexed text of recipes from the database.
+
+    Args:
+        session (Session): The session to query with.
+        recipe_ids (list, optional): The recipes to load; all recipes if omitted.
+
+    Returns:
+        dict: A mapping of recipe ID to normalized text.
+    """
+    recipes = db.select(Recipe.id, Recipe.title)
+    names = db.select(RecipeIngredient.recipe_id, Ingredient.name).join(
+        Ingredient, RecipeIngredient.ingredient_id == Ingredient.id
+    )
+    if recipe_ids is not None:
+        recipes = recipes.where(Recipe.id.in_(recipe_ids))
+        names = names.where(RecipeIngredient.recipe_id.in_(recipe_ids))
+
+    fields = {}
+    for recipe_id, title in session.execute(
+        recipes.execution_options(yield_per=BUILD_BATCH_SIZE)
+    ):
+        fields[recipe_id] = [normalize(title or "")]
+    for recipe_id, name in session.execute(
+        names.execution_options(yield_per=BUILD_BATCH_SIZE)
+    ):
+        if recipe_id in fields:
+            fields[recipe_id].append(normalize(name))
+    return {
+        recipe_id: FIELD_SEPARATOR.join(parts) for recipe_id, parts in fields.items()
+    }
+
+
+def get_trigram_index():
+    """
+    Return the trigram index of the current application, building it on first use.
+
+    Returns:
+        TrigramIndex | None: The index, or None if ``TRIGRAM_INDEX_ENABLED`` is off.
+    """
+    if not current_app.config["TRIGRAM_INDEX_ENABLED"]:
+        return None
+    index = current_app.extensions.get("recipe_trigram_index")
+    if index is None:
+        index = TrigramIndex()
+        index.build(load_documents(db.session).items())
+        index = current_app.extensions.setdefault("recipe_trigram_index", index)
+    return index
+
+
+def _load_changed(session, changes):
+    changed = [rid for rid, op in changes.items() if op != RECIPE_DELETED]
+    documents = {}
+    for start in range(0, len(changed), INDEX_BATCH_SIZE):
+        documents.update(
+            load_documents(session, changed[start : start + INDEX_BATCH_SIZE])
+        )
+    return documents
+
+
+@before_commit
+def _load_changed_documents(session, changes):
+    if current_app.extensions.get("recipe_trigram_index") is None:
+        return
+    pending(session)["trigram_documents"] = _load_changed(session, changes)
+
+
+@subscribe
+def _update_trigram_index(session, changes):
+    index = current_app.extensions.get("recipe_trigram_index")
+    if index is None:
+        return
+    documents = pending(session).get("trigram_documents")
+    if documents is None:
+        # Another process's changes: the text was not loaded before commit.
+        documents = _load_changed(session, changes)
+    for recipe_id in changes:
+        if recipe_id in documents:
+            index.upsert(recipe_id, documents[recipe_id])
+        else:
+            index.remove(recipe_id)
@@ -1,14 +1,311 @@
-from sqlalchemy import text
+import hashlib
+import json
+from collections import defaultdict
+from contextlib import contextmanager
+
+from flask import current_app, jsonify, request
+from sqlalchemy.orm import load_only
 
 from app.extensions import db
+from app.models import Ingredient, Recipe, RecipeIngredient
+from app.utils import api_response
+
+# Fields a ``fields`` parameter may select; ``ingredients`` selects both of
+# its subfields.
+RECIPE_FIELDS = (
+    "id",
+    "title",
+    "description",
+    "instructions",
+    "ingredients.name",
+    "ingredients.quantity",
+)
+
+# Fields returned when the client does not ask for specific ones.
+DEFAULT_FIELDS = frozenset(
+    ("id", "title", "description", "ingredients.name", "ingredients.quantity")
+)
+
+# Recipe columns loaded for each selectable field.
+_FIELD_COLUMNS = {
+    "title": Recipe.title,
+    "description": Recipe.description,
+    "instructions": Recipe.instructions,
+}
+
+
+class InvalidFields(ValueError):
+    """
+    Raised when a ``fields`` parameter names an unknown field.
+    """
+
+
+@contextmanager
+def unit_of_work():
+    """
+    Run a block of writes as a single transaction.
+
+    The session flushes inserts and deletes in foreign key dependency order
+    and deletes cascade in the database, so integrity checks stay enabled.
+    The transaction commits when the block exits and is rolled back if it
+    raises, so no state leaks into the next use of the connection.
 
+    Yields:
+        Session: The application's scoped session.
+    """
+    try:
+        yield db.session
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def parse_fields(value):
+    """
+    Parse a comma-separated ``fields`` parameter.
+
+    Args:
+        value (str | None): The parameter, e.g. ``"id,title,ingredients.name"``.
+
+    Returns:
+        frozenset: The selected fields; `DEFAULT_FIELDS` if ``value`` is None.
+            The ``id`` is always included, so an empty list selects it alone.
 
-def toggle_key_checks(enable: bool):
+    Raises:
+        InvalidFields: If a field is unknown.
     """
-    Toggle foreign key checks in the database.
-    
+    if value is None:
+        return DEFAULT_FIELDS
+    fields = {"id"}
+    for name in filter(None, (part.strip() for part in value.split(","))):
+        if name == "ingredients":
+            fields.update(("ingredients.name", "ingredients.quantity"))
+        elif name in RECIPE_FIELDS:
+            fields.add(name)
+        else:
+            raise InvalidFields(name)
+    return frozenset(fields)
+
+
+def ingredient_fields(fields):
+    """
+    Return the ingredient subfields selected in ``fields``, in display order.
+    """
+    return [name for name in ("name", "quantity") if f"ingredients.{name}" in fields]
+
+
+def recipe_load_options(fields=DEFAULT_FIELDS):
     """
-    if enable:
-        db.session.execute(text("SET FOREIGN_KEY_CHECKS=0"))
+    Build the loader options restricting a recipe query to the columns needed.
+
+    Columns of unselected fields are left unloaded, so large ``Text`` columns
+    such as ``instructions`` are only fetched when asked for. The ``version``
+    is always loaded since entity tags are built from it.
+
+    Args:
+        fields (frozenset): The selected fields, as returned by `parse_fields`.
+
+    Returns:
+        list: Options to pass to ``Query.options``.
+    """
+    columns = [column for name, column in _FIELD_COLUMNS.items() if name in fields]
+    return [load_only(Recipe.id, Recipe.version, *columns)]
+
+
+def load_ingredients(recipe_ids, fields=("name", "quantity"), connection=None):
+    """
+    Load the ingredients of many recipes with a single query.
+
+    Args:
+        recipe_ids (Iterable[int]): The IDs of the recipes to load ingredients for.
+        fields (Iterable[str]): The ingredient fields to load, among ``name``
+            and ``quantity``.
+        connection (Connection, optional): The connection to query with.
+            Defaults to the application's session.
+
+    Returns:
+        dict: A mapping of recipe ID to a list of dicts holding the requested
+            fields. Every requested ID is present, recipes without ingredients
+            map to an empty list.
+    """
+    recipe_ids = list(dict.fromkeys(recipe_ids))
+    ingredients = {recipe_id: [] for recipe_id in recipe_ids}
+    if not recipe_ids:
+        return ingredients
+
+    fields = list(fields)
+    columns = {"name": Ingredient.name, "quantity": RecipeIngredient.quantity}
+    query = db.select(RecipeIngredient.recipe_id, *(columns[name] for name in fields))
+    if "name" in fields:
+        query = query.join(Ingredient, RecipeIngredient.ingredient_id == Ingredient.id)
+    query = query.where(RecipeIngredient.recipe_id.in_(recipe_ids)).order_by(
+        RecipeIngredient.recipe_id, RecipeIngredient.ingredient_id
+    )
+    grouped = defaultdict(list)
+    for recipe_id, *values in (connection or db.session).execute(query):
+        grouped[recipe_id].append(dict(zip(fields, values)))
+    ingredients.update(grouped)
+    return ingredients
+
+
+def serialize_recipe(recipe, ingredients, fields=DEFAULT_FIELDS):
+    """
+    Build the API representation of a recipe.
+
+    Args:
+        recipe (Recipe): The recipe to serialize.
+        ingredients (list): The recipe's ingredients as returned by `load_ingredients`.
+        fields (frozenset): The fields to include.
+
+    Returns:
+        dict: The serialized recipe.
+    """
+    data = {"id": recipe.id}
+    for name in _FIELD_COLUMNS:
+        if name in fields:
+            data[name] = getattr(recipe, name)
+    if ingredient_fields(fields):
+        data["ingredients"] = ingredients
+    return data
+
+
+def serialize_recipes(recipes, fields=DEFAULT_FIELDS):
+    """
+    Serialize a sequence of recipes, loading all of their ingredients at once.
+
+    The ingredient query is skipped when no ingredient field is selected.
+
+    Args:
+        recipes (Iterable[Recipe]): The recipes to serialize.
+        fields (frozenset): The fields to include.
+
+    Returns:
+        list: The serialized recipes, in the order given.
+    """
+    recipes = list(recipes)
+    if subfields := ingredient_fields(fields):
+        ingredients = load_ingredients((recipe.id for recipe in recipes), subfields)
     else:
-        db.session.execute(text("SET FOREIGN_KEY_CHECKS=1"))
+        ingredients = {}
+    return [
+        serialize_recipe(recipe, ingredients.get(recipe.id), fields)
+        for recipe in recipes
+    ]
+
+
+def project_recipe(data, fields):
+    """
+    Restrict a recipe serialized with `DEFAULT_FIELDS` to a subset of them.
+    """
+    projected = {name: data[name] for name in data if name in fields}
+    if subfields := ingredient_fields(fields):
+        projected["ingredients"] = [
+            {name: ingredient[name] for name in subfields}
+            for ingredient in data["ingredients"]
+        ]
+    return projected
+
+
+def recipe_etag(recipe_id, version, fields=DEFAULT_FIELDS):
+    """
+    Build the entity tag of a recipe from its ID and version.
+
+    Representations restricted to other fields than the default get a
+    distinct tag.
+    """
+    if fields == DEFAULT_FIELDS:
+        return f"{recipe_id}-{version}"
+    return f"{recipe_id}-{version}-{collection_etag(sorted(fields))[:12]}"
+
+
+def collection_etag(*parts):
+    """
+    Build an entity tag covering a list response.
+
+    Args:
+        *parts: JSON-serializable values the response depends on, such as the
+            request parameters and the ``(id, version)`` pairs of its recipes.
+
+    Returns:
+        str: A digest of the parts.
+    """
+    payload = json.dumps(parts, separators=(",", ":"), default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def etag_matches(etag):
+    """
+    Check whether the request's If-None-Match header matches an entity tag.
+    """
+    return request.if_none_match.contains_weak(etag)
+
+
+def if_match_versions(recipe_id):
+    """
+    Read the recipe versions the request's If-Match header accepts.
+
+    Tags are compared strongly, so weak ones never match; every
+    representation of a recipe version, whatever its fields, names it.
+
+    Args:
+        recipe_id (int): The ID of the recipe being written.
+
+    Returns:
+        set | None: The accepted versions, possibly none, or None if the
+            header is absent or ``*``.
+    """
+    if_match = request.if_match
+    if not if_match or if_match.star_tag:
+        return None
+    versions = set()
+    for tag in if_match.as_set():
+        parts = tag.split("-")
+        if len(parts) >= 2 and parts[0] == str(recipe_id) and parts[1].isdigit():
+            versions.add(int(parts[1]))
+    return versions
+
+
+def precondition_failed():
+    """
+    Build the 412 response of a write whose If-Match header is stale.
+    """
+    return jsonify(api_response(412, "Recipe has been modified")), 412
+
+
+def write_conflict(conditional):
+    """
+    Build the response of a write that lost a race with a concurrent one.
+
+    Args:
+        conditional (bool): Whether the request had an If-Match header, in
+            which case the response is 412; otherwise it is 409.
+    """
+    if conditional:
+        return precondition_failed()
+    message = "Recipe was modified by a concurrent request"
+    return jsonify(api_response(409, message)), 409
+
+
+def not_modified(etag, weak=False):
+    """
+    Build an empty 304 Not Modified response carrying an entity tag.
+    """
+    response = current_app.response_class(status=304)
+    response.set_etag(etag, weak=weak)
+    return response
+
+
+def etag_response(status_code, message, data, etag, weak=False):
+    """
+    Build a standard JSON API response carrying an entity tag.
+
+    Args:
+        weak (bool): Whether the tag only guarantees semantic equivalence.
+
+    Returns:
+        tuple: The response and its status code.
+    """
+    response = jsonify(api_response(status_code, message, data))
+    response.set_etag(etag, weak=weak)
+    return response, status_code
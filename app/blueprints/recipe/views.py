@@ -1,11 +1,65 @@
-from flask import current_app, jsonify, request
+import math
+
+from flask import current_app, jsonify, request, stream_with_context
 from flask.views import MethodView
 from flask_jwt_extended import get_jwt_identity, jwt_required
+from sqlalchemy.orm.exc import StaleDataError
 from werkzeug.exceptions import BadRequest
 
-from app.blueprints.recipe.utils import toggle_key_checks
+from app.blueprints.recipe.bulk import bulk_create_recipes, delete_recipes
+from app.blueprints.recipe.cache import (
+    cached_recipe,
+    get_recipe_cache,
+    get_recipe_documents,
+)
+from app.blueprints.recipe.changes import (
+    RECIPE_DELETED,
+    claim_recipe,
+    mark_recipes_changed,
+)
+from app.blueprints.recipe.counts import COUNT_ESTIMATED, COUNT_MODES, count_recipes
+from app.blueprints.recipe.export import iter_export_lines, parse_updated_since
+from app.blueprints.recipe.idempotency import idempotent
+from app.blueprints.recipe.ingredients import (
+    get_or_create_ingredients,
+    sync_recipe_ingredients,
+)
+from app.blueprints.recipe.pagination import InvalidCursor, keyset_page
+from app.blueprints.recipe.patch import (
+    JSON_PATCH_TYPE,
+    MERGE_PATCH_TYPE,
+    PATCH_FIELDS,
+    SCALAR_FIELDS,
+    InvalidPatch,
+    PatchTestFailed,
+    apply_json_patch,
+    merge_patch,
+    scalar_changes,
+    update_recipe_columns,
+    validate_changes,
+)
+from app.blueprints.recipe.schema import validate_recipe, validation_error
+from app.blueprints.recipe.search import MATCH_MODES, get_search_backend
+from app.blueprints.recipe.trigram import filter_by_trigrams
+from app.blueprints.recipe.utils import (
+    DEFAULT_FIELDS,
+    InvalidFields,
+    collection_etag,
+    etag_matches,
+    etag_response,
+    if_match_versions,
+    load_ingredients,
+    not_modified,
+    parse_fields,
+    precondition_failed,
+    project_recipe,
+    recipe_etag,
+    recipe_load_options,
+    unit_of_work,
+    write_conflict,
+)
 from app.extensions import db
-from app.models import Ingredient, Recipe, RecipeIngredient
+from app.models import Recipe, RecipeIngredient
 from app.utils import api_response
 
 
@@ -15,80 +69,62 @@ class RecipeAPI(MethodView):
     """
 
     @jwt_required()
+    @idempotent
     def post(self):
         """
         Create a new recipe.
-        Expects JSON body with title, description, and ingredients.
+        Expects JSON body with title, description, and ingredients, and
+        optionally instructions.
+        Retries sent with the same ``Idempotency-Key`` header replay the
+        original response instead of creating the recipe again.
         """
         if not request.data:
             return jsonify(api_response(400, "Invalid JSON data")), 400
 
-        data = request.get_json()
         try:
             data = request.get_json()
         except BadRequest as e:
             current_app.logger.error(f"Invalid JSON data: {str(e)}")
             return jsonify(api_response(400, "Invalid JSON data")), 400
 
-        # Validate input data
-        if not data or not isinstance(data, dict):
-            return jsonify(api_response(400, "Invalid JSON data")), 400
-
-        if not isinstance(data.get("title"), str) or not data["title"].strip():
-            return jsonify(api_response(400, "Invalid or missing title")), 400
-        if (
-            not isinstance(data.get("description"), str)
-            or not data["description"].strip()
-        ):
-            return jsonify(api_response(400, "Invalid or missing description")), 400
-        if not isinstance(data.get("ingredients"), list) or not data["ingredients"]:
-            return jsonify(api_response(400, "Invalid or missing ingredients")), 400
+        # Validate the whole payload before touching the database
+        if errors := validate_recipe(data):
+            return validation_error(errors)
 
         current_user_id = get_jwt_identity()
-        toggle_key_checks(enable=False)
 
         try:
-            # Create the recipe and associate it with the current user
-            recipe = Recipe(
-                title=data["title"],
-                description=data.get("description"),
-                user_id=current_user_id,
-            )
-
-            # Add recipe to session first
-            db.session.add(recipe)
-            db.session.flush()  # Get recipe.id before committing
-
-            # Process ingredients
-            ingredients_list = []
-            for ingredient_data in data.get("ingredients", []):
-                if (
-                    not isinstance(ingredient_data.get("name"), str)
-                    or not ingredient_data["name"].strip()
-                ):
-                    return jsonify(api_response(400, "Invalid ingredient name")), 400
-                if (
-                    not isinstance(ingredient_data.get("quantity"), str)
-                    or not ingredient_data["quantity"].strip()
-                ):
-                    return (
-                        jsonify(api_response(400, "Invalid ingredient quantity")),
-                        400,
-                    )
+            with unit_of_work():
+                # Create the recipe and associate it with the current user
+                recipe = Recipe(
+                    title=data["title"],
+                    description=data.get("description"),
+                    instructions=data.get("instructions"),
+                    user_id=current_user_id,
+                )
 
-                ingredient_name = ingredient_data["name"]
-                quantity = ingredient_data["quantity"]
+                # Add recipe to session first
+                db.session.add(recipe)
+                db.session.flush()  # Get recipe.id before committing
 
-                # Create ingredient and associate it with the recipe
-                ingredient = Ingredient(
-                    name=ingredient_name,
-                    recipes=[recipe],  # Associate with the recipe being created
+                # Link the recipe to catalog ingredients, creating missing ones
+                ingredient_ids = get_or_create_ingredients(
+                    ingredient["name"] for ingredient in data["ingredients"]
                 )
-                db.session.add(ingredient)
-                ingredients_list.append({"name": ingredient_name, "quantity": quantity})
-
-            toggle_key_checks(enable=True)
-            db.session.commit()
+                ingredients_list = []
+                for ingredient_data in data["ingredients"]:
+                    ingredient_name = ingredient_data["name"]
+                    quantity = ingredient_data["quantity"]
+                    db.session.add(
+                        RecipeIngredient(
+                            recipe_id=recipe.id,
+                            ingredient_id=ingredient_ids[ingredient_name],
+                            quantity=quantity,
+                        )
+                    )
+                    ingredients_list.append(
+                        {"name": ingredient_name, "quantity": quantity}
+                    )
 
             response_data = {
                 "id": recipe.id,
@@ -97,17 +133,15 @@ class RecipeAPI(MethodView):
                 "ingredients": ingredients_list,
             }
 
-            return (
-                jsonify(
-                    api_response(201, "Recipe created successfully", response_data)
-                ),
+            return etag_response(
                 201,
+                "Recipe created successfully",
+                response_data,
+                recipe_etag(recipe.id, recipe.version),
             )
 
         except Exception as e:
-            print(f"\ne - {e}\n")
             current_app.logger.error(f"Error creating recipe: {str(e)}")
-            toggle_key_checks(enable=True)
             return jsonify(api_response(500, "Internal server error")), 500
 
     @jwt_required()
@@ -115,92 +149,166 @@ class RecipeAPI(MethodView):
         """
         Retrieve a recipe by ID or list recipes with pagination and search.
         If ID is provided, returns the recipe with that ID.
-        Otherwise, returns a paginated list of recipes.
+        Otherwise, returns a paginated list of recipes. Passing a ``cursor``
+        query parameter (empty for the first page) switches the list to keyset
+        pagination, which returns a ``next_cursor`` instead of page totals.
+        The ``count`` parameter (``cached``, ``exact`` or ``estimate``) controls
+        how the page totals are obtained; ``total_type`` reports which was used.
+        ``match`` selects how ``search`` is matched: ``fulltext`` (the default)
+        uses the database's full-text index, ``substring`` and ``fuzzy`` use the
+        in-process trigram index. Trigram searches matching more than
+        ``TRIGRAM_MAX_RESULTS`` recipes only list that many, and say so with
+        ``truncated`` and an ``estimated`` total.
+        Responses carry an ETag; requests whose If-None-Match header matches
+        it get an empty 304 response.
+        ``fields`` restricts the recipes to a comma-separated list of fields,
+        e.g. ``id,title,ingredients.name``; ``instructions`` is only returned
+        when listed there.
         """
+        try:
+            fields = parse_fields(request.args.get("fields"))
+        except InvalidFields as e:
+            return jsonify(api_response(400, f"Invalid field: {e}")), 400
+
         if id:
-            if not (recipe := Recipe.query.get(id)):
+            if fields <= DEFAULT_FIELDS and (cached := cached_recipe(id)) is not None:
+                etag = recipe_etag(id, cached["version"], fields)
+                if etag_matches(etag):
+                    return not_modified(etag)
+                return etag_response(
+                    200,
+                    "Recipe retrieved successfully",
+                    project_recipe(cached["data"], fields),
+                    etag,
+                )
+
+            if request.if_none_match:
+                # Answer revalidations from the version alone.
+                version = db.session.query(Recipe.version).filter_by(id=id).scalar()
+                if version is not None and etag_matches(
+                    recipe_etag(id, version, fields)
+                ):
+                    return not_modified(recipe_etag(id, version, fields))
+
+            recipe = db.session.get(Recipe, id, options=recipe_load_options(fields))
+            if not recipe:
                 return jsonify(api_response(404, f"Recipe with id {id} not found")), 404
 
-            response_data = {
-                "id": recipe.id,
-                "title": recipe.title,
-                "description": recipe.description,
-                "ingredients": [
-                    {
-                        "name": ingredient.name,
-                        "quantity": ri.quantity,
-                    }
-                    for ingredient, ri in db.session.query(
-                        Ingredient, RecipeIngredient
-                    ).filter(
-                        RecipeIngredient.recipe_id == recipe.id,
-                        RecipeIngredient.ingredient_id == Ingredient.id,
-                    )
-                ],
-            }
-            return (
-                jsonify(
-                    api_response(200, "Recipe retrieved successfully", response_data)
-                ),
+            response_data = get_recipe_documents([recipe], lookup=False, fields=fields)
+            return etag_response(
                 200,
+                "Recipe retrieved successfully",
+                response_data[0],
+                recipe_etag(recipe.id, recipe.version, fields),
             )
         page = request.args.get("page", 1, type=int)
         per_page = current_app.config["ITEMS_PER_PAGE"]
-        query = Recipe.query
+        query = Recipe.query.options(*recipe_load_options(fields))
+        match = request.args.get("match", "fulltext")
+        if match not in MATCH_MODES:
+            return jsonify(api_response(400, "Invalid match mode")), 400
+        truncated = False
         if search := request.args.get("search"):
-            query = query.filter(
-                Recipe.title.ilike(f"%{search}%")
-                | Recipe.ingredients.any(Ingredient.name.ilike(f"%{search}%"))
+            if match == "fulltext":
+                query = get_search_backend().filter(query, search)
+            elif (filtered := filter_by_trigrams(query, search, match)) is None:
+                return (
+                    jsonify(
+                        api_response(400, f"{match.capitalize()} search is disabled")
+                    ),
+                    400,
+                )
+            else:
+                query, truncated = filtered
+
+        if (cursor := request.args.get("cursor")) is not None:
+            try:
+                items, next_cursor = keyset_page(query, cursor, per_page)
+            except InvalidCursor:
+                return jsonify(api_response(400, "Invalid cursor")), 400
+
+            etag = collection_etag(
+                sorted(request.args.items(multi=True)),
+                [(r.id, r.version) for r in items],
+                next_cursor,
+            )
+            if etag_matches(etag):
+                return not_modified(etag)
+
+            response_data = {
+                "recipes": get_recipe_documents(items, fields=fields),
+                "next_cursor": next_cursor,
+                "per_page": per_page,
+            }
+            if truncated:
+                response_data["truncated"] = True
+            return etag_response(
+                200, "Recipes retrieved successfully", response_data, etag
             )
 
-        recipes = query.paginate(page=page, per_page=per_page)
+        count_mode = request.args.get("count", "cached")
+        if count_mode not in COUNT_MODES:
+            return jsonify(api_response(400, "Invalid count mode")), 400
+
+        recipes = query.paginate(page=page, per_page=per_page, count=False)
+        total, total_type = count_recipes(query, search, count_mode, match)
+        if truncated:
+            # The total only counts the matches that were kept.
+            total_type = COUNT_ESTIMATED
+
+        # The tag is weak because it ignores total_type, which only says how
+        # an otherwise identical total was obtained.
+        etag = collection_etag(
+            sorted(request.args.items(multi=True)),
+            [(r.id, r.version) for r in recipes.items],
+            total,
+        )
+        if etag_matches(etag):
+            return not_modified(etag, weak=True)
 
         response_data = {
-            "recipes": [
-                {
-                    "id": r.id,
-                    "title": r.title,
-                    "description": r.description,
-                    "ingredients": [
-                        {
-                            "name": ingredient.name,
-                            "quantity": ri.quantity,
-                        }
-                        for ingredient, ri in db.session.query(
-                            Ingredient, RecipeIngredient
-                        ).filter(
-                            RecipeIngredient.recipe_id == r.id,
-                            RecipeIngredient.ingredient_id == Ingredient.id,
-                        )
-                    ],
-                }
-                for r in recipes.items
-            ],
-            "total": recipes.total,
-            "pages": recipes.pages,
+            "recipes": get_recipe_documents(recipes.items, fields=fields),
+            "total": total,
+            "total_type": total_type,
+            "pages": math.ceil(total / per_page),
             "current_page": recipes.page,
         }
+        if truncated:
+            response_data["truncated"] = True
 
-        return (
-            jsonify(api_response(200, "Recipes retrieved successfully", response_data)),
-            200,
+        return etag_response(
+            200, "Recipes retrieved successfully", response_data, etag, weak=True
         )
 
     @jwt_required()
     def delete(self, id):
-        toggle_key_checks(enable=False)
-
+        """
+        Delete a recipe by ID.
+        With an If-Match header the recipe is only deleted at a matching
+        version; otherwise the response is 412.
+        """
+        versions = if_match_versions(id)
+        statement = Recipe.__table__.delete().where(Recipe.id == id)
+        if versions is not None:
+            statement = statement.where(Recipe.version.in_(versions))
         try:
-            if recipe := Recipe.query.get(id):
-                db.session.delete(recipe)
-                db.session.commit()
+            # Deleted without loading it; its ingredient links are removed by
+            # the database's ON DELETE CASCADE
+            with unit_of_work() as session:
+                deleted = session.execute(statement).rowcount
+                if deleted:
+                    mark_recipes_changed([id], RECIPE_DELETED, session)
+            if deleted:
                 message = {"message": "Recipe deleted successfully", "id": id}
                 status_code = 200
+            elif versions is not None and db.session.scalar(
+                db.select(Recipe.id).where(Recipe.id == id)
+            ):
+                return precondition_failed()
             else:
                 message = {"message": f"Recipe with id {id} not found", "id": id}
                 status_code = 404
 
-            toggle_key_checks(enable=True)
             return (
                 jsonify(api_response(status_code, message["message"], message)),
                 status_code,
@@ -208,112 +316,384 @@ class RecipeAPI(MethodView):
 
         except Exception as e:
             current_app.logger.error(f"Error deleting recipe: {str(e)}")
-            toggle_key_checks(enable=True)
             return jsonify(api_response(500, "Internal server error")), 500
 
     @jwt_required()
     def put(self, id):
         """
         Update an existing recipe by ID.
-        Expects JSON body with updated title, description, and ingredients.
+        Expects JSON body with updated title, description, instructions and
+        ingredients. Only the ingredient links that differ from the stored ones are
+        written; ``ingredient_changes`` lists the names added, updated and
+        removed. With an If-Match header the update only applies to a
+        matching version of the recipe; otherwise the response is 412. The
+        recipe row is updated first, conditional on the version read, so a
+        concurrent update gets a 412 (or a 409 without If-Match) before
+        touching the ingredients.
         """
         data = request.get_json()
 
-        # Validate input data
-        if not data or not isinstance(data, dict):
-            return jsonify(api_response(400, "Invalid JSON data")), 400
+        # Validate the whole payload before touching the database
+        if errors := validate_recipe(data, partial=True):
+            return validation_error(errors)
 
         # Validate recipe existence
         recipe = Recipe.query.get(id)
         if not recipe:
             return jsonify(api_response(404, f"Recipe with id {id} not found")), 404
+        versions = if_match_versions(id)
+        if versions is not None and recipe.version not in versions:
+            return precondition_failed()
 
         try:
-            # Validate and update title
             if "title" in data:
-                if not isinstance(data["title"], str) or not data["title"].strip():
-                    return jsonify(api_response(400, "Invalid or missing title")), 400
                 recipe.title = data["title"]
-
-            # Validate and update description
             if "description" in data:
-                if (
-                    not isinstance(data["description"], str)
-                    or not data["description"].strip()
-                ):
-                    return (
-                        jsonify(api_response(400, "Invalid or missing description")),
-                        400,
-                    )
                 recipe.description = data["description"]
+            if "instructions" in data:
+                recipe.instructions = data["instructions"]
+            # Update the recipe row before its ingredients, conditional on the
+            # version read above
+            claim_recipe(recipe)
 
-            # Validate ingredients
             if "ingredients" in data:
-                if not isinstance(data["ingredients"], list) or not data["ingredients"]:
-                    return (
-                        jsonify(api_response(400, "Invalid or missing ingredients")),
-                        400,
-                    )
+                # Write only the links that differ from the stored ones
+                ingredient_changes = sync_recipe_ingredients(
+                    recipe.id, data["ingredients"]
+                )
 
-                # Delete existing ingredients and add new ones
-                RecipeIngredient.query.filter_by(recipe_id=id).delete()
-                for ingredient_data in data["ingredients"]:
-                    if (
-                        not isinstance(ingredient_data.get("name"), str)
-                        or not ingredient_data["name"].strip()
-                    ):
+            db.session.commit()
+
+            updated_data = get_recipe_documents([recipe], lookup=False)[0]
+            if "ingredients" in data:
+                updated_data = dict(updated_data, ingredient_changes=ingredient_changes)
+
+            return etag_response(
+                200,
+                "Recipe updated successfully",
+                updated_data,
+                recipe_etag(recipe.id, recipe.version),
+            )
+
+        except StaleDataError:
+            db.session.rollback()
+            return write_conflict(versions is not None)
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Error updating recipe: {str(e)}")
+            return jsonify(api_response(500, "Internal server error")), 500
+
+    @jwt_required()
+    def patch(self, id):
+        """
+        Partially update a recipe by ID.
+        Accepts a JSON Merge Patch (RFC 7396), or a JSON Patch (RFC 6902) sent
+        as ``application/json-patch+json``, over the recipe's title,
+        description, instructions and ingredient list. Patches that only set
+        title, description or instructions are written with a single UPDATE
+        without loading the recipe. If-Match is honoured as for PUT.
+        Merge patches may also be sent as ``application/json``; other content
+        types get a 415 response.
+        """
+        if request.mimetype not in (
+            MERGE_PATCH_TYPE,
+            JSON_PATCH_TYPE,
+            "application/json",
+        ):
+            return jsonify(api_response(415, "Unsupported patch content type")), 415
+        try:
+            patch = request.get_json()
+        except BadRequest:
+            return jsonify(api_response(400, "Invalid JSON data")), 400
+        json_patch = request.mimetype == JSON_PATCH_TYPE
+        versions = if_match_versions(id)
+
+        ingredient_changes = None
+        try:
+            changes = scalar_changes(patch, json_patch)
+            if changes is not None:
+                if errors := validate_changes(changes):
+                    return validation_error(errors)
+                with unit_of_work():
+                    updated = changes and update_recipe_columns(id, changes, versions)
+                if not updated:
+                    recipe = db.session.get(Recipe, id)
+                    if not recipe:
                         return (
-                            jsonify(api_response(400, "Invalid ingredient name")),
-                            400,
+                            jsonify(
+                                api_response(404, f"Recipe with id {id} not found")
+                            ),
+                            404,
                         )
-                    if (
-                        not isinstance(ingredient_data.get("quantity"), str)
-                        or not ingredient_data["quantity"].strip()
+                    # The recipe exists, so a write that matched no row was stale
+                    if changes or (
+                        versions is not None and recipe.version not in versions
                     ):
-                        return (
-                            jsonify(api_response(400, "Invalid ingredient quantity")),
-                            400,
+                        return precondition_failed()
+            else:
+                if not (recipe := db.session.get(Recipe, id)):
+                    return (
+                        jsonify(api_response(404, f"Recipe with id {id} not found")),
+                        404,
+                    )
+                if versions is not None and recipe.version not in versions:
+                    return precondition_failed()
+                document = {name: getattr(recipe, name) for name in SCALAR_FIELDS}
+                document["ingredients"] = load_ingredients([id])[id]
+                if json_patch:
+                    patched = apply_json_patch(document, patch)
+                elif isinstance(patch, dict):
+                    patched = merge_patch(document, patch)
+                else:
+                    raise InvalidPatch("A merge patch must be an object")
+                if not isinstance(patched, dict) or set(patched) - set(PATCH_FIELDS):
+                    raise InvalidPatch("Unknown recipe member")
+
+                changes = {
+                    name: patched.get(name)
+                    for name in PATCH_FIELDS
+                    if patched.get(name) != document[name]
+                }
+                if errors := validate_changes(changes):
+                    return validation_error(errors)
+                with unit_of_work():
+                    for name in SCALAR_FIELDS:
+                        if name in changes:
+                            setattr(recipe, name, changes[name])
+                    if changes:
+                        claim_recipe(recipe)
+                    if "ingredients" in changes:
+                        ingredient_changes = sync_recipe_ingredients(
+                            id, changes["ingredients"]
                         )
+        except StaleDataError:
+            return write_conflict(versions is not None)
+        except InvalidPatch as e:
+            return jsonify(api_response(400, f"Invalid patch: {e}")), 400
+        except PatchTestFailed as e:
+            return jsonify(api_response(409, f"Patch test failed at {e}")), 409
+        except Exception as e:
+            current_app.logger.error(f"Error patching recipe: {str(e)}")
+            return jsonify(api_response(500, "Internal server error")), 500
 
-                    ingredient_name = ingredient_data["name"]
-                    quantity = ingredient_data["quantity"]
+        recipe = db.session.get(Recipe, id, options=recipe_load_options())
+        if not recipe:
+            # Deleted by a concurrent request since the patch committed
+            return jsonify(api_response(404, f"Recipe with id {id} not found")), 404
+        patched_data = get_recipe_documents([recipe])[0]
+        if ingredient_changes is not None:
+            patched_data = dict(patched_data, ingredient_changes=ingredient_changes)
+        return etag_response(
+            200,
+            "Recipe updated successfully",
+            patched_data,
+            recipe_etag(recipe.id, recipe.version),
+        )
 
-                    # Check if ingredient already exists
-                    ingredient = Ingredient.query.filter_by(
-                        name=ingredient_name
-                    ).first()
-                    if not ingredient:
-                        ingredient = Ingredient(name=ingredient_name)
-                        db.session.add(ingredient)
-                        db.session.flush()  # Get ingredient.id before committing
-
-                    # Create association with quantity
-                    recipe_ingredient = RecipeIngredient(
-                        recipe_id=recipe.id,
-                        ingredient_id=ingredient.id,
-                        quantity=quantity,
-                    )
-                    db.session.add(recipe_ingredient)
 
-            db.session.commit()
+class RecipeCacheStatsAPI(MethodView):
+    """
+    API endpoint exposing the recipe cache counters of the serving worker.
+    """
 
-            updated_data = {
-                "id": recipe.id,
-                "title": recipe.title,
-                "description": recipe.description,
-                "ingredients": [
-                    {"name": ingredient.name, "quantity": ri.quantity}
-                    for ingredient, ri in db.session.query(Ingredient, RecipeIngredient)
-                    .filter(RecipeIngredient.recipe_id == recipe.id)
-                    .filter(RecipeIngredient.ingredient_id == Ingredient.id)
-                ],
-            }
+    @jwt_required()
+    def get(self):
+        """
+        Return the hit, miss and eviction counters of the recipe cache.
+        """
+        if (cache := get_recipe_cache()) is None:
+            return jsonify(api_response(404, "Recipe cache is disabled")), 404
+        return (
+            jsonify(
+                api_response(200, "Cache statistics retrieved", data=cache.stats())
+            ),
+            200,
+        )
 
+
+class RecipeExportAPI(MethodView):
+    """
+    API endpoint streaming the recipe catalog for mirroring.
+    """
+
+    @jwt_required()
+    def get(self):
+        """
+        Stream every recipe with its ingredients as newline-delimited JSON.
+        ``user_id`` restricts the export to one user's recipes and
+        ``updated_since`` (ISO 8601) to recipes changed at or after that time.
+        """
+        user_id = request.args.get("user_id", type=int)
+        updated_since = request.args.get("updated_since")
+        if updated_since is not None:
+            try:
+                updated_since = parse_updated_since(updated_since)
+            except ValueError:
+                return jsonify(api_response(400, "Invalid updated_since")), 400
+
+        return current_app.response_class(
+            stream_with_context(iter_export_lines(user_id, updated_since)),
+            mimetype="application/x-ndjson",
+        )
+
+
+class RecipeBatchAPI(MethodView):
+    """
+    API endpoint fetching many recipes by ID in one request.
+    """
+
+    @jwt_required()
+    def get(self):
+        """
+        Retrieve the recipes listed in ``ids``, a comma-separated list of IDs.
+        Recipes are returned in request order; IDs without a recipe get a
+        ``{"id": ..., "not_found": true}`` marker and are also listed under
+        ``not_found``. ``fields`` selects fields as for the other reads.
+        """
+        try:
+            ids = [int(part) for part in request.args.get("ids", "").split(",")]
+        except ValueError:
+            return jsonify(api_response(400, "Invalid ids")), 400
+        max_ids = current_app.config["BATCH_MAX_IDS"]
+        if len(ids) > max_ids:
+            return jsonify(api_response(400, f"Too many ids (max {max_ids})")), 400
+        try:
+            fields = parse_fields(request.args.get("fields"))
+        except InvalidFields as e:
+            return jsonify(api_response(400, f"Invalid field: {e}")), 400
+
+        recipes = (
+            Recipe.query.options(*recipe_load_options(fields))
+            .filter(Recipe.id.in_(set(ids)))
+            .order_by(Recipe.id)
+            .all()
+        )
+        etag = collection_etag(
+            ids, sorted(fields), [(r.id, r.version) for r in recipes]
+        )
+        if etag_matches(etag):
+            return not_modified(etag)
+
+        documents = dict(
+            zip(
+                (recipe.id for recipe in recipes),
+                get_recipe_documents(recipes, fields=fields),
+            )
+        )
+        response_data = {
+            "recipes": [
+                documents.get(recipe_id, {"id": recipe_id, "not_found": True})
+                for recipe_id in ids
+            ],
+            "not_found": [
+                recipe_id
+                for recipe_id in dict.fromkeys(ids)
+                if recipe_id not in documents
+            ],
+        }
+        return etag_response(200, "Recipes retrieved successfully", response_data, etag)
+
+
+class RecipeBulkAPI(MethodView):
+    """
+    API endpoint creating or deleting many recipes in one request.
+    """
+
+    @jwt_required()
+    @idempotent
+    def post(self):
+        """
+        Create the recipes of a JSON array, each shaped as for a single create.
+        All items are validated first; valid ones are created even if others
+        are not. Responds 201 if every recipe was created, 207 if only some
+        were and 400 if none could be, with one result per item. Honours
+        the ``Idempotency-Key`` header like single creation.
+        """
+        try:
+            items = request.get_json()
+        except BadRequest:
+            items = None
+        if not isinstance(items, list) or not items:
+            return jsonify(api_response(400, "Invalid JSON data")), 400
+        max_items = current_app.config["BULK_MAX_ITEMS"]
+        if len(items) > max_items:
             return (
-                jsonify(api_response(200, "Recipe updated successfully", updated_data)),
-                200,
+                jsonify(api_response(400, f"Too many recipes (max {max_items})")),
+                400,
             )
 
+        results = bulk_create_recipes(items, get_jwt_identity())
+
+        created = sum(result["status"] == 201 for result in results)
+        if created == len(results):
+            status_code, message = 201, "Recipes created successfully"
+        elif created:
+            status_code, message = 207, "Some recipes could not be created"
+        else:
+            status_code = max(result["status"] for result in results)
+            message = "No recipes were created"
+        response_data = {"created": created, "results": results}
+        return jsonify(api_response(status_code, message, response_data)), status_code
+
+    @jwt_required()
+    def delete(self):
+        """
+        Delete many of the current user's recipes.
+        Expects a JSON body with either ``ids``, a list of recipe IDs, or
+        ``all`` set to true to delete every recipe of the user. Recipes are
+        deleted with set-based statements in chunks of ``BULK_CHUNK_SIZE``,
+        each in its own transaction. IDs that are unknown or belong to other
+        users are listed in ``not_found``.
+        """
+        try:
+            data = request.get_json()
+        except BadRequest:
+            data = None
+        if not isinstance(data, dict):
+            return jsonify(api_response(400, "Invalid JSON data")), 400
+
+        owned = Recipe.user_id == int(get_jwt_identity())
+        if data.get("all") is True and "ids" not in data:
+            condition, recipe_ids = owned, None
+        else:
+            recipe_ids = data.get("ids")
+            if (
+                not isinstance(recipe_ids, list)
+                or not recipe_ids
+                or any(
+                    not isinstance(recipe_id, int) or isinstance(recipe_id, bool)
+                    for recipe_id in recipe_ids
+                )
+            ):
+                return jsonify(api_response(400, "Invalid ids")), 400
+            max_items = current_app.config["BULK_MAX_ITEMS"]
+            if len(recipe_ids) > max_items:
+                return (
+                    jsonify(api_response(400, f"Too many ids (max {max_items})")),
+                    400,
+                )
+            recipe_ids = list(dict.fromkeys(recipe_ids))
+            condition = db.and_(owned, Recipe.id.in_(recipe_ids))
+
+        deleted = 0
+        found = set()
+        try:
+            for chunk in delete_recipes(condition):
+                deleted += len(chunk)
+                if recipe_ids is not None:
+                    found.update(chunk)
         except Exception as e:
-            current_app.logger.error(f"Error updating recipe: {str(e)}")
-            return jsonify(api_response(500, "Internal server error")), 500
+            current_app.logger.error(f"Error deleting recipes: {str(e)}")
+            return (
+                jsonify(
+                    api_response(500, "Internal server error", {"deleted": deleted})
+                ),
+                500,
+            )
+
+        response_data = {"deleted": deleted}
+        if recipe_ids is not None:
+            response_data["not_found"] = [
+                recipe_id for recipe_id in recipe_ids if recipe_id not in found
+            ]
+        return jsonify(api_response(200, "Recipes deleted", response_data)), 200
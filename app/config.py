@@ -11,3 +11,57 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY")
     ITEMS_PER_PAGE = 10  # For pagination
+    # Authenticate API requests from JWT claims alone: login issues no
+    # session cookie and users are not loaded per request.
+    AUTH_STATELESS = False
+    # Snapshots of authenticated users, saving a query per request.
+    IDENTITY_CACHE_TTL = 60  # Seconds
+    IDENTITY_CACHE_MAX_ENTRIES = 10000
+    # Revoked access tokens: a Bloom filter of their IDs, refreshed from the
+    # revoked_token table, clears almost every request without a query.
+    REVOCATION_FILTER_CAPACITY = 100000  # Revocations before the filter grows
+    REVOCATION_FILTER_ERROR_RATE = 0.001  # Share of tokens confirmed by a query
+    REVOCATION_REFRESH_INTERVAL = 1.0  # Seconds between reads of new revocations
+    REVOCATION_REFRESH_OVERLAP = 60  # Seconds of revocations re-read per refresh
+    # Password hashing: the algorithm used for new hashes, the Werkzeug
+    # method string (with its cost) of each, and the processes hashing
+    # off the request worker (0 hashes inline). The pool belongs to each
+    # worker process.
+    PASSWORD_HASH_METHOD = "scrypt"
+    PASSWORD_HASH_METHODS = {
+        "scrypt": "scrypt:32768:8:1",
+        "pbkdf2": "pbkdf2:sha256:600000",
+    }
+    PASSWORD_HASH_POOL_SIZE = 2
+    PASSWORD_HASH_TIMEOUT = 30  # Seconds a request waits for a hash
+    PASSWORD_HASH_BACKLOG = 4  # Hashes queued beyond the pool before a 503
+    PASSWORD_HASH_RETRY_AFTER = 1  # Seconds sent in Retry-After with the 503
+    COUNT_CACHE_TTL = 60  # Seconds a cached listing total stays valid
+    COUNT_CACHE_MAX_ENTRIES = 1024
+    # Recipe search backend: "auto" (native full-text for the database),
+    # "postgresql", "mysql", "sqlite" or "like".
+    SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "auto")
+    # In-process trigram index used by ?match=substring and ?match=fuzzy.
+    TRIGRAM_INDEX_ENABLED = True
+    TRIGRAM_MAX_DISTANCE = 2  # Upper bound on edits tolerated by fuzzy search
+    TRIGRAM_MAX_RESULTS = 1000
+    # Cache of serialized recipes: an in-process LRU plus an optional shared
+    # tier (None, "local", or a SharedCacheClient instance).
+    RECIPE_CACHE_ENABLED = True
+    RECIPE_CACHE_MAX_ENTRIES = 10000
+    RECIPE_CACHE_TTL = 300  # Seconds
+    RECIPE_CACHE_SHARED = None
+    EXPORT_BATCH_SIZE = 1000  # Recipes streamed per batch by the NDJSON export
+    BATCH_MAX_IDS = 100  # Recipes fetched at most by one /batch request
+    BULK_MAX_ITEMS = 10000  # Recipes accepted by one bulk create request
+    BULK_CHUNK_SIZE = 500  # Recipes inserted per transaction by bulk create
+    INGREDIENT_CACHE_MAX_ENTRIES = 10000  # Ingredient name to ID mappings cached
+    RECIPE_MAX_INGREDIENTS = 100  # Ingredients accepted per recipe
+    RECIPE_MAX_TEXT_LENGTH = 20000  # Characters of a description or instructions
+    IDEMPOTENCY_TTL = 86400  # Seconds an Idempotency-Key is remembered
+    IDEMPOTENCY_CACHE_MAX_ENTRIES = 10000
+    # Recipe change outbox, replayed by each worker to follow other workers' writes.
+    OUTBOX_POLL_INTERVAL = 1.0  # Seconds between polls, checked on each request
+    OUTBOX_BATCH_SIZE = 1000  # Events read per query
+    OUTBOX_GAP_TIMEOUT = 60  # Seconds an event ID skipped by a poll is awaited
+    OUTBOX_RETENTION = 86400  # Seconds events are kept before being purged
@@ -1,10 +1,24 @@
 from datetime import datetime
 
 from flask_login import UserMixin
-from sqlalchemy.orm import relationship
-from werkzeug.security import check_password_hash, generate_password_hash
+from sqlalchemy.orm import relationship, validates
 
 from app.extensions import db
+from app.passwords import hash_password, verify_password
+
+
+def normalize_ingredient_name(name):
+    """
+    Return the catalog key of an ingredient name: lowercased, whitespace collapsed.
+    """
+    return " ".join(name.lower().split())
+
+
+def normalize_user_key(value):
+    """
+    Return the case-insensitive key of a username or email.
+    """
+    return value.lower()
 
 
 class User(UserMixin, db.Model):
@@ -15,19 +29,39 @@ class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(64), index=True, unique=True)
     email = db.Column(db.String(120), index=True, unique=True)
+    # Usernames and emails are unique regardless of case.
+    normalized_username = db.Column(
+        db.String(64), nullable=False, unique=True, index=True
+    )
+    normalized_email = db.Column(
+        db.String(120), nullable=False, unique=True, index=True
+    )
     password_hash = db.Column(db.String(256), nullable=False)
     recipes = db.relationship(
-        "Recipe", backref="author", lazy="dynamic", cascade="all, delete-orphan"
+        "Recipe",
+        backref="author",
+        lazy="dynamic",
+        cascade="all, delete-orphan",
+        # Recipes are removed by the database's ON DELETE CASCADE.
+        passive_deletes=True,
     )
 
+    @validates("username", "email")
+    def validate_identifier(self, key, value):
+        """
+        Keep the normalized username and email in sync with them.
+        """
+        setattr(self, f"normalized_{key}", normalize_user_key(value))
+        return value
+
     def set_password(self, password):
         """
-        Set the user's password.
+        Set the user's password, hashed with the configured method.
 
         Args:
             password (str): The password to set.
         """
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
         """
@@ -39,7 +73,7 @@ class User(UserMixin, db.Model):
         Returns:
             bool: True if the password is correct, False otherwise.
         """
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
 
     def get_id(self):
         """
@@ -79,13 +113,31 @@ class Recipe(db.Model):
     title = db.Column(db.String(128))
     description = db.Column(db.Text)
     instructions = db.Column(db.Text)
-    user_id = db.Column(db.Integer, db.ForeignKey("user.id"))
+    user_id = db.Column(
+        db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), index=True
+    )
+    # Incremented on every committed change, used to build ETags. The ORM
+    # updates rows conditionally on it (optimistic concurrency control).
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    # Time of the last committed change (UTC), used for incremental exports.
+    updated_at = db.Column(
+        db.DateTime,
+        nullable=False,
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+        server_default=db.func.current_timestamp(),
+        index=True,
+    )
     ingredients = db.relationship(
         "Ingredient",
         secondary="recipe_ingredient",
-        backref=db.backref("recipes", lazy=True),
+        backref=db.backref("recipes", lazy=True, passive_deletes=True),
+        # Links are removed by the database's ON DELETE CASCADE.
+        passive_deletes=True,
     )
 
+    __mapper_args__ = {"version_id_col": version}
+
     def __repr__(self):
         """
         Get a string representation of the recipe.
@@ -103,6 +155,16 @@ class Ingredient(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(128), nullable=False)
+    # Ingredients are unique by normalized name; `name` keeps the first spelling.
+    normalized_name = db.Column(db.String(128), nullable=False, unique=True, index=True)
+
+    @validates("name")
+    def validate_name(self, key, name):
+        """
+        Keep the normalized name in sync with the name.
+        """
+        self.normalized_name = normalize_ingredient_name(name)
+        return name
 
     def __repr__(self):
         """
@@ -120,8 +182,67 @@ class RecipeIngredient(db.Model):
     """
 
     __tablename__ = "recipe_ingredient"
-    recipe_id = db.Column(db.Integer, db.ForeignKey("recipe.id"), primary_key=True)
+    recipe_id = db.Column(
+        db.Integer, db.ForeignKey("recipe.id", ondelete="CASCADE"), primary_key=True
+    )
     ingredient_id = db.Column(
-        db.Integer, db.ForeignKey("ingredient.id"), primary_key=True
+        db.Integer,
+        db.ForeignKey("ingredient.id", ondelete="CASCADE"),
+        primary_key=True,
     )
     quantity = db.Column(db.String(64))
+
+
+class IdempotencyKey(db.Model):
+    """
+    Outcome of a write request sent with an Idempotency-Key header.
+
+    A row without ``status_code`` marks a request still being processed.
+    """
+
+    __tablename__ = "idempotency_key"
+    user_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    key = db.Column(db.String(255), primary_key=True)
+    request_hash = db.Column(db.String(64), nullable=False)
+    status_code = db.Column(db.Integer)
+    response = db.Column(db.Text)
+    # Replayed response headers, such as the ETag, by name.
+    headers = db.Column(db.JSON)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+
+class RecipeEvent(db.Model):
+    """
+    Outbox entry recording a recipe change, written in the transaction making it.
+
+    Workers replay the entries written by other workers, in ID order, to keep
+    their caches and indexes in step with the database.
+    """
+
+    __tablename__ = "recipe_event"
+    id = db.Column(db.Integer, primary_key=True)
+    # Not a foreign key: events of deleted recipes outlive them.
+    recipe_id = db.Column(db.Integer, nullable=False)
+    op = db.Column(db.String(8), nullable=False)
+    # Process that made the change, which has already applied it.
+    origin = db.Column(db.String(32), nullable=False)
+    created_at = db.Column(
+        db.DateTime, nullable=False, default=datetime.utcnow, index=True
+    )
+
+
+class RevokedToken(db.Model):
+    """
+    Access token revoked before its expiry, by its JWT ID.
+
+    Workers follow the table by ``revoked_at`` to keep their in-process
+    filter of revoked IDs current.
+    """
+
+    __tablename__ = "revoked_token"
+    jti = db.Column(db.String(36), primary_key=True)
+    # Rows can be purged once the token would have expired anyway.
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    revoked_at = db.Column(
+        db.DateTime, nullable=False, default=datetime.utcnow, index=True
+    )
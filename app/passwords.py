@@ -0,0 +1,109 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+_pool = None
+_pool_slots = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+class PasswordHashBusy(Exception):
+    """
+    Raised when the hashing pool is full or a hash did not finish in time.
+    """
+
+
+def _get_pool(size, backlog):
+    """
+    Return the password hashing pool of this process, starting it on first use.
+
+    Worker processes are spawned rather than forked, so a pool is never
+    inherited from a parent process or copies its threads' state.
+
+    Returns:
+        tuple: The pool and the semaphore admitting work to it, with room for
+            ``size + backlog`` hashes.
+    """
+    global _pool, _pool_slots, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(
+                max_workers=size, mp_context=multiprocessing.get_context("spawn")
+            )
+            _pool_slots = threading.BoundedSemaphore(size + backlog)
+            _pool_pid = os.getpid()
+        return _pool, _pool_slots
+
+
+def _run(fn, *args):
+    """
+    Run a hashing function in the pool, or inline if the pool is disabled.
+
+    A hash holds its slot until it finishes, even once the request has
+    stopped waiting for it, so abandoned work cannot pile up behind the pool.
+
+    Raises:
+        PasswordHashBusy: If every slot is taken, or the hash did not finish
+            within ``PASSWORD_HASH_TIMEOUT`` seconds.
+    """
+    size = current_app.config["PASSWORD_HASH_POOL_SIZE"]
+    if not size:
+        return fn(*args)
+    pool, slots = _get_pool(size, current_app.config["PASSWORD_HASH_BACKLOG"])
+    if not slots.acquire(blocking=False):
+        raise PasswordHashBusy()
+    try:
+        future = pool.submit(fn, *args)
+    except BaseException:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+    try:
+        return future.result(timeout=current_app.config["PASSWORD_HASH_TIMEOUT"])
+    except TimeoutError:
+        # Only a hash still queued can be cancelled; a running one finishes.
+        future.cancel()
+        raise PasswordHashBusy() from None
+
+
+def hash_method():
+    """
+    Return the Werkzeug method string of the configured algorithm and cost.
+    """
+    method = current_app.config["PASSWORD_HASH_METHOD"]
+    return current_app.config["PASSWORD_HASH_METHODS"][method]
+
+
+def hash_password(password):
+    """
+    Hash a password with the configured algorithm and cost.
+
+    Args:
+        password (str): The password to hash.
+
+    Returns:
+        str: The salted hash, prefixed with its method and parameters.
+    """
+    return _run(generate_password_hash, password, hash_method())
+
+
+def verify_password(password_hash, password):
+    """
+    Check a password against a hash made with any supported method.
+
+    Returns:
+        bool: True if the password matches.
+    """
+    return _run(check_password_hash, password_hash, password)
+
+
+def needs_rehash(password_hash):
+    """
+    Check whether a hash was made with other parameters than the configured ones.
+    """
+    return password_hash.split("$", 1)[0] != hash_method()
@@ -0,0 +1,146 @@
+"""
+Measure how login load affects recipe read latency.
+
+The application runs in-process against a temporary SQLite database. For
+each password hashing pool size given, threads log in continuously while
+another thread reads a recipe, as requests would share a threaded worker;
+a first run without logins gives the baseline read latency.
+
+Usage:
+    python benchmarks/login_load.py [--pool-sizes 0,2] [--login-threads 4]
+        [--duration 5]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app  # noqa: E402
+from app.config import Config  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.models import User  # noqa: E402
+
+EMAIL = "bench@example.com"
+PASSWORD = "Benchmark@12345"
+
+
+def _make_app(database, pool_size):
+    class BenchmarkConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{database}"
+        SECRET_KEY = JWT_SECRET_KEY = "benchmark"
+        PASSWORD_HASH_POOL_SIZE = pool_size
+
+    return create_app(BenchmarkConfig)
+
+
+def _setup(app):
+    """
+    Create the benchmark user and a recipe, returning the recipe's URL and headers.
+    """
+    with app.app_context():
+        db.create_all()
+        user = User(username="bench", email=EMAIL)
+        user.set_password(PASSWORD)
+        db.session.add(user)
+        db.session.commit()
+    client = app.test_client()
+    token = client.post(
+        "/auth/login", json={"email": EMAIL, "password": PASSWORD}
+    ).json["data"]["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    recipe = client.post(
+        "/api/recipes/",
+        json={
+            "title": "Benchmark soup",
+            "description": "Read while others log in",
+            "ingredients": [{"name": "Water", "quantity": "1 l"}],
+        },
+        headers=headers,
+    ).json["data"]
+    return f"/api/recipes/{recipe['id']}", headers
+
+
+def _run(app, url, headers, login_threads, duration):
+    """
+    Read the recipe for ``duration`` seconds while ``login_threads`` threads log in.
+
+    Returns:
+        tuple: The read latencies in seconds and the number of logins.
+    """
+    stop = threading.Event()
+    logins = []
+
+    def log_in():
+        client = app.test_client()
+        count = 0
+        while not stop.is_set():
+            response = client.post(
+                "/auth/login", json={"email": EMAIL, "password": PASSWORD}
+            )
+            assert response.status_code == 200, response.json
+            count += 1
+        logins.append(count)
+
+    threads = [threading.Thread(target=log_in) for _ in range(login_threads)]
+    for thread in threads:
+        thread.start()
+
+    client = app.test_client()
+    latencies = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        response = client.get(url, headers=headers)
+        latencies.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.json
+
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return latencies, sum(logins)
+
+
+def _report(label, latencies, logins, duration):
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(
+        f"{label:<24} logins/s {logins / duration:8.1f}   "
+        f"reads/s {len(latencies) / duration:8.1f}   "
+        f"read p50 {quantiles[49] * 1000:7.2f} ms   "
+        f"p95 {quantiles[94] * 1000:7.2f} ms   "
+        f"p99 {quantiles[98] * 1000:7.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "--pool-sizes",
+        default="0,2",
+        help="Comma-separated PASSWORD_HASH_POOL_SIZE values to compare",
+    )
+    parser.add_argument("--login-threads", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=5.0)
+    args = parser.parse_args()
+    pool_sizes = [int(size) for size in args.pool_sizes.split(",")]
+
+    for index, pool_size in enumerate(pool_sizes):
+        with tempfile.TemporaryDirectory() as directory:
+            app = _make_app(os.path.join(directory, "benchmark.db"), pool_size)
+            url, headers = _setup(app)
+            if index == 0:
+                latencies, logins = _run(app, url, headers, 0, args.duration)
+                _report("no logins", latencies, logins, args.duration)
+            latencies, logins = _run(
+                app, url, headers, args.login_threads, args.duration
+            )
+            _report(f"pool size {pool_size}", latencies, logins, args.duration)
+
+
+if __name__ == "__main__":
+    main()
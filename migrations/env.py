@@ -51,6 +51,14 @@ def get_metadata():
     return target_db.metadata
 
 
+def include_name(name, type_, parent_names):
+    """Skip tables created with raw DDL, such as the recipe search index
+    (and the shadow tables SQLite's FTS5 creates for it)."""
+    if type_ == "table":
+        return not (name == "recipe_search" or name.startswith("recipe_search_"))
+    return True
+
+
 def run_migrations_offline():
     """Run migrations in 'offline' mode.
 
@@ -64,7 +72,12 @@ def run_migrations_offline():
 
     """
     url = config.get_main_option("sqlalchemy.url")
-    context.configure(url=url, target_metadata=get_metadata(), literal_binds=True)
+    context.configure(
+        url=url,
+        target_metadata=get_metadata(),
+        literal_binds=True,
+        include_name=include_name,
+    )
 
     with context.begin_transaction():
         context.run_migrations()
@@ -91,10 +104,18 @@ def run_migrations_online():
     conf_args = current_app.extensions["migrate"].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    conf_args.setdefault("include_name", include_name)
 
     connectable = get_engine()
 
     with connectable.connect() as connection:
+        if connection.dialect.name == "sqlite":
+            # Batch operations recreate tables; keep SQLite from cascading the
+            # drop of the old copy to the rows referencing it.
+            connection.exec_driver_sql("PRAGMA foreign_keys=OFF")
+            # The PRAGMA autobegins a transaction; end it so the migrations
+            # run in, and commit, their own.
+            connection.commit()
         context.configure(
             connection=connection, target_metadata=get_metadata(), **conf_args
         )
@@ -0,0 +1,76 @@
+"""adding recipe search index
+
+Revision ID: 3f6b2c1d9e4a
+Revises: 8947c035b1c0
+Create Date: 2026-10-18 09:12:40.218374
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f6b2c1d9e4a'
+down_revision = '8947c035b1c0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The recipe_search table holds one full-text document per recipe, built
+    # from its title, description and ingredient names. The application keeps
+    # it up to date when recipes are written. The application's db.create_all()
+    # at startup may already have created the table, empty: create it only if
+    # missing and index the recipes it lacks.
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute(
+            "CREATE TABLE IF NOT EXISTS recipe_search "
+            "(recipe_id INTEGER PRIMARY KEY, document TSVECTOR NOT NULL)"
+        )
+        op.execute(
+            "CREATE INDEX IF NOT EXISTS ix_recipe_search_document "
+            "ON recipe_search USING GIN (document)"
+        )
+        op.execute(
+            "INSERT INTO recipe_search (recipe_id, document) "
+            "SELECT r.id, to_tsvector('simple', concat_ws(' ', r.title, r.description, "
+            "string_agg(i.name, ' '))) "
+            "FROM recipe r "
+            "LEFT JOIN recipe_ingredient ri ON ri.recipe_id = r.id "
+            "LEFT JOIN ingredient i ON i.id = ri.ingredient_id "
+            "WHERE NOT EXISTS (SELECT 1 FROM recipe_search s WHERE s.recipe_id = r.id) "
+            "GROUP BY r.id"
+        )
+    elif dialect == 'mysql':
+        op.execute(
+            "CREATE TABLE IF NOT EXISTS recipe_search "
+            "(recipe_id INTEGER PRIMARY KEY, document TEXT NOT NULL, "
+            "FULLTEXT KEY ix_recipe_search_document (document)) ENGINE=InnoDB"
+        )
+        op.execute(
+            "INSERT INTO recipe_search (recipe_id, document) "
+            "SELECT r.id, CONCAT_WS(' ', r.title, r.description, "
+            "GROUP_CONCAT(i.name SEPARATOR ' ')) "
+            "FROM recipe r "
+            "LEFT JOIN recipe_ingredient ri ON ri.recipe_id = r.id "
+            "LEFT JOIN ingredient i ON i.id = ri.ingredient_id "
+            "WHERE NOT EXISTS (SELECT 1 FROM recipe_search s WHERE s.recipe_id = r.id) "
+            "GROUP BY r.id"
+        )
+    elif dialect == 'sqlite':
+        op.execute("CREATE VIRTUAL TABLE IF NOT EXISTS recipe_search USING fts5(document)")
+        op.execute(
+            "INSERT INTO recipe_search (rowid, document) "
+            "SELECT r.id, coalesce(r.title, '') || ' ' || coalesce(r.description, '') "
+            "|| ' ' || coalesce(group_concat(i.name, ' '), '') "
+            "FROM recipe r "
+            "LEFT JOIN recipe_ingredient ri ON ri.recipe_id = r.id "
+            "LEFT JOIN ingredient i ON i.id = ri.ingredient_id "
+            "WHERE NOT EXISTS (SELECT 1 FROM recipe_search s WHERE s.rowid = r.id) "
+            "GROUP BY r.id"
+        )
+
+
+def downgrade():
+    op.execute("DROP TABLE IF EXISTS recipe_search")
@@ -0,0 +1,125 @@
+"""adding ingredient normalized_name
+
+Revision ID: 9d3c5f7a1b28
+Revises: 5b91e0d4a7c2
+Create Date: 2026-10-18 12:41:09.385117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d3c5f7a1b28'
+down_revision = '5b91e0d4a7c2'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 500
+
+ingredient = sa.table(
+    'ingredient',
+    sa.column('id', sa.Integer),
+    sa.column('name', sa.String),
+    sa.column('normalized_name', sa.String),
+)
+recipe_ingredient = sa.table(
+    'recipe_ingredient',
+    sa.column('recipe_id', sa.Integer),
+    sa.column('ingredient_id', sa.Integer),
+)
+
+
+def normalize(name):
+    return " ".join(name.lower().split())
+
+
+def upgrade():
+    with op.batch_alter_table('ingredient', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('normalized_name', sa.String(length=128), nullable=True))
+
+    # Merge ingredients whose names only differ by case or whitespace into
+    # the one with the lowest id, repointing the recipes that use them.
+    bind = op.get_bind()
+    canonical = {}
+    duplicates = {}
+    for ingredient_id, name in bind.execute(
+        sa.select(ingredient.c.id, ingredient.c.name).order_by(ingredient.c.id)
+    ):
+        key = normalize(name)
+        if key in canonical:
+            duplicates[ingredient_id] = canonical[key]
+        else:
+            canonical[key] = ingredient_id
+
+    if canonical:
+        bind.execute(
+            ingredient.update()
+            .where(ingredient.c.id == sa.bindparam('ingredient_id'))
+            .values(normalized_name=sa.bindparam('key')),
+            [{'ingredient_id': i, 'key': key} for key, i in canonical.items()],
+        )
+
+    if duplicates:
+        merged = list(set(duplicates) | set(duplicates.values()))
+        links = set()
+        for start in range(0, len(merged), BATCH_SIZE):
+            links.update(
+                bind.execute(
+                    sa.select(recipe_ingredient.c.recipe_id, recipe_ingredient.c.ingredient_id)
+                    .where(recipe_ingredient.c.ingredient_id.in_(merged[start:start + BATCH_SIZE]))
+                ).all()
+            )
+
+        kept = {link for link in links if link[1] not in duplicates}
+        repoint, drop = [], []
+        for recipe_id, ingredient_id in sorted(links):
+            if ingredient_id not in duplicates:
+                continue
+            target = (recipe_id, duplicates[ingredient_id])
+            row = {'r': recipe_id, 'old': ingredient_id, 'new': target[1]}
+            if target in kept:
+                drop.append(row)
+            else:
+                kept.add(target)
+                repoint.append(row)
+
+        link_filter = sa.and_(
+            recipe_ingredient.c.recipe_id == sa.bindparam('r'),
+            recipe_ingredient.c.ingredient_id == sa.bindparam('old'),
+        )
+        if drop:
+            bind.execute(recipe_ingredient.delete().where(link_filter), drop)
+        if repoint:
+            bind.execute(
+                recipe_ingredient.update()
+                .where(link_filter)
+                .values(ingredient_id=sa.bindparam('new')),
+                repoint,
+            )
+        duplicate_ids = list(duplicates)
+        for start in range(0, len(duplicate_ids), BATCH_SIZE):
+            bind.execute(
+                ingredient.delete().where(
+                    ingredient.c.id.in_(duplicate_ids[start:start + BATCH_SIZE])
+                )
+            )
+
+    # ### commands auto generated by Alembic - please adjust! ###
+    with op.batch_alter_table('ingredient', schema=None) as batch_op:
+        batch_op.alter_column('normalized_name',
+               existing_type=sa.String(length=128),
+               nullable=False)
+        batch_op.create_index(batch_op.f('ix_ingredient_normalized_name'), ['normalized_name'], unique=True)
+
+    # ### end Alembic commands ###
+
+
+def downgrade():
+    # Merged duplicates are not restored.
+    # ### commands auto generated by Alembic - please adjust! ###
+    with op.batch_alter_table('ingredient', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_ingredient_normalized_name'))
+        batch_op.drop_column('normalized_name')
+
+    # ### end Alembic commands ###
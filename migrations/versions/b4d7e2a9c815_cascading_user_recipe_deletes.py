@@ -0,0 +1,53 @@
+"""cascading user recipe deletes
+
+Revision ID: b4d7e2a9c815
+Revises: f3b8c1d27e94
+Create Date: 2026-10-18 16:02:44.915370
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4d7e2a9c815'
+down_revision = 'f3b8c1d27e94'
+branch_labels = None
+depends_on = None
+
+# Names the databases gave the foreign key of recipe.user_id.
+FOREIGN_KEYS = {
+    'mysql': 'recipe_ibfk_1',
+    'postgresql': 'recipe_user_id_fkey',
+}
+
+
+def replace_foreign_key(ondelete):
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        # SQLite cannot alter constraints; recreate the table instead.
+        recipe = sa.Table('recipe', sa.MetaData(), autoload_with=op.get_bind())
+        for constraint in recipe.foreign_key_constraints:
+            constraint.ondelete = ondelete
+        with op.batch_alter_table('recipe', copy_from=recipe, recreate='always'):
+            pass
+        return
+
+    name = FOREIGN_KEYS[dialect]
+    with op.batch_alter_table('recipe', schema=None) as batch_op:
+        batch_op.drop_constraint(name, type_='foreignkey')
+        batch_op.create_foreign_key(name, 'user', ['user_id'], ['id'], ondelete=ondelete)
+
+
+def upgrade():
+    # Deleting a user removes their recipes, and through them the recipes'
+    # ingredient links, in the database without loading them.
+    replace_foreign_key('CASCADE')
+    with op.batch_alter_table('recipe', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_recipe_user_id'), ['user_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('recipe', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_recipe_user_id'))
+    replace_foreign_key(None)
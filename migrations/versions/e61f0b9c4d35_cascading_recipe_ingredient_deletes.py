@@ -0,0 +1,72 @@
+"""cascading recipe ingredient deletes
+
+Revision ID: e61f0b9c4d35
+Revises: 9d3c5f7a1b28
+Create Date: 2026-10-18 13:52:31.904466
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e61f0b9c4d35'
+down_revision = '9d3c5f7a1b28'
+branch_labels = None
+depends_on = None
+
+# Names the databases gave the foreign keys of recipe_ingredient.
+FOREIGN_KEYS = {
+    'mysql': {
+        'recipe': 'recipe_ingredient_ibfk_2',
+        'ingredient': 'recipe_ingredient_ibfk_1',
+    },
+    'postgresql': {
+        'recipe': 'recipe_ingredient_recipe_id_fkey',
+        'ingredient': 'recipe_ingredient_ingredient_id_fkey',
+    },
+}
+
+
+def recipe_ingredient_table(ondelete):
+    return sa.Table(
+        'recipe_ingredient',
+        sa.MetaData(),
+        sa.Column('recipe_id', sa.Integer(), nullable=False),
+        sa.Column('ingredient_id', sa.Integer(), nullable=False),
+        sa.Column('quantity', sa.String(length=64), nullable=True),
+        sa.ForeignKeyConstraint(['ingredient_id'], ['ingredient.id'], ondelete=ondelete),
+        sa.ForeignKeyConstraint(['recipe_id'], ['recipe.id'], ondelete=ondelete),
+        sa.PrimaryKeyConstraint('recipe_id', 'ingredient_id'),
+    )
+
+
+def replace_foreign_keys(ondelete):
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        # SQLite cannot alter constraints; recreate the table instead.
+        with op.batch_alter_table(
+            'recipe_ingredient',
+            copy_from=recipe_ingredient_table(ondelete),
+            recreate='always',
+        ):
+            pass
+        return
+
+    names = FOREIGN_KEYS[dialect]
+    with op.batch_alter_table('recipe_ingredient', schema=None) as batch_op:
+        for referent in ('recipe', 'ingredient'):
+            batch_op.drop_constraint(names[referent], type_='foreignkey')
+            batch_op.create_foreign_key(
+                names[referent], referent, [f'{referent}_id'], ['id'], ondelete=ondelete
+            )
+
+
+def upgrade():
+    # Deleting a recipe or an ingredient removes its links in the database,
+    # so writes no longer need to disable foreign key checks.
+    replace_foreign_keys('CASCADE')
+
+
+def downgrade():
+    replace_foreign_keys(None)
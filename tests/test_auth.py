@@ -1,12 +1,18 @@
 # tests/test_auth.py
 import os
 import unittest
+from datetime import datetime, timedelta
 
 from flask import json
+from flask_jwt_extended import decode_token
+from sqlalchemy import event
 
 from app import create_app
+from app.blueprints.auth.revocation import get_revocation_list
+from app.blueprints.auth.utils import get_user_by_id
 from app.extensions import db
-from app.models import User
+from app.models import RevokedToken, User
+from app.passwords import _get_pool
 
 
 class AuthTestCase(unittest.TestCase):
@@ -151,7 +157,7 @@ class AuthTestCase(unittest.TestCase):
                 {
                     "username": "existinguser",
                     "email": "existinguser2@example.com",
-                    "password": "password123",
+                    "password": "NewPassword@12345",
                 }
             ),
             content_type="application/json",
@@ -159,6 +165,48 @@ class AuthTestCase(unittest.TestCase):
         self.assertEqual(response.status_code, 400)
         self.assertEqual(response.json["message"], "Username already exists")
 
+    def test_register_user_case_insensitive_duplicates(self):
+        """
+        Test that registration is one statement and ignores case for uniqueness.
+        """
+        payload = {
+            "username": "CaseUser",
+            "email": "CaseUser@example.com",
+            "password": "NewPassword@12345",
+        }
+        with self.app.app_context():
+            statements = []
+            listener = lambda *args: statements.append(args[2])  # noqa: E731
+            event.listen(db.engine, "before_cursor_execute", listener)
+            try:
+                response = self.client.post("/auth/register", json=payload)
+            finally:
+                event.remove(db.engine, "before_cursor_execute", listener)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(statements), 1)
+        self.assertTrue(statements[0].startswith("INSERT INTO user"))
+
+        response = self.client.post(
+            "/auth/register",
+            json={**payload, "username": "caseuser", "email": "other@example.com"},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json["message"], "Username already exists")
+
+        response = self.client.post(
+            "/auth/register",
+            json={**payload, "username": "other", "email": "CASEUSER@example.com"},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json["message"], "Email already exists")
+
+        # Login matches the email regardless of case
+        response = self.client.post(
+            "/auth/login",
+            json={"email": "caseuser@example.com", "password": "NewPassword@12345"},
+        )
+        self.assertEqual(response.status_code, 200)
+
     def test_login_user_missing_credentials(self):
         """
         Test user login with missing credentials.
@@ -211,6 +259,146 @@ class AuthTestCase(unittest.TestCase):
         )
         self.assertEqual(response.json["message"], "Invalid email or password")
 
+    def test_identity_cache(self):
+        """
+        Test that authenticated requests reuse cached user snapshots.
+        """
+        response = self._extracted_from_test_login_user_wrong_username_5(
+            "test@example.com", "testpassword", 200
+        )
+        headers = {"Authorization": f"Bearer {response.json['data']['access_token']}"}
+
+        for _ in range(4):
+            response = self.client.get("/auth/cache/stats", headers=headers)
+            self.assertEqual(response.status_code, 200)
+        stats = response.json["data"]
+        self.assertEqual((stats["hits"], stats["misses"]), (3, 1))
+        self.assertEqual(stats["hit_ratio"], 0.75)
+
+        # Updating the user drops its snapshot
+        with self.app.app_context():
+            user = User.query.filter_by(email="test@example.com").first()
+            self.assertEqual(get_user_by_id(user.id).username, "testuser")
+            user.username = "renamed"
+            db.session.commit()
+            self.assertEqual(get_user_by_id(user.id).username, "renamed")
+
+    def test_stateless_mode(self):
+        """
+        Test that stateless mode issues no session and loads no user.
+        """
+        self.app.config["AUTH_STATELESS"] = True
+        response = self._extracted_from_test_login_user_wrong_username_5(
+            "test@example.com", "testpassword", 200
+        )
+        self.assertNotIn("Set-Cookie", response.headers)
+        headers = {"Authorization": f"Bearer {response.json['data']['access_token']}"}
+
+        response = self.client.get("/auth/cache/stats", headers=headers)
+        self.assertEqual(response.status_code, 200)
+        stats = response.json["data"]
+        self.assertEqual((stats["hits"], stats["misses"]), (0, 0))
+
+        response = self.client.post("/auth/logout")
+        self.assertEqual(response.status_code, 401)
+        response = self.client.post("/auth/logout", headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("Set-Cookie", response.headers)
+
+    def test_token_revocation(self):
+        """
+        Test that logout revokes the token and unrevoked ones skip the store.
+        """
+        response = self._extracted_from_test_login_user_wrong_username_5(
+            "test@example.com", "testpassword", 200
+        )
+        headers = {"Authorization": f"Bearer {response.json['data']['access_token']}"}
+        response = self.client.post(
+            "/auth/login",
+            json={"email": "test@example.com", "password": "testpassword"},
+        )
+        other_token = response.json["data"]["access_token"]
+        other_headers = {"Authorization": f"Bearer {other_token}"}
+
+        for _ in range(3):
+            response = self.client.get("/auth/cache/stats", headers=headers)
+            self.assertEqual(response.status_code, 200)
+        with self.app.app_context():
+            revocations = get_revocation_list()
+        self.assertEqual((revocations.checks, revocations.lookups), (3, 0))
+
+        response = self.client.post("/auth/logout", headers=headers)
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get("/auth/cache/stats", headers=headers)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual((revocations.lookups, revocations.revoked), (1, 1))
+
+        # A revocation made by another worker is seen after a refresh
+        with self.app.app_context():
+            jti = decode_token(other_token)["jti"]
+            db.session.add(
+                RevokedToken(jti=jti, expires_at=datetime.utcnow() + timedelta(1))
+            )
+            db.session.commit()
+            revocations.refresh(db.session, force=True)
+        response = self.client.get("/auth/cache/stats", headers=other_headers)
+        self.assertEqual(response.status_code, 401)
+
+    def test_login_rehashes_outdated_password(self):
+        """
+        Test that logging in upgrades a hash made with an outdated method.
+        """
+        self.app.config["PASSWORD_HASH_POOL_SIZE"] = 0
+        self.app.config["PASSWORD_HASH_METHOD"] = "pbkdf2"
+        with self.app.app_context():
+            self._extracted_from_test_login_user_wrong_username_6()
+            user = User.query.filter_by(email="test@example.com").first()
+            old_hash = user.password_hash
+        self.assertTrue(old_hash.startswith("pbkdf2:sha256:600000$"))
+
+        self.app.config["PASSWORD_HASH_METHOD"] = "scrypt"
+        response = self.client.post(
+            "/auth/login",
+            json={"email": "test@example.com", "password": "testpassword"},
+        )
+        self.assertEqual(response.status_code, 200)
+        with self.app.app_context():
+            user = User.query.filter_by(email="test@example.com").first()
+            self.assertTrue(user.password_hash.startswith("scrypt:32768:8:1$"))
+            self.assertTrue(user.check_password("testpassword"))
+
+    def test_login_hashing_pool_full(self):
+        """
+        Test that logins are refused with a 503 while the hashing pool is full.
+        """
+        with self.app.app_context():
+            self._extracted_from_test_login_user_wrong_username_6()
+            _, slots = _get_pool(
+                self.app.config["PASSWORD_HASH_POOL_SIZE"],
+                self.app.config["PASSWORD_HASH_BACKLOG"],
+            )
+
+        # Take every slot, as hashes still running would
+        taken = 0
+        while slots.acquire(blocking=False):
+            taken += 1
+        try:
+            response = self.client.post(
+                "/auth/login",
+                json={"email": "test@example.com", "password": "testpassword"},
+            )
+        finally:
+            for _ in range(taken):
+                slots.release()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers["Retry-After"], "1")
+
+        response = self.client.post(
+            "/auth/login",
+            json={"email": "test@example.com", "password": "testpassword"},
+        )
+        self.assertEqual(response.status_code, 200)
+
     # TODO Rename this here and in `test_login_user`, `test_login_user_invalid`, `test_logout_user` and `test_login_user_wrong_username`
     def _extracted_from_test_login_user_wrong_username_5(self, arg0, arg1, arg2):
         with self.app.app_context():
@@ -223,6 +411,38 @@ class AuthTestCase(unittest.TestCase):
         self.assertEqual(result.status_code, arg2)
         return result
 
+    def test_login_hashing_pool_full(self):
+        """
+        Test that logins are refused with a 503 while the hashing pool is full.
+        """
+        with self.app.app_context():
+            self._extracted_from_test_login_user_wrong_username_6()
+            _, slots = _get_pool(
+                self.app.config["PASSWORD_HASH_POOL_SIZE"],
+                self.app.config["PASSWORD_HASH_BACKLOG"],
+            )
+
+        # Take every slot, as hashes still running would
+        taken = 0
+        while slots.acquire(blocking=False):
+            taken += 1
+        try:
+            response = self.client.post(
+                "/auth/login",
+                json={"email": "test@example.com", "password": "testpassword"},
+            )
+        finally:
+            for _ in range(taken):
+                slots.release()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers["Retry-After"], "1")
+
+        response = self.client.post(
+            "/auth/login",
+            json={"email": "test@example.com", "password": "testpassword"},
+        )
+        self.assertEqual(response.status_code, 200)
+
     # TODO Rename this here and in `test_login_user`, `test_login_user_invalid`, `test_logout_user` and `test_login_user_wrong_username`
     def _extracted_from_test_login_user_wrong_username_6(self):
         user = User(username="testuser", email="test@example.com")
@@ -0,0 +1,110 @@
+# tests/test_migrations.py
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from flask_migrate import stamp, upgrade
+
+from app import create_app
+from app.config import Config
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(__file__)), "migrations")
+
+# Revision of the schema below, the last one before recipe search.
+BASE_REVISION = "8947c035b1c0"
+
+# The tables as they stood at BASE_REVISION. The earlier migrations were
+# generated against MySQL and cannot build them on SQLite.
+BASE_SCHEMA = """
+CREATE TABLE user (
+    id INTEGER PRIMARY KEY, username VARCHAR(64), email VARCHAR(120),
+    password_hash VARCHAR(256) NOT NULL
+);
+CREATE UNIQUE INDEX ix_user_username ON user (username);
+CREATE UNIQUE INDEX ix_user_email ON user (email);
+CREATE TABLE recipe (
+    id INTEGER PRIMARY KEY, title VARCHAR(128), description TEXT,
+    instructions TEXT, user_id INTEGER REFERENCES user (id)
+);
+CREATE TABLE ingredient (id INTEGER PRIMARY KEY, name VARCHAR(128) NOT NULL);
+CREATE TABLE recipe_ingredient (
+    recipe_id INTEGER NOT NULL REFERENCES recipe (id),
+    ingredient_id INTEGER NOT NULL REFERENCES ingredient (id),
+    quantity VARCHAR(64),
+    PRIMARY KEY (recipe_id, ingredient_id)
+);
+INSERT INTO user VALUES (1, 'Bob', 'Bob@example.com', 'hash');
+INSERT INTO user VALUES (2, 'ÉLODIE', 'Élodie@Example.com', 'hash');
+INSERT INTO recipe VALUES (1, 'Tomato soup', 'Hot', 'Stir', 1);
+INSERT INTO ingredient VALUES (1, 'Tomato'), (2, ' tomato ');
+INSERT INTO recipe_ingredient VALUES (1, 1, '2'), (1, 2, '3');
+"""
+
+
+class MigrationTestCase(unittest.TestCase):
+    """
+    Test cases for the migration chain.
+    """
+
+    def setUp(self):
+        """
+        Create a SQLite database at the base revision.
+        """
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "migrations.db")
+        with sqlite3.connect(self.path) as connection:
+            connection.executescript(BASE_SCHEMA)
+        connection.close()
+
+        class MigrationConfig(Config):
+            SQLALCHEMY_DATABASE_URI = f"sqlite:///{self.path}"
+
+        # Starting the application creates the tables missing from the
+        # database, as it does on a deployment before `flask db upgrade`.
+        self.app = create_app(MigrationConfig)
+        with self.app.app_context():
+            stamp(directory=MIGRATIONS, revision=BASE_REVISION)
+
+    def tearDown(self):
+        """
+        Delete the database.
+        """
+        self.directory.cleanup()
+
+    def query(self, sql):
+        with sqlite3.connect(self.path) as connection:
+            rows = connection.execute(sql).fetchall()
+        connection.close()
+        return rows
+
+    def test_upgrade_to_head(self):
+        """
+        Test that upgrading to the head revision applies and commits every migration.
+        """
+        with self.app.app_context():
+            upgrade(directory=MIGRATIONS)
+
+        self.assertEqual(
+            self.query("SELECT version_num FROM alembic_version"), [("e8a2c4f61b37",)]
+        )
+        self.assertEqual(
+            self.query(
+                "SELECT normalized_username, normalized_email FROM user ORDER BY id"
+            ),
+            [("bob", "bob@example.com"), ("élodie", "élodie@example.com")],
+        )
+        self.assertEqual(
+            self.query("SELECT normalized_name FROM ingredient"), [("tomato",)]
+        )
+        self.assertEqual(self.query("SELECT version FROM recipe WHERE id = 1"), [(1,)])
+        self.assertEqual(
+            self.query(
+                "SELECT rowid FROM recipe_search WHERE recipe_search MATCH 'soup'"
+            ),
+            [(1,)],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
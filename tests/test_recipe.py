@@ -1,11 +1,33 @@
 import os
 import unittest
+from datetime import datetime, timedelta
 
 from flask import json
+from sqlalchemy import event
+from sqlalchemy.orm.exc import StaleDataError
 
 from app import create_app
+from app.blueprints.auth.revocation import get_revocation_list
+from app.blueprints.recipe.cache import LocalSharedCache, RecipeCache
+from app.blueprints.recipe.changes import claim_recipe
+from app.blueprints.recipe.idempotency import (
+    get_idempotency_cache,
+    request_fingerprint,
+)
+from app.blueprints.recipe.ingredients import (
+    get_ingredient_id_cache,
+    get_or_create_ingredients,
+)
+from app.blueprints.recipe.outbox import get_outbox_dispatcher
 from app.extensions import db
-from app.models import Ingredient, Recipe, RecipeIngredient, User
+from app.models import (
+    IdempotencyKey,
+    Ingredient,
+    Recipe,
+    RecipeEvent,
+    RecipeIngredient,
+    User,
+)
 
 
 class RecipeAPITestCase(unittest.TestCase):
@@ -21,6 +43,9 @@ class RecipeAPITestCase(unittest.TestCase):
         self.client = self.app.test_client()
 
         with self.app.app_context():
+            # Keep the token revocation filter's periodic refresh out of the
+            # statements counted by the tests
+            get_revocation_list().refresh_interval = 3600
             self._extracted_from_setUp_13()
 
     def _extracted_from_setUp_13(self):
@@ -105,6 +130,7 @@ class RecipeAPITestCase(unittest.TestCase):
             json={
                 "title": "Test Recipe",
                 "description": "Test Description",
+                "instructions": "Mix",
                 "ingredients": [
                     {"name": "Ingredient 1", "quantity": "1 cup"},
                     {"name": "Ingredient 2", "quantity": "2 tbsp"},
@@ -112,6 +138,8 @@ class RecipeAPITestCase(unittest.TestCase):
             },
         )
         recipe_id = json.loads(create_response.data)["data"]["id"]
+        with self.app.app_context():
+            self.assertEqual(db.session.get(Recipe, recipe_id).instructions, "Mix")
 
         # Then, get the recipe by ID
         response = self.client.get(f"/api/recipes/{recipe_id}", headers=self.headers)
@@ -146,6 +174,7 @@ class RecipeAPITestCase(unittest.TestCase):
             json={
                 "title": "Updated Recipe",
                 "description": "Updated Description",
+                "instructions": "Stir",
                 "ingredients": [{"name": "Updated Ingredient", "quantity": "3 cups"}],
             },
         )
@@ -154,6 +183,8 @@ class RecipeAPITestCase(unittest.TestCase):
         self.assertEqual(json_data["message"], "Recipe updated successfully")
         self.assertEqual(json_data["data"]["title"], "Updated Recipe")
         self.assertEqual(json_data["data"]["description"], "Updated Description")
+        with self.app.app_context():
+            self.assertEqual(db.session.get(Recipe, recipe_id).instructions, "Stir")
 
     def test_delete_recipe(self):
         """
@@ -180,6 +211,1008 @@ class RecipeAPITestCase(unittest.TestCase):
         data = json.loads(response.data)
         self.assertEqual(data["message"], "Recipe deleted successfully")
 
+        # The ingredient links were removed by the database, the catalog kept
+        with self.app.app_context():
+            self.assertEqual(
+                RecipeIngredient.query.filter_by(recipe_id=recipe_id).count(), 0
+            )
+            self.assertEqual(Ingredient.query.count(), 2)
+
+    def test_list_recipes_query_count(self):
+        """
+        Test that listing recipes does not issue one query per recipe.
+        """
+        with self.app.app_context():
+            for i in range(5):
+                recipe = Recipe(title=f"Recipe {i}", description="Test Description")
+                recipe.ingredients = [Ingredient(name=f"Ingredient {i}")]
+                db.session.add(recipe)
+            db.session.commit()
+
+            statements = []
+
+            def count_statement(*args):
+                statements.append(args[2])
+
+            event.listen(db.engine, "before_cursor_execute", count_statement)
+            try:
+                response = self.client.get("/api/recipes/", headers=self.headers)
+            finally:
+                event.remove(db.engine, "before_cursor_execute", count_statement)
+
+        self.assertEqual(response.status_code, 200)
+        json_data = json.loads(response.data)
+        self.assertEqual(len(json_data["data"]["recipes"]), 5)
+        self.assertEqual(
+            json_data["data"]["recipes"][0]["ingredients"][0]["name"], "Ingredient 0"
+        )
+        # Count, page and one batched ingredient query, plus the JWT user lookup.
+        self.assertLessEqual(len(statements), 4)
+
+    def test_list_recipes_with_cursor(self):
+        """
+        Test paging through all recipes with keyset cursors.
+        """
+        with self.app.app_context():
+            for i in range(25):
+                db.session.add(Recipe(title=f"Recipe {i}", description="Test"))
+            db.session.commit()
+
+        seen = []
+        cursor = ""
+        while cursor is not None:
+            response = self.client.get(
+                "/api/recipes/", query_string={"cursor": cursor}, headers=self.headers
+            )
+            self.assertEqual(response.status_code, 200)
+            data = json.loads(response.data)["data"]
+            self.assertNotIn("total", data)
+            seen.extend(recipe["id"] for recipe in data["recipes"])
+            cursor = data["next_cursor"]
+
+        self.assertEqual(len(seen), 25)
+        self.assertEqual(seen, sorted(set(seen)))
+
+        response = self.client.get(
+            "/api/recipes/",
+            query_string={"cursor": "not-a-cursor"},
+            headers=self.headers,
+        )
+        self._check_invalid_field_response(response, "Invalid cursor")
+
+    def test_list_recipes_total_is_cached(self):
+        """
+        Test that listing totals are cached and refreshed by writes.
+        """
+        with self.app.app_context():
+            db.session.add(Recipe(title="Cached Recipe", description="Test"))
+            db.session.commit()
+
+        response = self.client.get("/api/recipes/", headers=self.headers)
+        data = json.loads(response.data)["data"]
+        self.assertEqual((data["total"], data["total_type"]), (1, "exact"))
+
+        # Rows written behind the change tracker's back are not seen until a
+        # fresh count.
+        with self.app.app_context():
+            db.session.execute(
+                Recipe.__table__.insert().values(
+                    title="Unseen Recipe", description="Test"
+                )
+            )
+            db.session.commit()
+
+        response = self.client.get("/api/recipes/", headers=self.headers)
+        data = json.loads(response.data)["data"]
+        self.assertEqual((data["total"], data["total_type"]), (1, "cached"))
+
+        response = self.client.get(
+            "/api/recipes/", query_string={"count": "exact"}, headers=self.headers
+        )
+        data = json.loads(response.data)["data"]
+        self.assertEqual((data["total"], data["total_type"]), (2, "exact"))
+
+        # Creating through the API adjusts the cached total.
+        self.client.post(
+            "/api/recipes/",
+            headers=self.headers,
+            json={
+                "title": "Test Recipe",
+                "description": "Test Description",
+                "ingredients": [{"name": "Ingredient 1", "quantity": "1 cup"}],
+            },
+        )
+        response = self.client.get("/api/recipes/", headers=self.headers)
+        data = json.loads(response.data)["data"]
+        self.assertEqual((data["total"], data["total_type"]), (3, "cached"))
+
+        response = self.client.get(
+            "/api/recipes/", query_string={"count": "bogus"}, headers=self.headers
+        )
+        self._check_invalid_field_response(response, "Invalid count mode")
+
+    def test_get_recipe_conditional(self):
+        """
+        Test that recipe reads honour If-None-Match and change after writes.
+        """
+        with self.app.app_context():
+            recipe = Recipe(title="Conditional Recipe", description="Test")
+            db.session.add(recipe)
+            db.session.commit()
+            recipe_id = recipe.id
+
+        response = self.client.get(f"/api/recipes/{recipe_id}", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers["ETag"]
+        list_response = self.client.get("/api/recipes/", headers=self.headers)
+        list_etag = list_response.headers["ETag"]
+
+        response = self.client.get(
+            f"/api/recipes/{recipe_id}",
+            headers={**self.headers, "If-None-Match": etag},
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b"")
+        response = self.client.get(
+            "/api/recipes/", headers={**self.headers, "If-None-Match": list_etag}
+        )
+        self.assertEqual(response.status_code, 304)
+
+        # Changing the recipe's ingredients gives it a new version.
+        with self.app.app_context():
+            db.session.add(
+                RecipeIngredient(
+                    recipe_id=recipe_id,
+                    ingredient_id=self._add_ingredient("Salt"),
+                    quantity="1 tsp",
+                )
+            )
+            db.session.commit()
+
+        response = self.client.get(
+            f"/api/recipes/{recipe_id}",
+            headers={**self.headers, "If-None-Match": etag},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+        response = self.client.get(
+            "/api/recipes/", headers={**self.headers, "If-None-Match": list_etag}
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def _add_ingredient(self, name):
+        ingredient = Ingredient(name=name)
+        db.session.add(ingredient)
+        db.session.flush()
+        return ingredient.id
+
+    def test_write_recipe_if_match(self):
+        """
+        Test that writes with a stale If-Match header are refused with a 412.
+        """
+        response = self.client.post(
+            "/api/recipes/",
+            headers=self.headers,
+            json={
+                "title": "Test Recipe",
+                "description": "Test Description",
+                "ingredients": [{"name": "Ingredient 1", "quantity": "1 cup"}],
+            },
+        )
+        recipe_id = json.loads(response.data)["data"]["id"]
+        etag = response.headers["ETag"]
+        self.assertEqual(etag, f'"{recipe_id}-1"')
+
+        update = {"ingredients": [{"name": "Ingredient 1", "quantity": "2 cups"}]}
+        for stale in (f'"{recipe_id}-0"', f'W/"{recipe_id}-1"', '"other"'):
+            headers = {**self.headers, "If-Match": stale}
+            for method in (self.client.put, self.client.patch):
+                response = method(
+                    f"/api/recipes/{recipe_id}", headers=headers, json=update
+                )
+                self.assertEqual(response.status_code, 412)
+            response = self.client.patch(
+                f"/api/recipes/{recipe_id}", headers=headers, json={"title": "New"}
+            )
+            self.assertEqual(response.status_code, 412)
+            response = self.client.delete(f"/api/recipes/{recipe_id}", headers=headers)
+            self.assertEqual(response.status_code, 412)
+
+        # Ingredient-only and mixed updates each bump the version once
+        response = self.client.put(
+            f"/api/recipes/{recipe_id}",
+            headers={**self.headers, "If-Match": etag},
+            json=update,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["ETag"], f'"{recipe_id}-2"')
+        response = self.client.put(
+            f"/api/recipes/{recipe_id}",
+            headers={**self.headers, "If-Match": f'"{recipe_id}-2-abc", "x"'},
+            json=dict(update, title="Renamed"),
+        )
+        self.assertEqual(response.headers["ETag"], f'"{recipe_id}-3"')
+        response = self.client.patch(
+            f"/api/recipes/{recipe_id}",
+            headers={**self.headers, "If-Match": "*"},
+            json={"title": "Patched"},
+        )
+        self.assertEqual(response.headers["ETag"], f'"{recipe_id}-4"')
+
+        # A recipe changed after it was loaded is not overwritten
+        with self.app.app_context():
+            recipe = db.session.get(Recipe, recipe_id)
+            with db.engine.begin() as connection:
+                connection.execute(
+                    Recipe.__table__.update()
+                    .where(Recipe.id == recipe_id)
+                    .values(version=Recipe.version + 1)
+                )
+            recipe.title = "Lost update"
+            with self.assertRaises(StaleDataError):
+                claim_recipe(recipe)
+            db.session.rollback()
+
+        response = self.client.delete(
+            f"/api/recipes/{recipe_id}",
+            headers={**self.headers, "If-Match": f'"{recipe_id}-5"'},
+        )
+        self.assertEqual(response.status_code, 200)
+        response = self.client.delete(
+            f"/api/recipes/{recipe_id}",
+            headers={**self.headers, "If-Match": f'"{recipe_id}-5"'},
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_get_recipe_uses_cache(self):
+        """
+        Test that recipe documents are cached and invalidated by writes.
+        """
+        with self.app.app_context():
+            recipe = Recipe(title="Cached Recipe", description="Test")
+            db.session.add(recipe)
+            db.session.commit()
+            recipe_id = recipe.id
+
+        self.client.get(f"/api/recipes/{recipe_id}", headers=self.headers)
+        response = self.client.get(f"/api/recipes/{recipe_id}", headers=self.headers)
+        self.assertEqual(json.loads(response.data)["data"]["title"], "Cached Recipe")
+
+        with self.app.app_context():
+            db.session.get(Recipe, recipe_id).title = "Renamed Recipe"
+            db.session.commit()
+
+        response = self.client.get(f"/api/recipes/{recipe_id}", headers=self.headers)
+        self.assertEqual(json.loads(response.data)["data"]["title"], "Renamed Recipe")
+
+        response = self.client.get("/api/recipes/cache/stats", headers=self.headers)
+        stats = json.loads(response.data)["data"]
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 2))
+
+        # A reader that loaded the old version refills the cache after the
+        # write's invalidation; its entry is not served.
+        self.app.extensions["recipe_cache"].set_many(
+            {recipe_id: {"version": 1, "data": {"title": "Cached Recipe"}}}
+        )
+        response = self.client.get(f"/api/recipes/{recipe_id}", headers=self.headers)
+        self.assertEqual(json.loads(response.data)["data"]["title"], "Renamed Recipe")
+
+    def test_list_recipes_with_fields(self):
+        """
+        Test that a fields projection skips unrequested columns and ingredients.
+        """
+        with self.app.app_context():
+            for i in range(3):
+                recipe = Recipe(
+                    title=f"Recipe {i}",
+                    description="Test Description",
+                    instructions="Long instructions",
+                )
+                recipe.ingredients = [Ingredient(name=f"Ingredient {i}")]
+                db.session.add(recipe)
+            db.session.commit()
+
+            statements = []
+
+            def record_statement(*args):
+                statements.append(args[2])
+
+            event.listen(db.engine, "before_cursor_execute", record_statement)
+            try:
+                response = self.client.get(
+                    "/api/recipes/?fields=title", headers=self.headers
+                )
+            finally:
+                event.remove(db.engine, "before_cursor_execute", record_statement)
+
+        self.assertEqual(response.status_code, 200)
+        recipes = json.loads(response.data)["data"]["recipes"]
+        self.assertEqual(recipes[0], {"id": 1, "title": "Recipe 0"})
+        self.assertFalse(any("recipe_ingredient" in sql for sql in statements))
+        self.assertFalse(
+            any("instructions" in sql and "recipe" in sql for sql in statements)
+        )
+
+        response = self.client.get(
+            "/api/recipes/?fields=instructions,ingredients.name", headers=self.headers
+        )
+        recipes = json.loads(response.data)["data"]["recipes"]
+        self.assertEqual(
+            recipes[0],
+            {
+                "id": 1,
+                "instructions": "Long instructions",
+                "ingredients": [{"name": "Ingredient 0"}],
+            },
+        )
+
+        response = self.client.get("/api/recipes/?fields=author", headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.data)["message"], "Invalid field: author")
+
+    def test_get_recipe_with_fields(self):
+        """
+        Test that a fields projection of a cached recipe gets its own ETag.
+        """
+        with self.app.app_context():
+            recipe = Recipe(title="Projected Recipe", description="Test")
+            recipe.ingredients = [Ingredient(name="Salt")]
+            db.session.add(recipe)
+            db.session.commit()
+            recipe_id = recipe.id
+
+        url = f"/api/recipes/{recipe_id}"
+        full = self.client.get(url, headers=self.headers)
+        for _ in range(2):
+            response = self.client.get(
+                f"{url}?fields=ingredients.quantity", headers=self.headers
+            )
+            self.assertEqual(
+                json.loads(response.data)["data"],
+                {"id": recipe_id, "ingredients": [{"quantity": None}]},
+            )
+            self.assertNotEqual(response.headers["ETag"], full.headers["ETag"])
+
+    def test_export_recipes(self):
+        """
+        Test that the export streams every matching recipe as NDJSON.
+        """
+        self.app.config["EXPORT_BATCH_SIZE"] = 2
+        with self.app.app_context():
+            user_id = User.query.filter_by(username="testuser1").one().id
+            for i in range(5):
+                recipe = Recipe(title=f"Recipe {i}", user_id=user_id if i else None)
+                recipe.ingredients = [Ingredient(name=f"Ingredient {i}")]
+                db.session.add(recipe)
+            db.session.commit()
+
+        response = self.client.get("/api/recipes/export", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "application/x-ndjson")
+        lines = [json.loads(line) for line in response.data.splitlines()]
+        self.assertEqual(
+            [line["title"] for line in lines][:2], ["Recipe 0", "Recipe 1"]
+        )
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(
+            lines[4]["ingredients"], [{"name": "Ingredient 4", "quantity": None}]
+        )
+
+        response = self.client.get(
+            f"/api/recipes/export?user_id={user_id}", headers=self.headers
+        )
+        self.assertEqual(len(response.data.splitlines()), 4)
+
+        response = self.client.get(
+            "/api/recipes/export?updated_since=2999-01-01T00:00:00Z",
+            headers=self.headers,
+        )
+        self.assertEqual(response.data, b"")
+
+        response = self.client.get(
+            "/api/recipes/export?updated_since=yesterday", headers=self.headers
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_export_command(self):
+        """
+        Test that `flask recipe export` writes the catalog to standard output.
+        """
+        with self.app.app_context():
+            db.session.add(Recipe(title="Exported Recipe"))
+            db.session.commit()
+
+        result = self.app.test_cli_runner().invoke(args=["recipe", "export"])
+        self.assertEqual(result.exit_code, 0)
+        self.assertEqual(json.loads(result.output)["title"], "Exported Recipe")
+
+    def test_get_recipes_batch(self):
+        """
+        Test that a batch read returns recipes in request order with two queries.
+        """
+        with self.app.app_context():
+            ids = []
+            for i in range(3):
+                recipe = Recipe(title=f"Recipe {i}")
+                recipe.ingredients = [Ingredient(name=f"Ingredient {i}")]
+                db.session.add(recipe)
+                db.session.flush()
+                ids.append(recipe.id)
+            db.session.commit()
+
+            statements = []
+
+            def record_statement(*args):
+                statements.append(args[2])
+
+            event.listen(db.engine, "before_cursor_execute", record_statement)
+            try:
+                response = self.client.get(
+                    f"/api/recipes/batch?ids={ids[2]},999,{ids[0]}",
+                    headers=self.headers,
+                )
+            finally:
+                event.remove(db.engine, "before_cursor_execute", record_statement)
+
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)["data"]
+        self.assertEqual(
+            [recipe.get("title") for recipe in data["recipes"]],
+            ["Recipe 2", None, "Recipe 0"],
+        )
+        self.assertEqual(data["recipes"][1], {"id": 999, "not_found": True})
+        self.assertEqual(data["not_found"], [999])
+        # Recipes and ingredients, plus the JWT user lookup.
+        self.assertLessEqual(len(statements), 3)
+
+        self.app.config["BATCH_MAX_IDS"] = 2
+        response = self.client.get("/api/recipes/batch?ids=1,2,3", headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get("/api/recipes/batch?ids=1,a", headers=self.headers)
+        self.assertEqual(json.loads(response.data)["message"], "Invalid ids")
+
+    def test_bulk_create_recipes(self):
+        """
+        Test that bulk creation inserts valid recipes and reports every item.
+        """
+        self.app.config["BULK_CHUNK_SIZE"] = 2
+        items = [
+            {
+                "title": f"Bulk Recipe {i}",
+                "description": "Test Description",
+                "ingredients": [
+                    {"name": "Salt", "quantity": "1 pinch"},
+                    {"name": f"Ingredient {i}", "quantity": f"{i} g"},
+                ],
+            }
+            for i in range(3)
+        ]
+        items.insert(1, {"title": "Missing description", "ingredients": []})
+
+        response = self.client.post(
+            "/api/recipes/bulk", json=items, headers=self.headers
+        )
+        self.assertEqual(response.status_code, 207)
+        data = json.loads(response.data)["data"]
+        self.assertEqual(data["created"], 3)
+        self.assertEqual(
+            [result["status"] for result in data["results"]], [201, 400, 201, 201]
+        )
+        self.assertEqual(
+            data["results"][1]["message"], "Invalid or missing description"
+        )
+
+        recipe_id = data["results"][3]["id"]
+        response = self.client.get(f"/api/recipes/{recipe_id}", headers=self.headers)
+        self.assertEqual(
+            json.loads(response.data)["data"]["ingredients"],
+            [
+                {"name": "Salt", "quantity": "1 pinch"},
+                {"name": "Ingredient 2", "quantity": "2 g"},
+            ],
+        )
+        with self.app.app_context():
+            self.assertEqual(Ingredient.query.filter_by(name="Salt").count(), 1)
+
+        response = self.client.get("/api/recipes/?search=bulk", headers=self.headers)
+        self.assertEqual(json.loads(response.data)["data"]["total"], 3)
+
+        response = self.client.post(
+            "/api/recipes/bulk", json=items[1:2], headers=self.headers
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_bulk_create_recipes_without_returning(self):
+        """
+        Test that bulk creation uses multi-row inserts without INSERT ... RETURNING.
+        """
+        items = [
+            {
+                "title": f"Bulk Recipe {i}",
+                "description": "Test Description",
+                "ingredients": [
+                    {"name": "Salt", "quantity": "1 pinch"},
+                    {"name": f"Ingredient {i}", "quantity": f"{i} g"},
+                ],
+            }
+            for i in range(5)
+        ]
+        with self.app.app_context():
+            db.session.add(Recipe(title="Existing Recipe", description="Test"))
+            db.session.commit()
+
+            statements = []
+
+            def record_statement(*args):
+                statements.append(args[2])
+
+            db.engine.dialect.insert_returning = False
+            event.listen(db.engine, "before_cursor_execute", record_statement)
+            try:
+                response = self.client.post(
+                    "/api/recipes/bulk", json=items, headers=self.headers
+                )
+            finally:
+                event.remove(db.engine, "before_cursor_execute", record_statement)
+                db.engine.dialect.insert_returning = True
+
+        self.assertEqual(json.loads(response.data)["data"]["created"], 5)
+        for table in ("recipe", "recipe_ingredient"):
+            inserts = [
+                sql for sql in statements if sql.startswith(f"INSERT INTO {table} ")
+            ]
+            self.assertEqual(len(inserts), 1)
+        for result in json.loads(response.data)["data"]["results"]:
+            response = self.client.get(
+                f"/api/recipes/{result['id']}", headers=self.headers
+            )
+            data = json.loads(response.data)["data"]
+            self.assertEqual(data["title"], f"Bulk Recipe {result['index']}")
+            self.assertEqual(
+                data["ingredients"][1]["name"], f"Ingredient {result['index']}"
+            )
+
+    def test_bulk_delete_recipes(self):
+        """
+        Test that bulk deletion removes the user's recipes in chunks.
+        """
+        self.app.config["BULK_CHUNK_SIZE"] = 2
+        items = [
+            {
+                "title": f"Bulk Recipe {i}",
+                "description": "Test Description",
+                "ingredients": [{"name": "Salt", "quantity": "1 pinch"}],
+            }
+            for i in range(5)
+        ]
+        response = self.client.post(
+            "/api/recipes/bulk", json=items, headers=self.headers
+        )
+        ids = [result["id"] for result in json.loads(response.data)["data"]["results"]]
+        with self.app.app_context():
+            other = User(username="testuser2", email="test2@example.com")
+            other.set_password("NewPassword@12345")
+            db.session.add(other)
+            db.session.flush()
+            other_recipe = Recipe(title="Other", description="Test", user_id=other.id)
+            db.session.add(other_recipe)
+            db.session.commit()
+            other_id = other_recipe.id
+
+        response = self.client.delete(
+            "/api/recipes/bulk",
+            json={"ids": [ids[0], ids[1], ids[0], other_id, 9999]},
+            headers=self.headers,
+        )
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)["data"]
+        self.assertEqual(data, {"deleted": 2, "not_found": [other_id, 9999]})
+        with self.app.app_context():
+            self.assertEqual(
+                RecipeIngredient.query.filter(
+                    RecipeIngredient.recipe_id.in_(ids[:2])
+                ).count(),
+                0,
+            )
+
+        response = self.client.delete(
+            "/api/recipes/bulk", json={"all": True}, headers=self.headers
+        )
+        self.assertEqual(json.loads(response.data)["data"], {"deleted": 3})
+        with self.app.app_context():
+            self.assertEqual([recipe.id for recipe in Recipe.query], [other_id])
+            self.assertEqual(RecipeIngredient.query.count(), 0)
+
+        for body in ({"ids": []}, {"ids": ["1"]}, {"all": "yes"}, [1]):
+            response = self.client.delete(
+                "/api/recipes/bulk", json=body, headers=self.headers
+            )
+            self.assertEqual(response.status_code, 400)
+
+        # Deleting a user removes their recipes in the database and reports them
+        with self.app.app_context():
+            db.session.delete(User.query.filter_by(username="testuser2").one())
+            db.session.commit()
+            self.assertEqual(Recipe.query.count(), 0)
+            self.assertEqual(
+                RecipeEvent.query.filter_by(recipe_id=other_id, op="delete").count(),
+                1,
+            )
+
+    def test_ingredient_catalog_get_or_create(self):
+        """
+        Test that ingredients are deduplicated by normalized name.
+        """
+        with self.app.app_context():
+            existing = self._add_ingredient("Sea Salt")
+            db.session.commit()
+
+            ids = get_or_create_ingredients(["sea  salt", "Pepper", "PEPPER"])
+            self.assertEqual(ids["sea  salt"], existing)
+            self.assertEqual(ids["Pepper"], ids["PEPPER"])
+            self.assertEqual(get_ingredient_id_cache().get_many(["pepper"]), {})
+            db.session.commit()
+            self.assertEqual(
+                get_ingredient_id_cache().get_many(["pepper"]),
+                {"pepper": ids["Pepper"]},
+            )
+            self.assertEqual(Ingredient.query.count(), 2)
+            self.assertEqual(db.session.get(Ingredient, ids["PEPPER"]).name, "Pepper")
+
+            recipe = Recipe(title="Recipe", description="Test")
+            db.session.add(recipe)
+            db.session.commit()
+            recipe_id = recipe.id
+
+        response = self.client.put(
+            f"/api/recipes/{recipe_id}",
+            json={"ingredients": [{"name": "pepper ", "quantity": "1 tsp"}]},
+            headers=self.headers,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            json.loads(response.data)["data"]["ingredients"],
+            [{"name": "Pepper", "quantity": "1 tsp"}],
+        )
+        with self.app.app_context():
+            self.assertEqual(Ingredient.query.count(), 2)
+
+    def test_update_recipe_ingredient_diff(self):
+        """
+        Test that updating ingredients only writes and reports the differences.
+        """
+        create_response = self.client.post(
+            "/api/recipes/",
+            headers=self.headers,
+            json={
+                "title": "Test Recipe",
+                "description": "Test Description",
+                "ingredients": [
+                    {"name": "Flour", "quantity": "1 cup"},
+                    {"name": "Sugar", "quantity": "2 tbsp"},
+                    {"name": "Salt", "quantity": "1 pinch"},
+                ],
+            },
+        )
+        recipe_id = json.loads(create_response.data)["data"]["id"]
+
+        with self.app.app_context():
+            statements = []
+
+            def record_statement(*args):
+                statements.append(args[2])
+
+            event.listen(db.engine, "before_cursor_execute", record_statement)
+            try:
+                response = self.client.put(
+                    f"/api/recipes/{recipe_id}",
+                    headers=self.headers,
+                    json={
+                        "ingredients": [
+                            {"name": "Flour", "quantity": "1 cup"},
+                            {"name": "sugar", "quantity": "3 tbsp"},
+                            {"name": "Butter", "quantity": "50 g"},
+                        ]
+                    },
+                )
+            finally:
+                event.remove(db.engine, "before_cursor_execute", record_statement)
+
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)["data"]
+        self.assertEqual(
+            data["ingredient_changes"],
+            {"added": ["Butter"], "updated": ["sugar"], "removed": ["Salt"]},
+        )
+        self.assertEqual(
+            data["ingredients"],
+            [
+                {"name": "Flour", "quantity": "1 cup"},
+                {"name": "Sugar", "quantity": "3 tbsp"},
+                {"name": "Butter", "quantity": "50 g"},
+            ],
+        )
+        link_writes = [
+            sql
+            for sql in statements
+            if sql.split()[0] in ("INSERT", "UPDATE", "DELETE")
+            and "recipe_ingredient" in sql.split("(")[0]
+        ]
+        self.assertEqual(len(link_writes), 3)
+
+    def test_patch_recipe_scalar_fields(self):
+        """
+        Test that a merge patch of recipe columns is a single UPDATE statement.
+        """
+        with self.app.app_context():
+            recipe = Recipe(title="Old Title", description="Test")
+            db.session.add(recipe)
+            db.session.commit()
+            recipe_id = recipe.id
+
+            statements = []
+
+            def record_statement(*args):
+                statements.append(args[2])
+
+            event.listen(db.engine, "before_cursor_execute", record_statement)
+            try:
+                response = self.client.patch(
+                    f"/api/recipes/{recipe_id}",
+                    headers={
+                        **self.headers,
+                        "Content-Type": "application/merge-patch+json",
+                    },
+                    data=json.dumps({"title": "New Title", "instructions": None}),
+                )
+            finally:
+                event.remove(db.engine, "before_cursor_execute", record_statement)
+
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)["data"]
+        self.assertEqual(data["title"], "New Title")
+        self.assertEqual(response.headers["ETag"], f'"{recipe_id}-2"')
+        recipe_writes = [sql for sql in statements if sql.startswith("UPDATE recipe ")]
+        self.assertEqual(len(recipe_writes), 1)
+        self.assertLess(
+            statements.index(recipe_writes[0]),
+            min(
+                i
+                for i, sql in enumerate(statements)
+                if sql.startswith("SELECT recipe.id")
+            ),
+        )
+
+        response = self.client.patch(
+            "/api/recipes/999", headers=self.headers, json={"title": "Missing"}
+        )
+        self.assertEqual(response.status_code, 404)
+        response = self.client.patch(
+            f"/api/recipes/{recipe_id}", headers=self.headers, json={"title": None}
+        )
+        self.assertEqual(
+            json.loads(response.data)["message"], "Invalid or missing title"
+        )
+        response = self.client.patch(
+            f"/api/recipes/{recipe_id}",
+            headers={**self.headers, "Content-Type": "text/plain"},
+            data=json.dumps({"title": "Plain Title"}),
+        )
+        self.assertEqual(response.status_code, 415)
+
+    def test_patch_recipe_ingredients(self):
+        """
+        Test that JSON Patch operations edit the ingredient list.
+        """
+        with self.app.app_context():
+            recipe = Recipe(title="Recipe", description="Test")
+            db.session.add(recipe)
+            db.session.flush()
+            for name in ("Flour", "Salt"):
+                db.session.add(
+                    RecipeIngredient(
+                        recipe_id=recipe.id,
+                        ingredient_id=self._add_ingredient(name),
+                        quantity="1 cup",
+                    )
+                )
+            db.session.commit()
+            recipe_id = recipe.id
+
+        headers = {**self.headers, "Content-Type": "application/json-patch+json"}
+        operations = [
+            {"op": "test", "path": "/ingredients/0/name", "value": "Flour"},
+            {"op": "replace", "path": "/ingredients/0/quantity", "value": "2 cups"},
+            {"op": "remove", "path": "/ingredients/1"},
+            {
+                "op": "add",
+                "path": "/ingredients/-",
+                "value": {"name": "Eggs", "quantity": "2"},
+            },
+            {"op": "replace", "path": "/title", "value": "Patched"},
+        ]
+        response = self.client.patch(
+            f"/api/recipes/{recipe_id}", headers=headers, data=json.dumps(operations)
+        )
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)["data"]
+        self.assertEqual(data["title"], "Patched")
+        self.assertEqual(
+            data["ingredient_changes"],
+            {"added": ["Eggs"], "updated": ["Flour"], "removed": ["Salt"]},
+        )
+        self.assertEqual(
+            data["ingredients"],
+            [
+                {"name": "Flour", "quantity": "2 cups"},
+                {"name": "Eggs", "quantity": "2"},
+            ],
+        )
+
+        response = self.client.patch(
+            f"/api/recipes/{recipe_id}",
+            headers=headers,
+            data=json.dumps(
+                [{"op": "test", "path": "/ingredients/1/name", "value": "Salt"}]
+            ),
+        )
+        self.assertEqual(response.status_code, 409)
+        response = self.client.patch(
+            f"/api/recipes/{recipe_id}",
+            headers=headers,
+            data=json.dumps([{"op": "remove", "path": "/ingredients/5"}]),
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_create_recipe_idempotency_key(self):
+        """
+        Test that retries with the same Idempotency-Key replay the first response.
+        """
+        recipe_data = {
+            "title": "Test Recipe",
+            "description": "Test Description",
+            "ingredients": [{"name": "Ingredient 1", "quantity": "1 cup"}],
+        }
+        headers = {**self.headers, "Idempotency-Key": "create-1"}
+        first = self.client.post("/api/recipes/", headers=headers, json=recipe_data)
+        self.assertEqual(first.status_code, 201)
+
+        retry = self.client.post("/api/recipes/", headers=headers, json=recipe_data)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.headers["Idempotent-Replayed"], "true")
+        self.assertEqual(json.loads(retry.data), json.loads(first.data))
+        self.assertEqual(retry.headers["ETag"], first.headers["ETag"])
+
+        # Replayed from the table once the in-memory front is gone
+        self.app.extensions.pop("idempotency_cache")
+        retry = self.client.post("/api/recipes/", headers=headers, json=recipe_data)
+        self.assertEqual(json.loads(retry.data), json.loads(first.data))
+        self.assertEqual(retry.headers["ETag"], first.headers["ETag"])
+        with self.app.app_context():
+            self.assertEqual(Recipe.query.count(), 1)
+
+        response = self.client.post(
+            "/api/recipes/", headers=headers, json=dict(recipe_data, title="Other")
+        )
+        self.assertEqual(response.status_code, 422)
+
+        # A concurrent duplicate of a request still running is refused
+        with self.app.test_request_context(
+            "/api/recipes/", method="POST", json=recipe_data
+        ):
+            request_hash = request_fingerprint()
+            user_id = User.query.filter_by(username="testuser1").one().id
+            db.session.add(
+                IdempotencyKey(
+                    user_id=user_id,
+                    key="in-flight",
+                    request_hash=request_hash,
+                    expires_at=datetime.utcnow() + timedelta(minutes=1),
+                )
+            )
+            db.session.commit()
+        response = self.client.post(
+            "/api/recipes/",
+            headers={**self.headers, "Idempotency-Key": "in-flight"},
+            json=recipe_data,
+        )
+        self.assertEqual(response.status_code, 409)
+
+        # A view raising an exception releases its key
+        def fail(data):
+            raise RuntimeError("validator failed")
+
+        headers = {**self.headers, "Idempotency-Key": "create-2"}
+        self.app.extensions["recipe_validators"] = {False: fail}
+        with self.assertRaises(RuntimeError):
+            self.client.post("/api/recipes/", headers=headers, json=recipe_data)
+        self.app.extensions.pop("recipe_validators")
+        response = self.client.post("/api/recipes/", headers=headers, json=recipe_data)
+        self.assertEqual(response.status_code, 201)
+
+        # An outcome whose commit fails is not remembered
+        def fail_outcome_commit(session, flush_context):
+            if any(isinstance(obj, IdempotencyKey) for obj in session.dirty):
+                raise RuntimeError("commit failed")
+
+        headers = {**self.headers, "Idempotency-Key": "create-3"}
+        event.listen(db.session, "after_flush", fail_outcome_commit)
+        try:
+            with self.assertRaises(RuntimeError):
+                self.client.post("/api/recipes/", headers=headers, json=recipe_data)
+        finally:
+            event.remove(db.session, "after_flush", fail_outcome_commit)
+        with self.app.app_context():
+            user_id = User.query.filter_by(username="testuser1").one().id
+            self.assertIsNone(get_idempotency_cache().get(user_id, "create-3"))
+
+    def test_outbox_events(self):
+        """
+        Test that recipe writes record outbox events replayed by other workers.
+        """
+        response = self.client.post(
+            "/api/recipes/",
+            headers=self.headers,
+            json={
+                "title": "Test Recipe",
+                "description": "Test Description",
+                "ingredients": [{"name": "Ingredient 1", "quantity": "1 cup"}],
+            },
+        )
+        recipe_id = json.loads(response.data)["data"]["id"]
+        with self.app.app_context():
+            dispatcher = get_outbox_dispatcher()
+            event = RecipeEvent.query.one()
+            self.assertEqual((event.recipe_id, event.op), (recipe_id, "insert"))
+            self.assertEqual(event.origin, dispatcher.origin)
+            # This worker's own events are not delivered again
+            self.assertEqual(dispatcher.poll(db.session, force=True), 0)
+
+        # Warm the caches, then change the recipes as another worker would
+        self.client.get(f"/api/recipes/{recipe_id}", headers=self.headers)
+        response = self.client.get("/api/recipes/", headers=self.headers)
+        self.assertEqual(json.loads(response.data)["data"]["total"], 1)
+        with self.app.app_context():
+            table = Recipe.__table__
+            db.session.execute(
+                table.update()
+                .where(table.c.id == recipe_id)
+                .values(title="Renamed Recipe", version=table.c.version + 1)
+            )
+            other_id = db.session.execute(
+                table.insert().values(title="Other Recipe", description="Test")
+            ).inserted_primary_key[0]
+            db.session.add_all(
+                [
+                    RecipeEvent(recipe_id=recipe_id, op="update", origin="other"),
+                    RecipeEvent(recipe_id=other_id, op="insert", origin="other"),
+                ]
+            )
+            db.session.commit()
+            self.assertEqual(get_outbox_dispatcher().poll(db.session, force=True), 2)
+
+        response = self.client.get(f"/api/recipes/{recipe_id}", headers=self.headers)
+        self.assertEqual(json.loads(response.data)["data"]["title"], "Renamed Recipe")
+        response = self.client.get("/api/recipes/", headers=self.headers)
+        data = json.loads(response.data)["data"]
+        self.assertEqual((data["total"], data["total_type"]), (2, "cached"))
+        response = self.client.get(
+            "/api/recipes/",
+            query_string={"search": "renamed", "match": "substring"},
+            headers=self.headers,
+        )
+        self.assertEqual(
+            [recipe["id"] for recipe in json.loads(response.data)["data"]["recipes"]],
+            [recipe_id],
+        )
+
+        # Writes rolled back leave no events behind
+        with self.app.app_context():
+            db.session.add(Recipe(title="Discarded", description="Test"))
+            db.session.flush()
+            db.session.rollback()
+            self.assertEqual(RecipeEvent.query.count(), 3)
+
     def test_create_recipe_missing_fields(self):
         """
         Test creating a recipe with missing fields.
@@ -314,6 +1347,85 @@ class RecipeAPITestCase(unittest.TestCase):
         )
         self._check_invalid_field_response(response, "Invalid ingredient quantity")
 
+    def test_create_recipe_reports_all_errors(self):
+        """
+        Test that every validation error is reported before any database access.
+        """
+        self.app.config["RECIPE_MAX_INGREDIENTS"] = 3
+        self.app.extensions.pop("recipe_validators", None)
+        statements = []
+
+        def count_statement(*args):
+            if "recipe_event" not in args[2]:
+                statements.append(args[2])
+
+        with self.app.app_context():
+            event.listen(db.engine, "before_cursor_execute", count_statement)
+            try:
+                response = self.client.post(
+                    "/api/recipes/",
+                    headers=self.headers,
+                    json={
+                        "title": "T" * 129,
+                        "description": " ",
+                        "instructions": 1,
+                        "ingredients": [
+                            {"name": "Salt", "quantity": "1 pinch"},
+                            {"name": " salt ", "quantity": ""},
+                            "Pepper",
+                        ],
+                    },
+                )
+            finally:
+                event.remove(db.engine, "before_cursor_execute", count_statement)
+
+        self.assertEqual(statements, [])
+        self._check_invalid_field_response(
+            response, "Field too long: title (max 128 characters)"
+        )
+        self.assertEqual(
+            json.loads(response.data)["data"]["errors"],
+            [
+                {
+                    "field": "title",
+                    "message": "Field too long: title (max 128 characters)",
+                },
+                {"field": "description", "message": "Invalid or missing description"},
+                {"field": "instructions", "message": "Invalid instructions"},
+                {
+                    "field": "ingredients[1].quantity",
+                    "message": "Invalid ingredient quantity",
+                },
+                {
+                    "field": "ingredients[1].name",
+                    "message": "Duplicate ingredient name",
+                },
+                {"field": "ingredients[2].name", "message": "Invalid ingredient name"},
+                {
+                    "field": "ingredients[2].quantity",
+                    "message": "Invalid ingredient quantity",
+                },
+            ],
+        )
+
+        ingredients = [{"name": f"I{i}", "quantity": "1"} for i in range(4)]
+        response = self.client.post(
+            "/api/recipes/",
+            headers=self.headers,
+            json={"title": "T", "description": "D", "ingredients": ingredients},
+        )
+        self._check_invalid_field_response(response, "Too many ingredients (max 3)")
+
+        # Updates only check the members they send
+        response = self.client.put(
+            "/api/recipes/9999", headers=self.headers, json={"title": "New"}
+        )
+        self.assertEqual(response.status_code, 404)
+        response = self.client.put(
+            "/api/recipes/9999", headers=self.headers, json={"ingredients": []}
+        )
+        self._check_invalid_field_response(response, "Invalid or missing ingredients")
+
     def _check_invalid_field_response(self, response, expected_message):
         self.assertEqual(response.status_code, 400)
         result = json.loads(response.data)
@@ -373,5 +1485,34 @@ class RecipeAPITestCase(unittest.TestCase):
         self.assertEqual(result["message"], expected_message)
 
 
+class RecipeCacheTestCase(unittest.TestCase):
+    """
+    Test cases for the two-tier recipe cache.
+    """
+
+    def test_lru_eviction(self):
+        cache = RecipeCache(max_entries=2, ttl=60)
+        cache.set_many({1: {"version": 1, "data": {}}, 2: {"version": 1, "data": {}}})
+        cache.get_many([1])
+        cache.set_many({3: {"version": 1, "data": {}}})
+
+        self.assertEqual(set(cache.get_many([1, 2, 3])), {1, 3})
+        stats = cache.stats()
+        self.assertEqual(stats["evictions"], 1)
+        self.assertEqual((stats["hits"], stats["misses"]), (3, 1))
+
+    def test_shared_tier(self):
+        shared = LocalSharedCache()
+        first = RecipeCache(max_entries=10, ttl=60, shared=shared)
+        second = RecipeCache(max_entries=10, ttl=60, shared=shared)
+        first.set_many({1: {"version": 2, "data": {"id": 1}}})
+
+        self.assertEqual(second.get_many([1]), {1: {"version": 2, "data": {"id": 1}}})
+        self.assertEqual(second.stats()["shared_hits"], 1)
+
+        first.invalidate([1])
+        self.assertEqual(RecipeCache(10, 60, shared=shared).get_many([1]), {})
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -5,6 +5,7 @@ from flask import json
 
 from app import create_app
 from app.extensions import db
+from app.blueprints.recipe.trigram import TrigramIndex
 from app.models import Ingredient, Recipe, RecipeIngredient, User
 
 
@@ -122,6 +123,105 @@ class SearchAPITestCase(unittest.TestCase):
             )
             self._check_search_response(response, 0)
 
+    def test_search_recipes_full_text(self):
+        """
+        Test that search matches word prefixes and follows recipe updates.
+        """
+        with self.app.app_context():
+            self._create_sample_recipes()
+
+            # Word prefixes match titles and ingredient names.
+            response = self.client.get(
+                "/api/recipes/?search=spag", headers=self.headers
+            )
+            self._check_search_response(response, 1)
+            response = self.client.get(
+                "/api/recipes/?search=alfredo chick", headers=self.headers
+            )
+            self._check_search_response(response, 1)
+
+            # Renaming a recipe updates its indexed document.
+            recipe = Recipe.query.filter_by(title="Vegetable Stir Fry").first()
+            recipe.title = "Garden Noodles"
+            db.session.commit()
+
+            response = self.client.get(
+                "/api/recipes/?search=noodles", headers=self.headers
+            )
+            self._check_search_response(response, 1)
+            response = self.client.get(
+                "/api/recipes/?search=stir", headers=self.headers
+            )
+            self._check_search_response(response, 0)
+
+            # Deleted recipes drop out of the index.
+            RecipeIngredient.query.filter_by(recipe_id=recipe.id).delete()
+            db.session.delete(recipe)
+            db.session.commit()
+
+            response = self.client.get(
+                "/api/recipes/?search=broccoli", headers=self.headers
+            )
+            self._check_search_response(response, 0)
+
+    def test_search_recipes_substring_and_fuzzy(self):
+        """
+        Test substring and typo-tolerant search through the trigram index.
+        """
+        with self.app.app_context():
+            self._create_sample_recipes()
+
+            response = self.client.get(
+                "/api/recipes/?search=ancett&match=substring", headers=self.headers
+            )
+            self._check_search_response(response, 1)
+            response = self.client.get(
+                "/api/recipes/?search=ancett", headers=self.headers
+            )
+            self._check_search_response(response, 0)
+
+            response = self.client.get(
+                "/api/recipes/?search=brocoli&match=fuzzy", headers=self.headers
+            )
+            self._check_search_response(response, 1)
+            response = self.client.get(
+                "/api/recipes/?search=brocoli&match=substring", headers=self.headers
+            )
+            self._check_search_response(response, 0)
+
+            response = self.client.get(
+                "/api/recipes/?search=x&match=regex", headers=self.headers
+            )
+            self.assertEqual(response.status_code, 400)
+
+    def test_search_recipes_truncated(self):
+        """
+        Test that trigram searches cut at TRIGRAM_MAX_RESULTS say so.
+        """
+        self.app.config["TRIGRAM_MAX_RESULTS"] = 2
+        with self.app.app_context():
+            for i in range(3):
+                db.session.add(Recipe(title=f"Onion soup {i}", description="Test"))
+            db.session.commit()
+
+        response = self.client.get(
+            "/api/recipes/?search=soup&match=substring", headers=self.headers
+        )
+        data = self._extracted_from_test_search_recipes_no_results_4(response, 2)[
+            "data"
+        ]
+        self.assertTrue(data["truncated"])
+        self.assertEqual((data["total"], data["total_type"]), (2, "estimated"))
+
+        response = self.client.get(
+            "/api/recipes/?search=onion soup 1&match=substring", headers=self.headers
+        )
+        data = self._extracted_from_test_search_recipes_no_results_4(response, 1)[
+            "data"
+        ]
+        self.assertNotIn("truncated", data)
+        self.assertEqual(data["total_type"], "exact")
+
     def _check_search_response(self, response, expected_count):
         """
         Helper method to check search response.
@@ -181,5 +281,50 @@ class SearchAPITestCase(unittest.TestCase):
             self.assertEqual(response.status_code, 308)
 
 
+class TrigramIndexTestCase(unittest.TestCase):
+    """
+    Test cases for the in-process trigram index.
+    """
+
+    def setUp(self):
+        self.index = TrigramIndex()
+        self.index.build(
+            [
+                (1, "chili con carne\x1fkidney beans\x1fchilli powder"),
+                (2, "tomato soup\x1ftomatoes\x1fbasil"),
+                (3, "caprese salad\x1fmozzarella\x1ftomato"),
+            ]
+        )
+
+    def test_search_substring(self):
+        self.assertEqual(self.index.search_substring("tomat"), [2, 3])
+        self.assertEqual(self.index.search_substring("Kidney"), [1])
+        self.assertEqual(self.index.search_substring("il"), [1, 2])
+        # Matches never span two fields.
+        self.assertEqual(self.index.search_substring("carne kidney"), [])
+
+    def test_search_fuzzy(self):
+        self.assertEqual(self.index.search_fuzzy("mozarela", 2), [3])
+        self.assertEqual(self.index.search_fuzzy("chilli", 1), [1])
+        self.assertEqual(self.index.search_fuzzy("pineapple", 1), [])
+        self.assertEqual(self.index.search_fuzzy("basl", 1), [2])
+
+    def test_search_fuzzy_short_term_candidates(self):
+        # Short terms are looked up through posting lists, not a full scan.
+        _, candidates = self.index._fuzzy_candidates("tomatp", 1)
+        self.assertEqual([recipe_id for recipe_id, _ in candidates], [2, 3])
+        self.assertEqual(self.index.search_fuzzy("tomatp", 1), [2, 3])
+
+    def test_incremental_updates(self):
+        self.index.upsert(2, "gazpacho\x1fcucumber")
+        self.index.remove(3)
+        self.index.upsert(4, "tomato tart")
+        self.assertEqual(self.index.search_substring("tomat"), [4])
+        self.assertEqual(self.index.search_substring("cucum"), [2])
+        self.assertEqual(self.index.search_fuzzy("cucmber", 1), [2])
+        self.assertEqual(self.index.search_fuzzy("mozarela", 2), [])
+        self.assertEqual(len(self.index), 3)
+
+
 if __name__ == "__main__":
     unittest.main()